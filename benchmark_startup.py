@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so every measurement pays the real import cost
+CHILD_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+sys.path.insert(0, {repo_dir!r})
+import document_retrieval
+imported = time.perf_counter()
+store = document_retrieval.DocumentStore({documents_dir!r})
+opened = time.perf_counter()
+doc_id = {doc_id!r}
+{operation}
+finished = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "open": opened - imported,
+    "first_operation": finished - opened,
+    "model_loaded": store._model is not None
+}}))
+"""
+
+# What each CLI subcommand does once the store is open
+OPERATIONS = {
+    "list": "store.get_document_list()",
+    "get": "store.get_document_text(doc_id)",
+    "search": "store.search_documents({query!r}, max_results=5)",
+    "status": "store.get_embedding_stats()",
+    "delete": "store.delete_document(doc_id)",
+    # The upload finishes once its chunks are embedded, as the CLI waits for the worker before exiting
+    "upload": "store.upload_document({pdf!r}, 'European_Union', 'benchmark'); store.wait_for_embeddings()",
+}
+
+
+def cli_arguments(command: str, doc_id: str, query: str, pdf: str) -> list:
+    """
+    Get the document_retrieval.py arguments for a subcommand
+
+    Args:
+        command: Subcommand name
+        doc_id: Document ID used by get and delete
+        query: Query used by search
+        pdf: PDF file used by upload
+
+    Returns:
+        Argument list
+    """
+    return {
+        "list": ["list"],
+        "get": ["get", "--id", doc_id],
+        "search": ["search", "--query", query],
+        "status": ["status"],
+        "delete": ["delete", "--id", doc_id],
+        "upload": ["upload", "--file", pdf, "--agent", "European_Union", "--type", "benchmark"],
+    }[command]
+
+
+def prepare_copy(source_dir: str, scratch: str):
+    """
+    Copy a documents directory into a scratch directory and open it once
+
+    Opening the copy up front keeps the one-off legacy index migration out of the measurements.
+    The embeddings queued for documents that have none are created here too, so search runs
+    semantically and loads the model, as it does on an embedded corpus.
+    Every process runs from the scratch directory, because stored text paths are relative to
+    the directory the store was used from.
+
+    Args:
+        source_dir: Documents directory to copy
+        scratch: Scratch directory; the copy becomes scratch/agent_documents (replaced if it exists)
+    """
+    documents_dir = os.path.join(scratch, "agent_documents")
+    if os.path.exists(documents_dir):
+        shutil.rmtree(documents_dir)
+    shutil.copytree(source_dir, documents_dir)
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO_DIR!r}); "
+                    f"import document_retrieval; document_retrieval.DocumentStore('agent_documents').wait_for_embeddings()"],
+                   cwd=scratch, check=True, capture_output=True)
+
+
+def run_once(command: str, source_dir: str, query: str, pdf: str) -> dict:
+    """
+    Measure one cold run of a subcommand against a scratch copy of the documents directory
+
+    Args:
+        command: Subcommand name
+        source_dir: Documents directory to copy
+        query: Query used by search
+        pdf: PDF file used by upload
+
+    Returns:
+        Dictionary of timings in seconds
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        prepare_copy(source_dir, scratch)
+
+        doc_id = subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO_DIR!r}); "
+                                 f"import document_retrieval; docs = document_retrieval.DocumentStore("
+                                 f"'agent_documents').get_document_list(); print(docs[0]['id'] if docs else '')"],
+                                cwd=scratch, check=True, capture_output=True, text=True).stdout.strip()
+
+        operation = OPERATIONS[command].format(query=query, pdf=pdf)
+        script = CHILD_SCRIPT.format(repo_dir=REPO_DIR, documents_dir="agent_documents", doc_id=doc_id,
+                                     operation=operation)
+        output = subprocess.run([sys.executable, "-c", script], cwd=scratch, check=True, capture_output=True,
+                                text=True)
+        timings = json.loads(output.stdout.strip().splitlines()[-1])
+
+        # Wall-clock time of the real CLI, which runs from the scratch directory
+        if command in ("delete", "upload"):
+            # Mutating commands get their own fresh copy
+            prepare_copy(source_dir, scratch)
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, "document_retrieval.py")]
+                       + cli_arguments(command, doc_id, query, pdf),
+                       cwd=scratch, check=True, capture_output=True)
+        timings["cli_total"] = time.perf_counter() - started
+        return timings
+
+
+def main():
+    """Run the startup benchmark for each CLI subcommand and print a table."""
+    pdfs = sorted(glob.glob(os.path.join(REPO_DIR, "TEXTS", "pdfs", "*.pdf")))
+
+    parser = argparse.ArgumentParser(description='Startup latency benchmark for document_retrieval.py subcommands')
+    parser.add_argument('--documents-dir', default=os.path.join(REPO_DIR, "agent_documents"),
+                        help='Documents directory to benchmark against (a scratch copy is used)')
+    parser.add_argument('--commands', nargs='+', default=list(OPERATIONS), choices=list(OPERATIONS),
+                        help='Subcommands to benchmark')
+    parser.add_argument('--query', default="export controls on advanced chips", help='Query used by search')
+    parser.add_argument('--pdf', default=pdfs[0] if pdfs else None, help='PDF used by upload')
+    parser.add_argument('--repeat', type=int, default=3, help='Cold runs per subcommand (the median is reported)')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    commands = [command for command in args.commands if command != "upload" or args.pdf]
+    results = {}
+    for command in commands:
+        runs = [run_once(command, args.documents_dir, args.query, args.pdf) for _ in range(args.repeat)]
+        results[command] = {key: statistics.median(run[key] for run in runs)
+                            for key in ("import", "open", "first_operation", "cli_total")}
+        results[command]["model_loaded"] = any(run["model_loaded"] for run in runs)
+
+    print(f"{'command':<10}{'import':>10}{'open':>10}{'first op':>10}{'CLI total':>11}  model loaded")
+    for command, timings in results.items():
+        print(f"{command:<10}{timings['import'] * 1000:>8.0f}ms{timings['open'] * 1000:>8.0f}ms"
+              f"{timings['first_operation'] * 1000:>8.0f}ms{timings['cli_total'] * 1000:>9.0f}ms  "
+              f"{'yes' if timings['model_loaded'] else 'no'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import re
+import logging
+from typing import Dict, List, Optional
+from embedding_scheduler import estimate_tokens
+
+# Defaults for packing document evidence into prompts
+CONTEXT_TOKEN_BUDGET = 500  # Tokens of document context added to one prompt
+REDUNDANCY_THRESHOLD = 0.6  # Word overlap (Jaccard) above which a snippet repeats one already packed
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _snippet_text(snippet: str, page: Optional[int], section: Optional[str]) -> str:
+    """Strip the page/section marker the store puts in front of a snippet"""
+    prefix = (f" (Page {page})" if page else "") + (f" - {section}" if section else "")
+    if prefix and snippet.startswith(f"{prefix}: "):
+        snippet = snippet[len(prefix) + 2:]
+    return " ".join(snippet.split())
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _source(title: str, page: Optional[int]) -> str:
+    return f"(Source: {title}, p. {page})" if page else f"(Source: {title})"
+
+
+def pack_context(search_results: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET, header: str = "") -> Dict:
+    """
+    Pack the most useful search snippets into a token budget
+
+    Snippets are taken greedily by score per token (relative to the best snippet
+    found), skipping ones that mostly repeat a snippet already taken. Snippets from consecutive chunks on the same page are then
+    merged into one bullet so the source is only cited once.
+
+    Args:
+        search_results: Results of DocumentStore.search_documents
+        token_budget: Maximum estimated tokens of the packed context, header included
+        header: Optional first line of the context
+
+    Returns:
+        Dictionary with the context "text", the estimated "tokens" spent, the "budget",
+        the number of "snippets" packed and the "documents" (search results) they came from
+    """
+    tokens_spent = estimate_tokens(header) if header else 0
+
+    # One candidate per snippet; the best score in the list is worth 1.0
+    candidates = []
+    top_score = max((max(result.get("snippet_scores") or [result.get("score", 0.0)])
+                     for result in search_results), default=0.0) or 1.0
+    for rank, result in enumerate(search_results):
+        pages = result.get("pages") or []
+        sections = result.get("sections") or []
+        chunks = result.get("chunks") or []
+        scores = result.get("snippet_scores") or []
+        for i, snippet in enumerate(result.get("snippets", [])):
+            page = pages[i] if i < len(pages) else None
+            text = _snippet_text(snippet, page, sections[i] if i < len(sections) else None)
+            if not text:
+                continue
+            score = scores[i] if i < len(scores) else result.get("score", 0.0)
+            tokens = estimate_tokens(f"• {text} {_source(result['title'], page)}")
+            candidates.append({
+                "rank": rank,
+                "chunk": chunks[i] if i < len(chunks) else None,
+                "page": page,
+                "text": text,
+                "words": _words(text),
+                "tokens": tokens,
+                "value": (score / top_score) / tokens
+            })
+
+    selected = []
+    for candidate in sorted(candidates, key=lambda c: -c["value"]):
+        if tokens_spent + candidate["tokens"] > token_budget:
+            continue
+        if any(len(candidate["words"] & other["words"]) / (len(candidate["words"] | other["words"]) or 1)
+               > REDUNDANCY_THRESHOLD for other in selected):
+            continue
+        selected.append(candidate)
+        tokens_spent += candidate["tokens"]
+
+    # Present the evidence in retrieval order, merging consecutive chunks from one page
+    selected.sort(key=lambda c: (c["rank"], c["page"] or 0, c["chunk"] if c["chunk"] is not None else 0))
+    pieces = []
+    for candidate in selected:
+        previous = pieces[-1] if pieces else None
+        if (previous and previous["rank"] == candidate["rank"] and previous["page"] == candidate["page"]
+                and candidate["chunk"] is not None and previous["chunk"] is not None
+                and candidate["chunk"] == previous["chunk"] + 1):
+            previous["text"] = f"{previous['text']} {candidate['text']}"
+            previous["chunk"] = candidate["chunk"]
+        else:
+            pieces.append(dict(candidate))
+
+    lines = [header] if header else []
+    for piece in pieces:
+        lines.append(f"• {piece['text']} {_source(search_results[piece['rank']]['title'], piece['page'])}")
+    text = "\n".join(lines) if pieces else ""
+
+    used_ranks = sorted({piece["rank"] for piece in pieces})
+    packed = {
+        "text": text,
+        "tokens": estimate_tokens(text) if text else 0,
+        "budget": token_budget,
+        "snippets": len(selected),
+        "documents": [search_results[rank] for rank in used_ranks]
+    }
+    logging.info(f"Packed {packed['snippets']} snippets from {len(used_ranks)} documents into "
+                 f"{packed['tokens']}/{token_budget} tokens")
+    return packed
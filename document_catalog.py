@@ -0,0 +1,701 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from embedding_cache import text_key
+
+PAGE_MARKER_BYTES_PATTERN = re.compile(rb'--- Page (\d+) ---')
+
+# Columns of the documents table, in the order used by the document dictionaries
+DOCUMENT_COLUMNS = ["id", "title", "agent", "type", "description", "original_file", "text_file",
+                    "pages", "upload_date", "char_count", "content_hash", "payload"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    agent TEXT NOT NULL COLLATE NOCASE,
+    type TEXT NOT NULL COLLATE NOCASE,
+    description TEXT NOT NULL DEFAULT '',
+    original_file TEXT,
+    text_file TEXT NOT NULL,
+    pages INTEGER NOT NULL DEFAULT 0,
+    upload_date TEXT,
+    char_count INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_agent ON documents (agent, type);
+CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (type);
+CREATE INDEX IF NOT EXISTS idx_documents_payload ON documents (payload);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    payload TEXT NOT NULL,
+    chunk_idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    start INTEGER,
+    end INTEGER,
+    page INTEGER,
+    section TEXT,
+    text_hash TEXT,
+    PRIMARY KEY (payload, chunk_idx)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS pages (
+    payload TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    start_byte INTEGER NOT NULL,
+    end_byte INTEGER NOT NULL,
+    PRIMARY KEY (payload, page)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS embedding_jobs (
+    payload TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    error TEXT,
+    queued_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (payload, model)
+);
+CREATE INDEX IF NOT EXISTS idx_embedding_jobs_status ON embedding_jobs (model, status);
+
+CREATE TABLE IF NOT EXISTS ingest_stats (
+    payload TEXT PRIMARY KEY,
+    chunks INTEGER NOT NULL,
+    duplicate_chunks INTEGER NOT NULL,
+    boilerplate_lines INTEGER NOT NULL,
+    boilerplate_chars INTEGER NOT NULL
+);
+"""
+
+# Columns of the ingest_stats table: what the ingest filters kept and left out of a payload
+INGEST_STATS_COLUMNS = ["chunks", "duplicate_chunks", "boilerplate_lines", "boilerplate_chars"]
+
+
+def page_offsets_from_file(text_path: str) -> List[Tuple[int, int, int]]:
+    """
+    Locate every page of an extracted text file by byte offset
+
+    Args:
+        text_path: Path to a text file with "--- Page N ---" markers
+
+    Returns:
+        List of (page_number, start_byte, end_byte); each span starts at the page's marker
+    """
+    with open(text_path, 'rb') as f:
+        data = f.read()
+
+    markers = list(PAGE_MARKER_BYTES_PATTERN.finditer(data))
+    offsets = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(data)
+        offsets.append((int(marker.group(1)), marker.start(), end))
+    return offsets
+
+
+class DocumentCatalog:
+    """Transactional SQLite catalog of documents, chunks and page offsets"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and if needed create) the catalog
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+
+        # One connection shared by the store's threads; access is serialized by self._lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+        # Catalogs created before chunk hashes were tracked get the column; their hashes are computed on demand
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(chunks)")}
+        if "text_hash" not in columns:
+            self.conn.execute("ALTER TABLE chunks ADD COLUMN text_hash TEXT")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of catalog writes atomically
+
+        Transactions nest: only the outermost block commits, so bulk operations
+        can wrap many single-document writes into one commit.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self.conn
+            except Exception:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a value from the meta table"""
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_meta(self, key: str, value: str):
+        """Write a value to the meta table"""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def generation(self) -> int:
+        """
+        Get the catalog's change counter
+
+        Every change that affects search results bumps the counter, so a process
+        can tell cheaply whether another process modified the catalog.
+
+        Returns:
+            Current generation number
+        """
+        return int(self.get_meta("generation", "0"))
+
+    def bump_generation(self):
+        """Record that searchable content changed"""
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                         "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    # Documents
+
+    def add_document(self, doc: Dict):
+        """
+        Insert or replace a document's metadata
+
+        Args:
+            doc: Document metadata dictionary (must include "payload")
+        """
+        values = [doc.get(column) for column in DOCUMENT_COLUMNS]
+        placeholders = ", ".join("?" for _ in DOCUMENT_COLUMNS)
+        with self.transaction() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO documents ({', '.join(DOCUMENT_COLUMNS)}) VALUES ({placeholders})",
+                         values)
+            self.bump_generation()
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        """
+        Get a document's metadata
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Document metadata dictionary, or None if not found
+        """
+        rows = self._query("SELECT * FROM documents WHERE id = ?", (document_id,))
+        return dict(rows[0]) if rows else None
+
+    def list_documents(self, agent_name: Optional[str] = None, document_type: Optional[str] = None) -> List[Dict]:
+        """
+        List documents, optionally filtered by agent and type (case-insensitive, indexed)
+
+        Args:
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+
+        Returns:
+            List of document metadata dictionaries in upload order
+        """
+        clauses, params = self._filters(agent_name, document_type)
+        return [dict(row) for row in self._query(f"SELECT * FROM documents{clauses} ORDER BY rowid", params)]
+
+    def payloads(self, agent_name: Optional[str] = None, document_type: Optional[str] = None) -> Set[str]:
+        """
+        Get the payload keys of the documents matching a filter
+
+        Args:
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+
+        Returns:
+            Set of payload keys
+        """
+        clauses, params = self._filters(agent_name, document_type)
+        return {row[0] for row in self._query(f"SELECT DISTINCT payload FROM documents{clauses}", params)}
+
+    def documents_for_payload(self, payload: str) -> List[Dict]:
+        """
+        Get every document that shares a payload, oldest first
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            List of document metadata dictionaries
+        """
+        return [dict(row) for row in self._query("SELECT * FROM documents WHERE payload = ? ORDER BY rowid", (payload,))]
+
+    def payload_for_content(self, content_hash: str) -> Optional[str]:
+        """
+        Find the payload that holds a PDF's content
+
+        Documents migrated from the JSON index keep their own ID as the payload key
+        even once their content hash is known, so the payload is looked up rather
+        than taken to be the hash.
+
+        Args:
+            content_hash: Content hash of the PDF
+
+        Returns:
+            Payload key, or None if no document has this content
+        """
+        rows = self._query("SELECT payload FROM documents WHERE content_hash = ? ORDER BY rowid LIMIT 1",
+                           (content_hash,))
+        return rows[0][0] if rows else None
+
+    def set_document_content(self, document_id: str, content_hash: Optional[str], payload: str, text_file: str,
+                             pages: int, char_count: int):
+        """
+        Point a document at the content it holds, keeping its place in upload order
+
+        Args:
+            document_id: Document ID
+            content_hash: Content hash of the PDF (None if unknown)
+            payload: Payload key
+            text_file: Path to the payload's extracted text file
+            pages: Number of pages
+            char_count: Number of characters of extracted text
+        """
+        with self.transaction() as conn:
+            conn.execute("UPDATE documents SET content_hash = ?, payload = ?, text_file = ?, pages = ?, char_count = ? "
+                         "WHERE id = ?", (content_hash, payload, text_file, pages, char_count, document_id))
+            self.bump_generation()
+
+    def payload_labels(self, payload: str) -> List[Tuple[str, str]]:
+        """
+        Get the (agent, type) pairs a payload is filed under
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            List of (agent, type) tuples
+        """
+        return [(row[0], row[1]) for row in
+                self._query("SELECT agent, type FROM documents WHERE payload = ? ORDER BY rowid", (payload,))]
+
+    def all_payload_labels(self) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Get the (agent, type) pairs of every payload in one query
+
+        Returns:
+            {payload: [(agent, type), ...]}
+        """
+        labels: Dict[str, List[Tuple[str, str]]] = {}
+        for row in self._query("SELECT payload, agent, type FROM documents ORDER BY rowid"):
+            labels.setdefault(row[0], []).append((row[1], row[2]))
+        return labels
+
+    def find_duplicate(self, content_hash: str, agent_name: str, document_type: str, title: str) -> Optional[str]:
+        """
+        Find a document with the same content, agent, type and title
+
+        Args:
+            content_hash: Content hash of the PDF
+            agent_name: Agent name
+            document_type: Document type
+            title: Document title
+
+        Returns:
+            Matching document ID, or None
+        """
+        rows = self._query("SELECT id FROM documents WHERE content_hash = ? AND agent = ? AND type = ? AND title = ?",
+                           (content_hash, agent_name, document_type, title))
+        return rows[0][0] if rows else None
+
+    def delete_document(self, document_id: str) -> bool:
+        """
+        Delete a document; its payload's chunks and pages are removed with the last reference
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            True if the payload is no longer referenced by any document
+        """
+        with self.transaction() as conn:
+            row = conn.execute("SELECT payload FROM documents WHERE id = ?", (document_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            self.bump_generation()
+            return self.release_payload(row[0])
+
+    def release_payload(self, payload: str) -> bool:
+        """
+        Remove a payload's chunks, pages, embedding jobs and ingest statistics if no document references it any more
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            True if the payload was unreferenced (and its rows were removed)
+        """
+        with self.transaction() as conn:
+            remaining = conn.execute("SELECT COUNT(*) FROM documents WHERE payload = ?", (payload,)).fetchone()[0]
+            if remaining == 0:
+                conn.execute("DELETE FROM chunks WHERE payload = ?", (payload,))
+                conn.execute("DELETE FROM pages WHERE payload = ?", (payload,))
+                conn.execute("DELETE FROM embedding_jobs WHERE payload = ?", (payload,))
+                conn.execute("DELETE FROM ingest_stats WHERE payload = ?", (payload,))
+            return remaining == 0
+
+    def count_documents(self) -> int:
+        """Number of documents in the catalog"""
+        return self._query("SELECT COUNT(*) FROM documents")[0][0]
+
+    @staticmethod
+    def _filters(agent_name: Optional[str], document_type: Optional[str]) -> Tuple[str, tuple]:
+        clauses, params = [], []
+        if agent_name:
+            clauses.append("agent = ?")
+            params.append(agent_name)
+        if document_type:
+            clauses.append("type = ?")
+            params.append(document_type)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    # Chunks
+
+    def set_chunks(self, payload: str, chunks: List[str], metadata: List[Dict]):
+        """
+        Replace the chunks stored for a payload
+
+        Args:
+            payload: Payload key
+            chunks: Chunk texts, in chunk order
+            metadata: Per-chunk dictionaries with "start", "end", "page" and "section" keys
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM chunks WHERE payload = ?", (payload,))
+            self.append_chunks(payload, 0, chunks, metadata)
+
+    def append_chunks(self, payload: str, first_index: int, chunks: List[str], metadata: List[Dict]):
+        """
+        Add a batch of chunks to a payload
+
+        Args:
+            payload: Payload key
+            first_index: Chunk index of the first chunk in the batch
+            chunks: Chunk texts, in chunk order
+            metadata: Per-chunk dictionaries with "start", "end", "page" and "section" keys
+        """
+        rows = [(payload, i, text, meta.get("start"), meta.get("end"), meta.get("page"), meta.get("section"),
+                 text_key(text))
+                for i, (text, meta) in enumerate(zip(chunks, metadata), start=first_index)]
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO chunks (payload, chunk_idx, text, start, end, page, section, text_hash) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def has_chunks(self, payload: str) -> bool:
+        """Whether chunks are stored for a payload"""
+        return bool(self._query("SELECT 1 FROM chunks WHERE payload = ? LIMIT 1", (payload,)))
+
+    def get_chunks(self, payload: str) -> Tuple[List[str], List[Dict]]:
+        """
+        Get all chunks of a payload
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            Tuple of (chunk_texts, chunk_metadata) in chunk order
+        """
+        rows = self._query("SELECT text, start, end, page, section FROM chunks WHERE payload = ? ORDER BY chunk_idx",
+                           (payload,))
+        return ([row["text"] for row in rows],
+                [{"start": row["start"], "end": row["end"], "page": row["page"], "section": row["section"]}
+                 for row in rows])
+
+    def chunk_hashes(self, payload: str) -> List[str]:
+        """
+        Get the text hash of every chunk of a payload
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            Hashes of the whitespace-normalized chunk texts, in chunk order
+        """
+        rows = self._query("SELECT text, text_hash FROM chunks WHERE payload = ? ORDER BY chunk_idx", (payload,))
+        return [row["text_hash"] or text_key(row["text"]) for row in rows]
+
+    def iter_chunk_batches(self, payload: str, batch_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+        """
+        Read a payload's chunks a batch at a time, so a large document is never held in memory at once
+
+        Args:
+            payload: Payload key
+            batch_size: Chunks per batch
+
+        Yields:
+            Tuples of (chunk_texts, text_hashes), in chunk order
+        """
+        last_index = -1
+        while True:
+            rows = self._query("SELECT chunk_idx, text, text_hash FROM chunks WHERE payload = ? AND chunk_idx > ? "
+                               "ORDER BY chunk_idx LIMIT ?", (payload, last_index, batch_size))
+            if not rows:
+                return
+            yield [row["text"] for row in rows], [row["text_hash"] or text_key(row["text"]) for row in rows]
+            last_index = rows[-1]["chunk_idx"]
+
+    def get_chunk_entries(self, payload: str, chunk_indices: List[int]) -> Dict[int, Dict]:
+        """
+        Get selected chunks of a payload
+
+        Args:
+            payload: Payload key
+            chunk_indices: Chunk indices to fetch
+
+        Returns:
+            {chunk_index: {"text", "start", "end", "page", "section"}}
+        """
+        if not chunk_indices:
+            return {}
+        placeholders = ", ".join("?" for _ in chunk_indices)
+        rows = self._query(f"SELECT chunk_idx, text, start, end, page, section FROM chunks "
+                           f"WHERE payload = ? AND chunk_idx IN ({placeholders})", (payload, *chunk_indices))
+        return {row["chunk_idx"]: {key: row[key] for key in ("text", "start", "end", "page", "section")}
+                for row in rows}
+
+    def chunk_count(self, payload: str) -> int:
+        """Number of chunks stored for a payload"""
+        return self._query("SELECT COUNT(*) FROM chunks WHERE payload = ?", (payload,))[0][0]
+
+    # Pages
+
+    def set_pages(self, payload: str, offsets: List[Tuple[int, int, int]]):
+        """
+        Replace the page offset table of a payload
+
+        Args:
+            payload: Payload key
+            offsets: List of (page_number, start_byte, end_byte)
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM pages WHERE payload = ?", (payload,))
+            conn.executemany("INSERT OR REPLACE INTO pages (payload, page, start_byte, end_byte) VALUES (?, ?, ?, ?)",
+                             [(payload, page, start, end) for page, start, end in offsets])
+
+    def get_pages(self, payload: str) -> List[Tuple[int, int, int]]:
+        """
+        Get the page offset table of a payload
+
+        Args:
+            payload: Payload key
+
+        Returns:
+            List of (page_number, start_byte, end_byte) in page order
+        """
+        return [(row[0], row[1], row[2]) for row in
+                self._query("SELECT page, start_byte, end_byte FROM pages WHERE payload = ? ORDER BY page", (payload,))]
+
+    def page_span(self, payload: str, start_page: int, end_page: int) -> Optional[Tuple[int, int]]:
+        """
+        Get the byte span covering a range of pages
+
+        Args:
+            payload: Payload key
+            start_page: First page (1-based)
+            end_page: Last page, inclusive
+
+        Returns:
+            (start_byte, end_byte), or None if no page falls in the range
+        """
+        rows = self._query("SELECT MIN(start_byte), MAX(end_byte) FROM pages WHERE payload = ? AND page BETWEEN ? AND ?",
+                           (payload, start_page, end_page))
+        return (rows[0][0], rows[0][1]) if rows and rows[0][0] is not None else None
+
+    # Ingest statistics
+
+    def set_ingest_stats(self, payload: str, stats: Dict[str, int]):
+        """
+        Record what the ingest filters kept and left out of a payload, replacing its earlier statistics
+
+        Args:
+            payload: Payload key
+            stats: Counts keyed by INGEST_STATS_COLUMNS
+        """
+        with self.transaction() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO ingest_stats (payload, {', '.join(INGEST_STATS_COLUMNS)}) "
+                         f"VALUES (?, {', '.join('?' for _ in INGEST_STATS_COLUMNS)})",
+                         [payload] + [stats[column] for column in INGEST_STATS_COLUMNS])
+
+    def ingest_totals(self) -> Dict[str, int]:
+        """
+        Sum the ingest statistics of every stored payload
+
+        Returns:
+            Totals keyed by INGEST_STATS_COLUMNS
+        """
+        row = self._query(f"SELECT {', '.join(f'COALESCE(SUM({column}), 0)' for column in INGEST_STATS_COLUMNS)} "
+                          f"FROM ingest_stats")[0]
+        return dict(zip(INGEST_STATS_COLUMNS, row))
+
+    # Embedding jobs
+
+    def enqueue_embedding_job(self, payload: str, model: str):
+        """
+        Queue a payload for background embedding (re-queues a finished or failed job)
+
+        Args:
+            payload: Payload key
+            model: Embedding model name
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO embedding_jobs (payload, model, status, worker, error, queued_at, "
+                         "updated_at) VALUES (?, ?, 'queued', NULL, NULL, ?, ?)", (payload, model, now, now))
+
+    def claim_embedding_job(self, model: str, worker: str) -> Optional[str]:
+        """
+        Take the oldest queued job for a model and mark it as running
+
+        Claiming happens in one write transaction, so two workers (in any process)
+        never take the same job.
+
+        Args:
+            model: Embedding model name
+            worker: Identifier of the claiming worker
+
+        Returns:
+            Payload key of the claimed job, or None if the queue is empty
+        """
+        with self.transaction() as conn:
+            row = conn.execute("SELECT payload FROM embedding_jobs WHERE model = ? AND status = 'queued' "
+                               "ORDER BY queued_at, rowid LIMIT 1", (model,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE embedding_jobs SET status = 'running', worker = ?, updated_at = ? "
+                         "WHERE payload = ? AND model = ?",
+                         (worker, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), row[0], model))
+            return row[0]
+
+    def finish_embedding_job(self, payload: str, model: str, error: Optional[str] = None):
+        """
+        Mark a running job as done, or as failed with an error message
+
+        Args:
+            payload: Payload key
+            model: Embedding model name
+            error: Error message if the job failed
+        """
+        with self.transaction() as conn:
+            conn.execute("UPDATE embedding_jobs SET status = ?, error = ?, updated_at = ? WHERE payload = ? AND model = ?",
+                         ("failed" if error else "done", error, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          payload, model))
+
+    def requeue_embedding_jobs(self, model: str, is_alive) -> int:
+        """
+        Put running jobs whose worker is gone back in the queue
+
+        Args:
+            model: Embedding model name
+            is_alive: Callable taking a worker identifier and returning whether it still runs
+
+        Returns:
+            Number of jobs re-queued
+        """
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT payload, worker FROM embedding_jobs WHERE model = ? AND status = 'running'",
+                                (model,)).fetchall()
+            stale = [row[0] for row in rows if not is_alive(row[1])]
+            conn.executemany("UPDATE embedding_jobs SET status = 'queued', worker = NULL WHERE payload = ? AND model = ?",
+                             [(payload, model) for payload in stale])
+            return len(stale)
+
+    def embedding_jobs(self, model: str) -> Dict[str, Dict]:
+        """
+        Get the embedding job of every payload that has one
+
+        Args:
+            model: Embedding model name
+
+        Returns:
+            {payload: {"status", "error", "queued_at", "updated_at"}}
+        """
+        return {row[0]: {"status": row[1], "error": row[2], "queued_at": row[3], "updated_at": row[4]}
+                for row in self._query("SELECT payload, status, error, queued_at, updated_at FROM embedding_jobs "
+                                       "WHERE model = ?", (model,))}
+
+    def pending_embedding_jobs(self, model: str) -> int:
+        """Number of queued or running jobs for a model"""
+        return self._query("SELECT COUNT(*) FROM embedding_jobs WHERE model = ? AND status IN ('queued', 'running')",
+                           (model,))[0][0]
+
+    # Migration
+
+    def import_json_index(self, index_file: str, chunks_dir: str, resolve_text_path) -> int:
+        """
+        Import a legacy document_index.json (and any per-payload chunk files) into the catalog
+
+        The import runs in one transaction and is recorded in the meta table, so it
+        happens exactly once even if every imported document is later deleted.
+
+        Args:
+            index_file: Path to document_index.json
+            chunks_dir: Directory of legacy <payload>.json chunk files
+            resolve_text_path: Callable mapping a document dictionary to its text file path
+
+        Returns:
+            Number of documents imported
+        """
+        with open(index_file, 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+
+        with self.transaction():
+            for doc in documents.values():
+                doc = dict(doc)
+                doc["payload"] = doc.get("content_hash") or doc["id"]
+                self.add_document(doc)
+
+                payload = doc["payload"]
+                chunk_path = os.path.join(chunks_dir, f"{payload}.json")
+                if os.path.exists(chunk_path) and not self.has_chunks(payload):
+                    with open(chunk_path, 'r', encoding='utf-8') as f:
+                        chunk_data = json.load(f)
+                    self.set_chunks(payload, chunk_data["chunks"], chunk_data["chunk_metadata"])
+
+                if not self.get_pages(payload):
+                    try:
+                        self.set_pages(payload, page_offsets_from_file(resolve_text_path(doc)))
+                    except OSError as e:
+                        logging.warning(f"Could not index pages of {doc['id']}: {str(e)}")
+
+            self.set_meta("json_index_imported", index_file)
+
+        return len(documents)
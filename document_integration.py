@@ -2,9 +2,15 @@ import os
 import logging
 import re
 from typing import List, Dict, Optional
-from document_retrieval import DocumentStore, get_document_context_for_prompt
+from document_retrieval import DocumentStore, get_document_store, get_document_context_for_prompt
+from context_packer import pack_context
 from debate_system import DebateAgent
 
+CONCLUSION_MAX_RESULTS = 5  # Documents retrieved for an agent's final position
+RESPONSE_MAX_RESULTS = 5  # Documents retrieved for each debate response
+RESPONSE_CONTEXT_TOKENS = 500  # Token budget of the document context added to a response prompt
+CONCLUSION_CONTEXT_TOKENS = 900  # Token budget of the document context added to a final position prompt
+
 class DocumentEnabledDebateAgent(DebateAgent):
     """Extension of DebateAgent with document retrieval capabilities"""
     
@@ -22,14 +28,18 @@ class DocumentEnabledDebateAgent(DebateAgent):
         """
         super().__init__(name, personality, agent_config_key, config)
         
-        # Initialize document store if not provided
+        # Use the process-wide shared store if none is provided, loading this agent's index shards
         if document_store is None:
-            self.document_store = DocumentStore()
+            self.document_store = get_document_store(agents=[name])
         else:
             self.document_store = document_store
         
         # Track document usage for transparency
         self.last_used_documents = []
+        self.last_context_tokens = 0
+        
+        # Agents whose conclusion searches are batched with this agent's
+        self.conclusion_peers = [self]
             
         logging.info(f"Initialized document-enabled agent {name}")
     
@@ -108,32 +118,31 @@ class DocumentEnabledDebateAgent(DebateAgent):
         search_results = self.document_store.search_documents(
             query=search_query,
             agent_name=agent_name,
-            max_results=3
+            max_results=RESPONSE_MAX_RESULTS
         )
         
         if not search_results:
+            self.last_context_tokens = 0
             return "", used_documents
         
-        # Format the context string
-        context_parts = [
-            "Based on your policy documents, consider these relevant points when formulating your response:"
-        ]
+        # Keep the most useful, non-redundant snippets that fit the prompt budget
+        packed = pack_context(
+            search_results,
+            RESPONSE_CONTEXT_TOKENS,
+            header="Based on your policy documents, consider these relevant points when formulating your response:"
+        )
+        self.last_context_tokens = packed["tokens"]
         
-        for result in search_results:
-            # Extract page numbers from snippets if available
-            page_numbers = []
-            for snippet in result['snippets']:
-                page_match = re.search(r"--- Page (\d+) ---", snippet)
-                if page_match:
-                    page_numbers.append(page_match.group(1))
+        # Only documents with a snippet in the context are cited
+        for result in packed["documents"]:
+            # Page numbers of the snippets, as recorded by the search index
+            page_numbers = self._result_pages(result)
             
             # Get a representative quote from the first snippet
             representative_quote = ""
             if result['snippets']:
                 # Clean up the snippet to get a good quote
                 clean_snippet = result['snippets'][0].replace("\n", " ").strip()
-                # Remove page markers
-                clean_snippet = re.sub(r"--- Page \d+ ---", "", clean_snippet)
                 # Get a short, representative quote
                 if len(clean_snippet) > 50:
                     words = clean_snippet.split()
@@ -145,15 +154,7 @@ class DocumentEnabledDebateAgent(DebateAgent):
                     representative_quote = clean_snippet
             
             # Identify document section if possible
-            section = "unspecified section"
-            for snippet in result['snippets']:
-                # Try to identify section headers
-                section_match = re.search(r"([A-Z][A-Z\s]+:)|(\bI{1,3}\.|\bIV\.|\bV\.|\bVI\.|\bVII\.|\bVIII\.|\bIX\.|\bX\.)", snippet)
-                if section_match:
-                    potential_section = section_match.group(0)
-                    if len(potential_section) > 3 and len(potential_section) < 50:
-                        section = potential_section
-                        break
+            section = self._result_section(result)
             
             # Track which documents were used with more details
             used_documents.append({
@@ -164,18 +165,35 @@ class DocumentEnabledDebateAgent(DebateAgent):
                 "section": section,
                 "quote": representative_quote
             })
+        
+        return packed["text"], used_documents
+    
+    def _result_pages(self, result: Dict) -> List[str]:
+        """
+        Get the distinct page numbers a search result's snippets come from
+        
+        Args:
+            result: Search result from the document store
             
-            for snippet in result['snippets'][:2]:  # Limit to 2 snippets per document
-                # Clean and format the snippet
-                clean_snippet = snippet.replace("\n", " ").strip()
-                # Remove page markers for cleaner presentation
-                clean_snippet = re.sub(r"--- Page \d+ ---", "", clean_snippet)
-                if len(clean_snippet) > 300:
-                    clean_snippet = clean_snippet[:300] + "..."
-                
-                context_parts.append(f"• {clean_snippet} (Source: {result['title']})")
+        Returns:
+            Page numbers as strings, in snippet order
+        """
+        return list(dict.fromkeys(str(page) for page in result.get('pages', []) if page))
+    
+    def _result_section(self, result: Dict) -> str:
+        """
+        Get the section of the first snippet of a search result that has one
         
-        return "\n".join(context_parts), used_documents
+        Args:
+            result: Search result from the document store
+            
+        Returns:
+            Section header, or "unspecified section"
+        """
+        for section in result.get('sections', []):
+            if section and 3 < len(section) < 50:
+                return section
+        return "unspecified section"
     
     def _format_citations(self) -> str:
         """Format document citations for inclusion in response with concrete details"""
@@ -252,6 +270,9 @@ class DocumentEnabledDebateAgent(DebateAgent):
             # Extract topic
             topic = self._extract_topic(context)
             
+            # Search for all peers at once, so this and the later conclusions come from the result cache
+            prefetch_conclusion_searches(self.conclusion_peers, context)
+            
             # Get comprehensive document context for conclusion and track documents
             doc_context, used_documents = self._get_comprehensive_context_with_tracking(topic)
             
@@ -308,28 +329,31 @@ class DocumentEnabledDebateAgent(DebateAgent):
             search_results = self.document_store.search_documents(
                 query=topic,
                 agent_name=self.name,
-                max_results=5
+                max_results=CONCLUSION_MAX_RESULTS
             )
             
             if not search_results:
+                self.last_context_tokens = 0
                 return "", used_documents
             
+            # Keep the most useful, non-redundant snippets that fit the prompt budget
+            packed = pack_context(
+                search_results,
+                CONCLUSION_CONTEXT_TOKENS,
+                header="Based on your official policy documents, consider these key points for your final position:"
+            )
+            self.last_context_tokens = packed["tokens"]
+            
             # Track which documents were used with enhanced details
-            for result in search_results:
-                # Extract page numbers from snippets if available
-                page_numbers = []
-                for snippet in result['snippets']:
-                    page_match = re.search(r"--- Page (\d+) ---", snippet)
-                    if page_match:
-                        page_numbers.append(page_match.group(1))
+            for result in packed["documents"]:
+                # Page numbers of the snippets, as recorded by the search index
+                page_numbers = self._result_pages(result)
                 
                 # Get multiple representative quotes (up to 3)
                 representative_quotes = []
                 for snippet in result['snippets'][:3]:
                     # Clean up the snippet to get a good quote
                     clean_snippet = snippet.replace("\n", " ").strip()
-                    # Remove page markers
-                    clean_snippet = re.sub(r"--- Page \d+ ---", "", clean_snippet)
                     # Get a short, representative quote
                     if len(clean_snippet) > 50:
                         # Find a complete sentence if possible
@@ -346,15 +370,7 @@ class DocumentEnabledDebateAgent(DebateAgent):
                         representative_quotes.append(clean_snippet)
                 
                 # Identify document section if possible
-                section = "unspecified section"
-                for snippet in result['snippets']:
-                    # Try to identify section headers
-                    section_match = re.search(r"([A-Z][A-Z\s]+:)|(\bI{1,3}\.|\bIV\.|\bV\.|\bVI\.|\bVII\.|\bVIII\.|\bIX\.|\bX\.)", snippet)
-                    if section_match:
-                        potential_section = section_match.group(0)
-                        if len(potential_section) > 3 and len(potential_section) < 50:
-                            section = potential_section
-                            break
+                section = self._result_section(result)
                 
                 used_documents.append({
                     "title": result['title'],
@@ -366,34 +382,7 @@ class DocumentEnabledDebateAgent(DebateAgent):
                     "quotes": representative_quotes
                 })
             
-            # Format comprehensive context
-            context_parts = [
-                "Based on your official policy documents, consider these key points for your final position:"
-            ]
-            
-            for result in search_results:
-                # Add document title, type, and page information
-                page_info = ""
-                for snippet in result['snippets']:
-                    page_match = re.search(r"--- Page (\d+) ---", snippet)
-                    if page_match:
-                        page_info = f" (p. {page_match.group(1)})"
-                        break
-                
-                context_parts.append(f"\nFrom {result['title']} ({result['type']}){page_info}:")
-                
-                # Add snippets
-                for snippet in result['snippets'][:3]:  # Up to 3 snippets per document
-                    # Clean and format snippet
-                    clean_snippet = snippet.replace("\n", " ").strip()
-                    # Remove page markers
-                    clean_snippet = re.sub(r"--- Page \d+ ---", "", clean_snippet)
-                    if len(clean_snippet) > 400:
-                        clean_snippet = clean_snippet[:400] + "..."
-                    
-                    context_parts.append(f"• {clean_snippet}")
-            
-            return "\n".join(context_parts), used_documents
+            return packed["text"], used_documents
         except Exception as e:
             logging.error(f"Error getting comprehensive context: {str(e)}")
             return "", used_documents
@@ -465,11 +454,14 @@ def create_document_enabled_agents(config: dict, document_store: Optional[Docume
     Returns:
         List of DocumentEnabledDebateAgent instances
     """
+    agent_configs = config.get('agents', {})
     if document_store is None:
-        document_store = DocumentStore()
+        # Only the index shards of the delegations taking part are loaded
+        document_store = get_document_store(
+            agents=[agent_config['name'] for agent_config in agent_configs.values() if 'name' in agent_config]
+        )
     
     agents = []
-    agent_configs = config.get('agents', {})
     
     for agent_key, agent_config in agent_configs.items():
         try:
@@ -485,8 +477,40 @@ def create_document_enabled_agents(config: dict, document_store: Optional[Docume
         except Exception as e:
             logging.error(f"Error creating document-enabled agent {agent_key}: {str(e)}")
     
+    # The first agent to conclude runs the conclusion searches of all of them in one batch
+    for agent in agents:
+        agent.conclusion_peers = agents
+    
     return agents
 
+def prefetch_conclusion_searches(agents: List[DebateAgent], context: str):
+    """
+    Run the conclusion searches of several agents in one batched pass
+    
+    Each document-enabled agent searches its own documents for the debate topic when
+    it writes its conclusion. generate_conclusion calls this for the agent's conclusion
+    peers first, which retrieves for all of them with a single search_many call per
+    store, so their own searches are then answered from the store's result cache.
+    
+    Args:
+        agents: Debate agents about to generate conclusions (agents without documents are ignored)
+        context: Conversation context the conclusions will be generated from
+    """
+    stores = {}
+    for agent in agents:
+        if isinstance(agent, DocumentEnabledDebateAgent) and agent.document_store.get_document_list(agent.name):
+            stores.setdefault(id(agent.document_store), (agent.document_store, []))[1].append(agent)
+    
+    for document_store, store_agents in stores.values():
+        try:
+            document_store.search_many(
+                [agent._extract_topic(context) for agent in store_agents],
+                [agent.name for agent in store_agents],
+                max_results=CONCLUSION_MAX_RESULTS
+            )
+        except Exception as e:
+            logging.error(f"Error prefetching conclusion searches: {str(e)}")
+
 # Example of how to use this in the main application
 if __name__ == "__main__":
     # Set up logging
@@ -505,8 +529,8 @@ if __name__ == "__main__":
         logging.error(f"Error loading config: {str(e)}")
         config = {}
     
-    # Create document store
-    document_store = DocumentStore()
+    # Get the shared document store
+    document_store = get_document_store()
     
     # Create document-enabled agents
     agents = create_document_enabled_agents(config, document_store)
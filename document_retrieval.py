@@ -1,54 +1,331 @@
 import os
 import re
 import logging
-from typing import Dict, List, Optional, Tuple
-import PyPDF2
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import json
+import hashlib
 from pathlib import Path
 import numpy as np
 import tempfile
+import time
+import fnmatch
+import glob
+import copy
+import shutil
+import functools
+import threading
+import importlib.util
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from vector_index import normalize_rows
+from index_shards import ShardedKeywordIndex, ShardedVectorIndex, shard_key
+from document_catalog import DocumentCatalog, page_offsets_from_file
+from embedding_worker import EmbeddingWorker
+from embedding_scheduler import EncodingScheduler
+from embedding_cache import EmbeddingCache, text_key
+from ingest_filters import BoilerplateDetector, NearDuplicateFilter, BOILERPLATE_SAMPLE_PAGES
+from context_packer import pack_context, CONTEXT_TOKEN_BUDGET
 
 # Configuration for semantic search
 ENABLE_SEMANTIC_SEARCH = True  # Set to False to disable semantic search
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Model for creating embeddings
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Model for new corpora; an existing catalog keeps its model until re-embedded
 SEMANTIC_CHUNK_SIZE = 300  # Characters per chunk for semantic indexing
 SIMILARITY_THRESHOLD = 0.5  # Minimum similarity score for semantic matches
+MIN_CHUNK_LENGTH = 20  # Chunks this short or shorter are dropped
+STRIP_BOILERPLATE = True  # Leave running headers and footers (repeated across a document's pages) out of chunks
+DROP_NEAR_DUPLICATE_CHUNKS = True  # Drop chunks that nearly repeat an earlier chunk of the same document
+BULK_EMBED_FLUSH_CHUNKS = 512  # Chunks buffered across documents before bulk ingestion encodes them
+STREAM_BATCH_CHUNKS = 64  # Chunks held in memory at once while a document is streamed in
+BACKGROUND_EMBEDDING = True  # Uploads queue their embeddings for a background worker instead of encoding inline
+ENABLE_EMBEDDING_CACHE = True  # Reuse embeddings of chunk texts seen before instead of re-encoding them
+
+# Patterns used while chunking extracted text
+PAGE_MARKER_PATTERN = re.compile(r'--- Page (\d+) ---')
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n\s*\n')
+SENTENCE_BREAK_PATTERN = re.compile(r'(?<=[.!?])\s+')
+SECTION_HEADER_PATTERN = re.compile(r'([A-Z][A-Z\s]+:)|(\bI{1,3}\.|\bIV\.|\bV\.|\bVI\.|\bVII\.|\bVIII\.|\bIX\.|\bX\.)')
+CATALOG_FILE = "catalog.db"  # SQLite catalog of documents, chunks and page offsets
+EMBEDDINGS_DIR = "embeddings"  # Subdirectory of the documents dir holding persisted embeddings
+EMBEDDING_SET_FILE = "embedding_set.json"  # Model name and dimension of an embedding set
+EMBEDDING_CACHE_FILE = "embedding_cache.db"  # SQLite cache of chunk embeddings keyed by model and chunk text hash
+CHUNKS_DIR = "chunks"  # Legacy per-document chunk files, imported into the catalog on first open
+KEYWORD_INDEX_DIR = "keyword_index"  # Subdirectory holding BM25 postings for each document
+ANN_INDEX_MODE = "ivf"  # "ivf" for approximate search on large corpora, "exact" to always brute-force
+ANN_MIN_ROWS = 20000  # Corpora with fewer chunks than this are always searched exactly
+ANN_NPROBE = 8  # IVF lists probed per query: raise for recall, lower for latency
+VECTOR_STORAGE = "int8"  # In-memory embedding matrix: "float32", "float16" or "int8" (candidates are rescored in float32)
+QUERY_CACHE_SIZE = 256  # Query embeddings kept in the LRU cache (debates re-ask the same topic every turn)
+RESULT_CACHE_SIZE = 512  # Search result sets kept in the LRU cache, invalidated whenever the corpus changes
+SEARCH_MODE = "hybrid"  # "hybrid" fuses keyword and semantic rankings, "semantic" falls back to keyword, "keyword" only
+RRF_K = 60  # Reciprocal-rank fusion constant: higher values flatten the advantage of top ranks
+
+# Optional: if available in the environment - for vector embeddings. Only the
+# presence of the package is checked here; torch and sentence-transformers are
+# imported when the model is first needed, so commands that never embed start fast.
+EMBEDDINGS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None and ENABLE_SEMANTIC_SEARCH
+
+# Process-wide registry: one embedding model per model name and one store per documents directory
+_shared_models = {}
+_shared_models_lock = threading.Lock()
+_document_stores = {}
+_document_stores_lock = threading.Lock()
+
+
+def get_shared_model(model_name: str = EMBEDDING_MODEL):
+    """
+    Get the process-wide embedding model, loading it on first use
+    
+    Args:
+        model_name: Name of the sentence-transformers model
+        
+    Returns:
+        SentenceTransformer instance, or None if it is unavailable or failed to load
+    """
+    if not EMBEDDINGS_AVAILABLE:
+        return None
+    
+    if model_name not in _shared_models:
+        with _shared_models_lock:
+            if model_name not in _shared_models:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    started = time.time()
+                    _shared_models[model_name] = SentenceTransformer(model_name)
+                    logging.info(f"Initialized sentence embeddings model '{model_name}' for semantic search "
+                                 f"in {time.time() - started:.1f}s")
+                except Exception as e:
+                    logging.error(f"Failed to load embedding model: {str(e)}")
+                    # Remember the failure so every caller doesn't retry the load
+                    _shared_models[model_name] = None
+    return _shared_models[model_name]
+
+
+def get_document_store(documents_dir: str = "agent_documents",
+                       enable_semantic_search: bool = ENABLE_SEMANTIC_SEARCH,
+                       agents: Optional[Iterable[str]] = None) -> "DocumentStore":
+    """
+    Get the process-wide DocumentStore for a documents directory, creating it on first use
+    
+    Every caller that asks for the same directory shares one store (and its
+    indexes), and all stores share one embedding model. A store opened for some
+    agents loads the index shards of the agents later callers ask for.
+    
+    Args:
+        documents_dir: Directory to store uploaded documents and metadata
+        enable_semantic_search: Whether to enable semantic search capabilities
+        agents: Agents whose index shards must be loaded (None loads every agent)
+        
+    Returns:
+        DocumentStore instance
+    """
+    key = (os.path.abspath(documents_dir), enable_semantic_search)
+    with _document_stores_lock:
+        if key not in _document_stores:
+            _document_stores[key] = DocumentStore(documents_dir, enable_semantic_search, agents)
+            return _document_stores[key]
+        store = _document_stores[key]
+    store.load_agents(agents)
+    return store
+
+
+def _synchronized(method):
+    """Run a DocumentStore method while holding the store's lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """
+    Extract the text of a PDF file one page at a time
+    
+    Args:
+        file_path: Path to the PDF file
+        
+    Yields:
+        Page texts, in page order
+    """
+    import PyPDF2  # Imported here so processes that never read PDFs don't pay for it
+    
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+
+def _extract_pdf_pages(file_path: str) -> List[str]:
+    """
+    Extract the text of every page of a PDF file
+    
+    Defined at module level so it can run in a worker process.
+    
+    Args:
+        file_path: Path to the PDF file
+        
+    Returns:
+        List of page texts, in page order
+    """
+    return list(_iter_pdf_pages(file_path))
+
+
+def _hash_file(file_path: str) -> str:
+    """
+    Compute the SHA-256 content hash of a file
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_embedding_matrix(raw_path: str, matrix_path: str, rows: int, dimension: int):
+    """
+    Turn float32 embedding rows appended to a raw file into an .npy matrix
+    
+    The rows are copied behind an .npy header in blocks, so the matrix is never
+    loaded into memory, and the matrix file is replaced atomically.
+    
+    Args:
+        raw_path: File holding the rows back to back
+        matrix_path: Path of the .npy file to write
+        rows: Number of rows in the raw file
+        dimension: Embedding dimension
+    """
+    with open(f"{matrix_path}.tmp", 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (rows, dimension)
+        })
+        with open(raw_path, 'rb') as raw_file:
+            shutil.copyfileobj(raw_file, f)
+    os.replace(f"{matrix_path}.tmp", matrix_path)
+
+
+def _ingest_savings(boilerplate: BoilerplateDetector, 
+                    duplicates: Optional[NearDuplicateFilter], 
+                    chunk_count: int) -> Dict[str, int]:
+    """
+    Summarize what the ingest filters kept and left out of one document
+    
+    Args:
+        boilerplate: Header/footer detector used for the document
+        duplicates: Near-duplicate filter used for the document, if any
+        chunk_count: Number of chunks kept
+        
+    Returns:
+        Dictionary with chunks, duplicate_chunks, boilerplate_lines and boilerplate_chars counts
+    """
+    return {
+        "chunks": chunk_count,
+        "duplicate_chunks": duplicates.dropped if duplicates else 0,
+        "boilerplate_lines": boilerplate.stripped_lines,
+        "boilerplate_chars": boilerplate.stripped_chars
+    }
+
+
+def _reciprocal_rank_fusion(rankings: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fuse several rankings of the same items with reciprocal-rank fusion
+    
+    Each item scores the sum of 1 / (RRF_K + rank) over the rankings it appears in.
+    
+    Args:
+        rankings: One (int64 item keys, scores) pair per method, each sorted best first
+    
+    Returns:
+        Tuple of (item keys, fused scores, per-method scores) sorted by descending fused score;
+        the per-method array has one row per ranking, with NaN where a method missed the item
+    """
+    keys = np.concatenate([item_keys for item_keys, _ in rankings]).astype(np.int64)
+    ranks = np.concatenate([np.arange(1, len(item_keys) + 1) for item_keys, _ in rankings])
+    unique, inverse = np.unique(keys, return_inverse=True)
+    fused = np.bincount(inverse, weights=1.0 / (RRF_K + ranks), minlength=len(unique))
+    
+    method_scores = np.full((len(rankings), len(unique)), np.nan)
+    start = 0
+    for method, (item_keys, scores) in enumerate(rankings):
+        method_scores[method, inverse[start:start + len(item_keys)]] = scores
+        start += len(item_keys)
+    
+    order = np.argsort(-fused, kind="stable")
+    return unique[order], fused[order], method_scores[:, order]
 
-# Optional: if available in the environment - for vector embeddings
-try:
-    import torch
-    from sentence_transformers import SentenceTransformer
-    EMBEDDINGS_AVAILABLE = True and ENABLE_SEMANTIC_SEARCH
-except ImportError:
-    EMBEDDINGS_AVAILABLE = False
 
 class DocumentStore:
     """Manages document storage and retrieval for debate agents"""
     
-    def __init__(self, documents_dir: str = "agent_documents", enable_semantic_search: bool = ENABLE_SEMANTIC_SEARCH):
+    def __init__(self, 
+                 documents_dir: str = "agent_documents", 
+                 enable_semantic_search: bool = ENABLE_SEMANTIC_SEARCH, 
+                 agents: Optional[Iterable[str]] = None):
         """
         Initialize the document store
         
         Args:
             documents_dir: Directory to store uploaded documents and metadata
             enable_semantic_search: Whether to enable semantic search capabilities
+            agents: Agents whose index shards are loaded (None loads every agent); searches
+                for another agent load its shards first
         """
         self.documents_dir = documents_dir
+        # Legacy JSON index, migrated into the catalog the first time the store opens
         self.index_file = os.path.join(documents_dir, "document_index.json")
-        self.document_data = {}
+        # Embeddings are kept per model so vectors from different models never get mixed;
+        # the active model is recorded in the catalog (see _load_index)
+        self.embedding_model = EMBEDDING_MODEL
+        self.embeddings_dir = self._embeddings_dir(EMBEDDING_MODEL)
+        self.ann_file = os.path.join(self.embeddings_dir, "ivf_index.npz")
+        self.chunks_dir = os.path.join(documents_dir, CHUNKS_DIR)
+        self.catalog = None
+        self.catalog_generation = None
+        # The keyword and vector indexes are sharded by agent, and only the shards of the selected agents are loaded
+        self.agents = {shard_key(agent) for agent in agents} if agents is not None else None
+        self.keyword_index = ShardedKeywordIndex(os.path.join(documents_dir, KEYWORD_INDEX_DIR), self.agents)
         self.vector_db = {}
-        self.model = None
+        self.vector_index = ShardedVectorIndex(self.agents, ann_mode=ANN_INDEX_MODE, ann_min_rows=ANN_MIN_ROWS,
+                                               nprobe=ANN_NPROBE, storage=VECTOR_STORAGE)
         self.enable_semantic_search = enable_semantic_search
         
-        # Initialize embedding model if available and enabled
-        if EMBEDDINGS_AVAILABLE and self.enable_semantic_search:
-            try:
-                self.model = SentenceTransformer(EMBEDDING_MODEL)
-                logging.info(f"Initialized sentence embeddings model '{EMBEDDING_MODEL}' for semantic search")
-            except Exception as e:
-                logging.error(f"Failed to load embedding model: {str(e)}")
-                self.model = None
+        # The embedding model is shared process-wide and loaded on first use (see the model property)
+        self._model = None
+        
+        # Background worker that embeds uploaded documents, started by the first upload that queues a job
+        self.embedding_worker = None
+        
+        # Set when embedding jobs are waiting as the store opens (see _queue_missing_embeddings);
+        # the first search that can use embeddings starts working them off
+        self.resume_embedding = False
+        
+        # Background worker that re-embeds the corpus with another model (see reembed)
+        self.migration_worker = None
+        
+        # Every chunk encoding goes through the length-bucketed scheduler, which also tracks throughput
+        self.encoder = EncodingScheduler()
+        
+        # Serializes operations that touch the in-memory indexes, so one store can serve several threads
+        self._lock = threading.RLock()
+        
+        # LRU cache of query embeddings: (model name, normalized query) -> embedding
+        self.query_cache = OrderedDict()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        
+        # LRU cache of search results: (catalog generation, normalized search arguments) -> results
+        self.result_cache = OrderedDict()
+        self.result_cache_hits = 0
+        self.result_cache_misses = 0
         
         # Create documents directory if it doesn't exist
         os.makedirs(documents_dir, exist_ok=True)
@@ -57,29 +334,466 @@ class DocumentStore:
         for agent in ["United_States", "European_Union", "Peoples_Republic_of_China"]:
             os.makedirs(os.path.join(documents_dir, agent), exist_ok=True)
         
-        # Load existing document index if it exists
+        # Chunk embeddings are cached by text, so repeated boilerplate and re-ingested documents are not re-encoded
+        if enable_semantic_search and ENABLE_EMBEDDING_CACHE:
+            self.encoder.cache = EmbeddingCache(os.path.join(documents_dir, EMBEDDING_CACHE_FILE))
+        
+        # Open the catalog and load the search indexes
         self._load_index()
     
+    @property
+    def model(self):
+        """
+        Sentence embedding model, loaded the first time an operation needs it
+            
+        Returns:
+            SentenceTransformer instance, or None if semantic search is unavailable or disabled
+        """
+        if self._model is None and self.enable_semantic_search:
+            self._model = get_shared_model(self.embedding_model)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def model_for(self, model_name: str):
+        """
+        Get the embedding model with the given name
+        
+        Args:
+            model_name: Name of the sentence-transformers model
+            
+        Returns:
+            The store's model for the active model name, otherwise the shared instance (or None)
+        """
+        if model_name == self.embedding_model:
+            return self.model
+        return get_shared_model(model_name) if self.enable_semantic_search else None
+    
     def _load_index(self):
-        """Load document index from disk"""
-        if os.path.exists(self.index_file):
+        """Open the document catalog, migrating the legacy JSON index, and load the search indexes"""
+        self.catalog = DocumentCatalog(os.path.join(self.documents_dir, CATALOG_FILE))
+        
+        if os.path.exists(self.index_file) and self.catalog.get_meta("json_index_imported") is None:
+            try:
+                imported = self.catalog.import_json_index(self.index_file, self.chunks_dir, self._resolve_text_path)
+                logging.info(f"Migrated {imported} documents from {self.index_file} into the catalog")
+            except Exception as e:
+                logging.error(f"Failed to migrate document index: {str(e)}")
+        
+        if self.catalog.get_meta("legacy_content_hashed") is None:
+            try:
+                self._hash_legacy_documents()
+            except Exception as e:
+                logging.error(f"Failed to deduplicate migrated documents: {str(e)}")
+        
+        logging.info(f"Loaded {self.catalog.count_documents()} documents from catalog")
+        
+        # The catalog records which model produced the stored vectors; queries must use the same one
+        active_model = self.catalog.get_meta("embedding_model")
+        if active_model is None:
+            self.catalog.set_meta("embedding_model", EMBEDDING_MODEL)
+        elif active_model != EMBEDDING_MODEL:
+            logging.warning(f"Stored embeddings were made with '{active_model}', not '{EMBEDDING_MODEL}'; "
+                            f"run 'reembed --model {EMBEDDING_MODEL}' to switch models")
+        self._use_embedding_model(active_model or EMBEDDING_MODEL)
+        
+        # Restore chunks and their BM25 postings, then reattach persisted embeddings
+        # so both keyword and semantic search work right after a restart
+        self.catalog_generation = self.catalog.generation()
+        labels = self._selected_payload_labels()
+        self._load_chunks(labels)
+        if self.enable_semantic_search:
+            self.vector_index.load_ann(self.ann_file)
+            self._load_embeddings(set(labels))
+            self._queue_missing_embeddings()
+            self.resume_embedding = bool(self.catalog.pending_embedding_jobs(self.embedding_model))
+    
+    def _hash_legacy_documents(self):
+        """
+        Give documents migrated from the JSON index a content hash and merge duplicates
+        
+        Migrated documents are stored under their own ID with no content hash. Each one
+        gets the hash of its source PDF if the file is still where the index recorded it.
+        Documents with the same extracted text then share one payload, so their content
+        is chunked, indexed and embedded once. The other payloads and their files are
+        removed. Runs once per catalog.
+        """
+        groups = {}
+        for doc in self.catalog.list_documents():
+            if doc["content_hash"] and doc["content_hash"] != doc["id"]:
+                continue
+            
+            # Older versions set a re-chunked legacy document's content hash to its ID
+            doc["content_hash"] = None
+            source_path = (doc["original_file"] or "").replace("\\", os.sep)
+            if os.path.isfile(source_path):
+                doc["content_hash"] = _hash_file(source_path)
+            try:
+                with open(self._resolve_text_path(doc), 'r', encoding='utf-8') as f:
+                    text_hash = hashlib.sha256(" ".join(f.read().split()).encode('utf-8')).hexdigest()
+            except OSError as e:
+                logging.warning(f"Could not read the text of {doc['id']}: {str(e)}")
+                text_hash = doc["id"]
+            groups.setdefault(text_hash, []).append(doc)
+        
+        released = []
+        with self.catalog.transaction():
+            for docs in groups.values():
+                # Keep a payload that already has embeddings, so nothing is encoded again
+                source = next((doc for doc in docs if os.path.exists(self._embedding_path(doc["payload"]))), docs[0])
+                group_hash = next((doc["content_hash"] for doc in docs if doc["content_hash"]), None)
+                for doc in docs:
+                    self.catalog.set_document_content(doc["id"], doc["content_hash"] or group_hash, source["payload"],
+                                                      source["text_file"], source["pages"], source["char_count"])
+                    if doc["payload"] != source["payload"] and self.catalog.release_payload(doc["payload"]):
+                        released.append(doc)
+            self.catalog.set_meta("legacy_content_hashed", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        
+        for doc in released:
+            logging.info(f"Document {doc['id']} duplicates another document; merged their stored content")
+            self._delete_payload_files(doc["payload"], self._resolve_text_path(doc))
+    
+    def _loads(self, labels: List[Tuple[str, str]]) -> bool:
+        """Whether a payload filed under the given (agent, type) labels belongs to a loaded agent"""
+        return self.agents is None or any(shard_key(agent) in self.agents for agent, _ in labels)
+    
+    def _selected_payload_labels(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Get the (agent, type) labels of every payload filed under a loaded agent"""
+        return {payload: labels for payload, labels in self.catalog.all_payload_labels().items() if self._loads(labels)}
+    
+    @_synchronized
+    def load_agents(self, agent_names: Optional[Iterable[str]] = None):
+        """
+        Load the index shards of more agents into a store opened for a subset of agents
+        
+        Args:
+            agent_names: Agents to add (None loads every agent)
+        """
+        if self.agents is None:
+            return
+        agents = None if agent_names is None else self.agents | {shard_key(agent) for agent in agent_names}
+        if agents == self.agents:
+            return
+        
+        self.agents = self.keyword_index.agents = self.vector_index.agents = agents
+        logging.info(f"Loading index shards for {'all agents' if agents is None else ', '.join(sorted(agents))}")
+        self.catalog_generation = None
+        self._sync_with_catalog()
+    
+    def _sync_with_catalog(self):
+        """
+        Bring the in-memory search indexes up to date with changes made by other processes
+        
+        The catalog is shared by every process that opens the documents directory
+        (e.g. the uploader and a running debate), so this is a no-op unless the
+        catalog's generation counter moved since the last sync.
+        """
+        generation = self.catalog.generation()
+        if generation == self.catalog_generation:
+            return
+        self.catalog_generation = generation
+        
+        # Cached results from an older generation can never be served again
+        self.result_cache.clear()
+        
+        # Another process finished a re-embedding and switched the active model
+        active_model = self.catalog.get_meta("embedding_model", self.embedding_model)
+        if active_model != self.embedding_model and self.enable_semantic_search:
+            self._switch_embedding_model(active_model)
+        
+        labels = self._selected_payload_labels()
+        for payload in list(self.keyword_index.document_ids()):
+            if payload not in labels:
+                self.keyword_index.remove_document(payload, delete_file=False)
+        for payload in list(self.vector_db):
+            if payload not in labels:
+                self.vector_db.pop(payload)
+                self.vector_index.remove(payload)
+        
+        self._load_chunks({payload: payload_labels for payload, payload_labels in labels.items()
+                           if payload not in self.keyword_index})
+        if self.enable_semantic_search:
+            self._load_embeddings({payload for payload in labels if payload not in self.vector_db})
+        
+        # Documents may have been filed under other agents, which moves them between shards
+        for payload, payload_labels in labels.items():
+            self.keyword_index.set_labels(payload, payload_labels)
+            if payload in self.vector_db:
+                self.vector_index.set_labels(payload, payload_labels, self.vector_db[payload]["embeddings"])
+    
+    def _relabel_payload(self, payload: str):
+        """
+        Move a payload between index shards after the documents filed under it changed
+        
+        Args:
+            payload: Payload key
+        """
+        labels = self.catalog.payload_labels(payload)
+        if not self._loads(labels):
+            self.keyword_index.remove_document(payload, delete_file=False)
+            self.vector_db.pop(payload, None)
+            self.vector_index.remove(payload)
+            return
+        
+        if payload in self.keyword_index:
+            self.keyword_index.set_labels(payload, labels)
+        else:
+            self._load_chunks({payload: labels})
+        if payload in self.vector_db:
+            self.vector_index.set_labels(payload, labels, self.vector_db[payload]["embeddings"])
+        elif self.enable_semantic_search:
+            self._load_embeddings({payload})
+    
+    def _resolve_text_path(self, doc: Dict) -> str:
+        """
+        Get a document's text file path, tolerating indexes written on Windows
+        
+        Args:
+            doc: Document metadata dictionary
+            
+        Returns:
+            Path to the extracted text file
+        """
+        text_path = doc["text_file"]
+        if not os.path.exists(text_path):
+            text_path = text_path.replace("\\", os.sep)
+        return text_path
+    
+    def _load_chunks(self, payloads: Dict[str, List[Tuple[str, str]]]):
+        """
+        Load keyword postings for the given payloads, building any that are missing
+        
+        Args:
+            payloads: Payload keys to load, with the (agent, type) labels they are filed under
+        """
+        rebuilt = 0
+        for payload, labels in payloads.items():
             try:
-                with open(self.index_file, 'r', encoding='utf-8') as f:
-                    self.document_data = json.load(f)
-                logging.info(f"Loaded {len(self.document_data)} documents from index")
+                if self.keyword_index.load_document(payload, labels):
+                    continue
+                
+                if self.catalog.has_chunks(payload):
+                    self.keyword_index.add_document(payload, self.catalog.get_chunks(payload)[0], labels)
+                else:
+                    # Documents uploaded before chunks were persisted are chunked once from their text
+                    text_path = self._resolve_text_path(self.catalog.documents_for_payload(payload)[0])
+                    with open(text_path, 'r', encoding='utf-8') as f:
+                        with self.catalog.transaction():
+                            self._index_chunks(payload, f.read())
+                            if not self.catalog.get_pages(payload):
+                                self.catalog.set_pages(payload, page_offsets_from_file(text_path))
+                rebuilt += 1
             except Exception as e:
-                logging.error(f"Failed to load document index: {str(e)}")
-                self.document_data = {}
+                logging.error(f"Failed to load chunks for {payload}: {str(e)}")
+        
+        if rebuilt:
+            logging.info(f"Built chunk and keyword indexes for {rebuilt} documents")
+    
+    def _index_chunks(self, payload: str, text: str) -> List[str]:
+        """
+        Split a document into chunks, store them in the catalog and add them to the keyword index
+        
+        Args:
+            payload: Payload key of the document
+            text: Extracted text from the document
+            
+        Returns:
+            Chunk texts, in chunk order
+        """
+        # Rebuilding chunks is not an ingest, so the filter statistics are not recorded
+        chunk_entries, _ = self._split_text_into_chunks(text)
+        chunks = [entry.pop("text") for entry in chunk_entries]
+        self.catalog.set_chunks(payload, chunks, chunk_entries)
+        self.keyword_index.add_document(payload, chunks, self.catalog.payload_labels(payload))
+        return chunks
+    
+    def _embeddings_dir(self, model_name: str) -> str:
+        """Get the directory holding a model's embedding set"""
+        return os.path.join(self.documents_dir, EMBEDDINGS_DIR, model_name.replace("/", "--"))
+    
+    def _embedding_path(self, payload: str, model_name: Optional[str] = None) -> str:
+        """Get the path of a payload's persisted embedding matrix (for the active model by default)"""
+        return os.path.join(self._embeddings_dir(model_name or self.embedding_model), f"{payload}.npy")
+    
+    def _use_embedding_model(self, model_name: str):
+        """
+        Point the store at a model's embedding set (the in-memory indexes are not touched)
+        
+        Args:
+            model_name: Embedding model name
+        """
+        self.embedding_model = model_name
+        self.embeddings_dir = self._embeddings_dir(model_name)
+        self.ann_file = os.path.join(self.embeddings_dir, "ivf_index.npz")
+        os.makedirs(self.embeddings_dir, exist_ok=True)
+        self._model = None
+    
+    def _check_embedding_set(self, model_name: str, dimension: int) -> bool:
+        """
+        Check an embedding matrix against the model name and dimension its set is tagged with
+        
+        The first matrix saved into a set (or found in an untagged legacy set) tags it.
+        
+        Args:
+            model_name: Embedding model name
+            dimension: Embedding dimension of the matrix
+            
+        Returns:
+            True if the matrix belongs in the set
+        """
+        tag_path = os.path.join(self._embeddings_dir(model_name), EMBEDDING_SET_FILE)
+        if os.path.exists(tag_path):
+            with open(tag_path, 'r', encoding='utf-8') as f:
+                tag = json.load(f)
+            if tag.get("model") != model_name or tag.get("dimension") != dimension:
+                logging.error(f"Embedding set of '{model_name}' is tagged {tag}, got {dimension} dimensions")
+                return False
+            return True
+        
+        os.makedirs(os.path.dirname(tag_path), exist_ok=True)
+        with open(f"{tag_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"model": model_name, "dimension": dimension,
+                       "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, f, indent=2)
+        os.replace(f"{tag_path}.tmp", tag_path)
+        return True
+
     
-    def _save_index(self):
-        """Save document index to disk"""
+    def _load_embeddings(self, payloads: set):
+        """
+        Memory-map persisted embeddings for the given payloads
+        
+        Args:
+            payloads: Payload keys to load
+        """
+        loaded = 0
+        for payload in payloads:
+            matrix_path = self._embedding_path(payload)
+            if not os.path.exists(matrix_path):
+                continue
+            
+            try:
+                embeddings = np.load(matrix_path, mmap_mode="r")
+                
+                if embeddings.shape[0] != self.catalog.chunk_count(payload):
+                    logging.warning(f"Embedding count mismatch for {payload}, skipping")
+                    continue
+                if not self._check_embedding_set(self.embedding_model, embeddings.shape[1]):
+                    continue
+                
+                self.vector_db[payload] = {"embeddings": embeddings}
+                self._index_embeddings(payload)
+                loaded += 1
+            except Exception as e:
+                logging.error(f"Failed to load embeddings for {payload}: {str(e)}")
+        
+        if loaded:
+            logging.info(f"Loaded persisted embeddings for {loaded} documents")
+        
+        if self.vector_index.maybe_train():
+            self.vector_index.save_ann(self.ann_file)
+    
+    def _queue_missing_embeddings(self) -> int:
+        """
+        Queue embedding jobs for payloads that have chunks but no matrix in the active embedding set
+        
+        Documents indexed before embeddings were persisted (e.g. migrated from the
+        JSON index), or whose matrix no longer matches their chunks, would otherwise
+        never become semantically searchable. Payloads that already have a job
+        waiting, or whose job failed, are left alone.
+        
+        Returns:
+            Number of jobs queued
+        """
+        if not self.enable_semantic_search or (self._model is None and not EMBEDDINGS_AVAILABLE):
+            return 0
+        
+        jobs = self.catalog.embedding_jobs(self.embedding_model)
+        missing = []
+        for payload in self.catalog.payloads():
+            if payload in self.vector_db or jobs.get(payload, {}).get("status") in ("queued", "running", "failed"):
+                continue
+            chunk_count = self.catalog.chunk_count(payload)
+            matrix_path = self._embedding_path(payload)
+            if not chunk_count or (os.path.exists(matrix_path)
+                                   and np.load(matrix_path, mmap_mode="r").shape[0] == chunk_count):
+                continue
+            missing.append(payload)
+        
+        if missing:
+            with self.catalog.transaction():
+                for payload in missing:
+                    self.catalog.enqueue_embedding_job(payload, self.embedding_model)
+            logging.info(f"Queued embeddings for {len(missing)} documents that have none")
+        return len(missing)
+    
+    def _index_embeddings(self, payload: str):
+        """
+        Add a payload's embeddings to the vector index shards of its agents
+        
+        Args:
+            payload: Payload key
+        """
+        self.vector_index.add(payload, self.vector_db[payload]["embeddings"], self.catalog.payload_labels(payload))
+    
+    def _update_ann_index(self):
+        """Retrain the approximate index if the corpus outgrew it and persist its list assignments"""
+        try:
+            self.vector_index.maybe_train()
+            self.vector_index.save_ann(self.ann_file)
+        except Exception as e:
+            logging.error(f"Failed to update approximate index: {str(e)}")
+    
+    def _save_embeddings(self, payload: str, embeddings: np.ndarray, model_name: Optional[str] = None):
+        """
+        Persist a payload's embeddings to disk
+        
+        Args:
+            payload: Payload key
+            embeddings: Normalized embedding matrix
+            model_name: Model that produced the embeddings (defaults to the active model)
+        """
+        matrix_path = self._embedding_path(payload, model_name)
+        
         try:
-            with open(self.index_file, 'w', encoding='utf-8') as f:
-                json.dump(self.document_data, f, indent=2)
-            logging.info(f"Saved {len(self.document_data)} documents to index")
+            # Write to a temporary file first so a crash never leaves a half-written matrix
+            with open(f"{matrix_path}.tmp", 'wb') as f:
+                np.save(f, np.asarray(embeddings, dtype=np.float32))
+            os.replace(f"{matrix_path}.tmp", matrix_path)
         except Exception as e:
-            logging.error(f"Failed to save document index: {str(e)}")
+            logging.error(f"Failed to persist embeddings for {payload}: {str(e)}")
+    
+    def _delete_payload(self, payload: str, text_path: str):
+        """
+        Remove a payload that no document references any more
+        
+        Args:
+            payload: Payload key
+            text_path: Path of the payload's extracted text file
+        """
+        self.vector_db.pop(payload, None)
+        self.vector_index.remove(payload)
+        self._update_ann_index()
+        self._delete_payload_files(payload, text_path)
+    
+    def _delete_payload_files(self, payload: str, text_path: str):
+        """
+        Remove an unreferenced payload's postings, embedding matrices and text file
+        
+        Args:
+            payload: Payload key
+            text_path: Path of the payload's extracted text file
+        """
+        self.keyword_index.remove_document(payload)
+        
+        # Remove the payload from every embedding set, including one being built by a re-embedding
+        matrix_paths = glob.glob(os.path.join(self.documents_dir, EMBEDDINGS_DIR, "*", f"{payload}.npy"))
+        for path in [text_path] + matrix_paths:
+            if os.path.exists(path):
+                os.remove(path)
     
+    @_synchronized
     def upload_document(self, 
                        file_path: str, 
                        agent_name: str, 
@@ -89,6 +803,10 @@ class DocumentStore:
         """
         Upload and process a PDF document
         
+        Re-uploading a file that is already indexed with the same agent, type and
+        title is a no-op; identical content filed under another title or agent
+        reuses the stored text and embeddings instead of processing them again.
+        
         Args:
             file_path: Path to the PDF file
             agent_name: Name of the agent this document belongs to (United_States, European_Union, etc.)
@@ -109,45 +827,35 @@ class DocumentStore:
                 logging.error(f"File is not a PDF: {file_path}")
                 return ""
             
-            # Format agent name for directory
-            agent_dir = agent_name.replace(" ", "_")
-            
-            # Create document ID and target paths
-            document_id = f"{agent_dir}_{os.path.basename(file_path).replace(' ', '_')}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            target_path = os.path.join(self.documents_dir, agent_dir, os.path.basename(file_path))
-            text_path = os.path.join(self.documents_dir, agent_dir, f"{document_id}.txt")
-            
-            # Extract text from PDF
-            extracted_text, num_pages = self._extract_text_from_pdf(file_path)
+            content_hash = _hash_file(file_path)
+            existing_id = self.catalog.find_duplicate(content_hash, agent_name, document_type,
+                                                      title or os.path.basename(file_path))
+            if existing_id:
+                logging.info(f"Document unchanged, keeping existing entry: {existing_id}")
+                return existing_id
             
-            if not extracted_text:
-                logging.error(f"Failed to extract text from {file_path}")
-                return ""
+            shared_with = self.catalog.documents_for_payload(self.catalog.payload_for_content(content_hash) or "")
+            if shared_with:
+                # Same content under a new title or agent: share the stored payload
+                document_id = self._register_document(file_path, agent_name, document_type, title, description,
+                                                      content_hash)
+                logging.info(f"Successfully uploaded document: {document_id} (shares content with "
+                             f"{shared_with[0]['id']})")
+                return document_id
             
-            # Save extracted text
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(extracted_text)
-            
-            # Create document metadata
-            self.document_data[document_id] = {
-                "id": document_id,
-                "title": title or os.path.basename(file_path),
-                "agent": agent_name,
-                "type": document_type,
-                "description": description or "",
-                "original_file": target_path,
-                "text_file": text_path,
-                "pages": num_pages,
-                "upload_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "char_count": len(extracted_text)
-            }
-            
-            # Save index
-            self._save_index()
-            
-            # Create embeddings if model is available
-            if self.model:
-                self._create_embeddings(document_id, extracted_text)
+            # Stream the PDF page by page into the text file, chunk store and keyword index. The
+            # embeddings are either queued for the background worker, so the upload returns as
+            # soon as the document is searchable by keyword, or created while streaming
+            background = BACKGROUND_EMBEDDING and self.enable_semantic_search and (
+                self._model is not None or EMBEDDINGS_AVAILABLE)
+            encode = not background and bool(self.model)
+            document_id = self._register_document(file_path, agent_name, document_type, title, description,
+                                                  content_hash, _iter_pdf_pages(file_path), encode=encode)
+            if background:
+                self.catalog.enqueue_embedding_job(content_hash, self.embedding_model)
+                self.start_embedding_worker()
+            elif encode:
+                self._update_ann_index()
             
             logging.info(f"Successfully uploaded document: {document_id}")
             return document_id
@@ -156,164 +864,939 @@ class DocumentStore:
             logging.error(f"Error uploading document: {str(e)}")
             return ""
     
-    def _extract_text_from_pdf(self, file_path: str) -> Tuple[str, int]:
+    @_synchronized
+    def update_document(self, document_id: str, file_path: Optional[str] = None) -> Dict:
+        """
+        Update a document in place from a revised PDF, or re-chunk its stored text
+        
+        The new chunks are compared with the old ones by text hash. Embeddings of
+        unchanged chunks are copied from the stored matrix, so only added or edited
+        chunks are encoded. The new matrix is built before the new chunks are
+        committed, so a failed encoding leaves the document as it was. The document
+        keeps its ID, title, agent and type.
+        
+        Args:
+            document_id: Document ID
+            file_path: Path to the revised PDF (if None, the stored text is chunked again,
+                e.g. after SEMANTIC_CHUNK_SIZE changed)
+            
+        Returns:
+            Report with the document's chunk count and the numbers of reused and encoded
+            chunks (empty dictionary if the update failed)
+        """
+        doc = self.catalog.get_document(document_id)
+        if not doc:
+            logging.error(f"Document not found: {document_id}")
+            return {}
+        
+        try:
+            started = time.time()
+            self._sync_with_catalog()
+            old_payload, old_text_path = doc["payload"], self._resolve_text_path(doc)
+            old_hashes = self.catalog.chunk_hashes(old_payload)
+            old_matrix = self.vector_db[old_payload]["embeddings"] if old_payload in self.vector_db else None
+            if old_matrix is None and os.path.exists(self._embedding_path(old_payload)):
+                # The document belongs to an agent this store does not load
+                old_matrix = np.load(self._embedding_path(old_payload), mmap_mode="r")
+            
+            payload = old_payload
+            content_hash = doc["content_hash"]
+            text_path = None
+            chunk_entries = None
+            if file_path:
+                if not os.path.exists(file_path):
+                    logging.error(f"File not found: {file_path}")
+                    return {}
+                if not file_path.lower().endswith('.pdf'):
+                    logging.error(f"File is not a PDF: {file_path}")
+                    return {}
+                content_hash = _hash_file(file_path)
+                payload = self.catalog.payload_for_content(content_hash) or content_hash
+                doc["original_file"] = os.path.join(self.documents_dir, doc["agent"].replace(" ", "_"),
+                                                    os.path.basename(file_path))
+            
+            shared_with = self.catalog.documents_for_payload(payload) if payload != old_payload else []
+            if shared_with:
+                # The revised content is already stored for another document; share it
+                source = shared_with[0]
+                doc.update(text_file=source["text_file"], pages=source["pages"], char_count=source["char_count"])
+            elif payload != old_payload:
+                text_path = os.path.join(self.documents_dir, doc["agent"].replace(" ", "_"),
+                                         f"{document_id}_{payload[:12]}.txt")
+                num_pages, char_count = self._stream_document(payload, _iter_pdf_pages(file_path), text_path,
+                                                              encode=False, labels=[(doc["agent"], doc["type"])])
+                doc.update(text_file=text_path, pages=num_pages, char_count=char_count)
+            else:
+                # Re-chunk in memory; the stored chunks are only replaced once the new matrix is built
+                with open(old_text_path, 'r', encoding='utf-8') as f:
+                    chunk_entries, savings = self._split_text_into_chunks(f.read())
+            
+            if chunk_entries is None:
+                chunks, _ = self.catalog.get_chunks(payload)
+                new_hashes = self.catalog.chunk_hashes(payload)
+            else:
+                chunks = [entry.pop("text") for entry in chunk_entries]
+                new_hashes = [text_key(chunk) for chunk in chunks]
+            report = {"document_id": document_id, "chunks": len(chunks), "reused": 0, "encoded": 0, "queued": False}
+            
+            embeddable = self.enable_semantic_search and (self._model is not None or EMBEDDINGS_AVAILABLE)
+            has_matrix = old_matrix is not None and len(old_matrix) == len(old_hashes)
+            if payload == old_payload and new_hashes == old_hashes and (has_matrix or not embeddable):
+                report["reused"] = len(chunks) if has_matrix else 0
+                report["seconds"] = time.time() - started
+                logging.info(f"Document {document_id} is unchanged")
+                return report
+            
+            # Build the new embedding matrix before the document switches over, so searches never see a gap
+            # and a failed encoding leaves the stored chunks untouched
+            matrix = None
+            if not shared_with and chunks and embeddable:
+                if has_matrix and self.model:
+                    matrix, report["encoded"] = self._splice_embeddings(chunks, new_hashes, old_hashes, old_matrix)
+                    report["reused"] = len(chunks) - report["encoded"]
+                else:
+                    report["queued"] = True
+            
+            doc["upload_date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            doc["content_hash"], doc["payload"] = content_hash, payload
+            with self.catalog.transaction():
+                if chunk_entries is not None:
+                    self.catalog.set_chunks(payload, chunks, chunk_entries)
+                    # Replaces the payload's earlier statistics, so the totals change by the difference
+                    self._record_ingest_savings(payload, savings)
+                self.catalog.add_document(doc)
+            if chunk_entries is not None:
+                self.keyword_index.add_document(payload, chunks, self.catalog.payload_labels(payload))
+            
+            if payload == old_payload:
+                # Embeddings of other models no longer line up with the new chunks
+                if new_hashes != old_hashes:
+                    for path in glob.glob(os.path.join(self.documents_dir, EMBEDDINGS_DIR, "*", f"{payload}.npy")):
+                        if path != self._embedding_path(payload):
+                            os.remove(path)
+                if not chunks or matrix is None:
+                    self.vector_db.pop(payload, None)
+                    self.vector_index.remove(payload)
+            elif self.catalog.release_payload(old_payload):
+                self._delete_payload(old_payload, old_text_path)
+            else:
+                self._relabel_payload(old_payload)
+            
+            if shared_with:
+                self._relabel_payload(payload)
+            elif matrix is not None:
+                self._store_embeddings(payload, matrix)
+                self._update_ann_index()
+            
+            if not shared_with:
+                # A re-embedding in progress needs the new chunks too
+                target = self.catalog.get_meta("reembed_target")
+                if target:
+                    self.catalog.enqueue_embedding_job(payload, target)
+                if report["queued"]:
+                    self.catalog.enqueue_embedding_job(payload, self.embedding_model)
+                if target or report["queued"]:
+                    self.start_embedding_worker()
+            
+            report["seconds"] = time.time() - started
+            logging.info(f"Updated document {document_id}: {report['chunks']} chunks, {report['reused']} reused, "
+                         f"{report['encoded']} encoded in {report['seconds']:.1f}s")
+            return report
+        except Exception as e:
+            logging.error(f"Error updating document: {str(e)}")
+            # Content streamed in for the revision is dropped unless the document already switched to it
+            if text_path and self.catalog.release_payload(payload):
+                self._delete_payload(payload, text_path)
+            return {}
+    
+    def _splice_embeddings(self, 
+                           chunks: List[str], 
+                           new_hashes: List[str], 
+                           old_hashes: List[str], 
+                           old_matrix: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Build the embedding matrix of updated chunks, reusing the rows of unchanged ones
+        
+        Args:
+            chunks: New chunk texts, in chunk order
+            new_hashes: Text hash of each new chunk
+            old_hashes: Text hash of each old chunk
+            old_matrix: Stored embedding matrix of the old chunks
+            
+        Returns:
+            Tuple of (embedding_matrix, number_of_chunks_encoded)
+        """
+        old_rows = {}
+        for row, key in enumerate(old_hashes):
+            old_rows.setdefault(key, row)
+        
+        matrix = np.empty((len(chunks), old_matrix.shape[1]), dtype=np.float32)
+        reused = [i for i, key in enumerate(new_hashes) if key in old_rows]
+        changed = [i for i, key in enumerate(new_hashes) if key not in old_rows]
+        if reused:
+            matrix[reused] = old_matrix[[old_rows[new_hashes[i]] for i in reused]]
+        if changed:
+            encoded = self.encoder.encode(self.model, [chunks[i] for i in changed], self.embedding_model)
+            matrix[changed] = normalize_rows(encoded)
+        return matrix, len(changed)
+    
+    def start_embedding_worker(self):
+        """
+        Start the background embedding worker (if needed) and wake it up
+        
+        The worker also picks up jobs queued by other processes or left behind by
+        a process that exited before its embeddings were created.
+        """
+        if self.embedding_worker is None or self.embedding_worker.model_name != self.embedding_model:
+            if self.embedding_worker:
+                # The active model changed; the old worker exits after its current job
+                self.embedding_worker.stop(timeout=0)
+            self.embedding_worker = EmbeddingWorker(self, self.embedding_model)
+        self.embedding_worker.start()
+        self.embedding_worker.notify()
+        
+        # Resume a re-embedding interrupted by the end of a process
+        target = self.catalog.get_meta("reembed_target")
+        if target and (self.migration_worker is None or not self.migration_worker.is_running()):
+            self.migration_worker = EmbeddingWorker(self, target, on_drained=self._finish_reembedding)
+            self.migration_worker.start()
+    
+    def wait_for_embeddings(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every queued embedding job is finished
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        if not self.catalog.pending_embedding_jobs(self.embedding_model):
+            return True
+        self.start_embedding_worker()
+        return self.embedding_worker.wait(timeout)
+    
+    @_synchronized
+    def get_embedding_status(self, document_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Get the embedding status of documents
+        
+        Args:
+            document_ids: Documents to report on (defaults to all documents)
+            
+        Returns:
+            {document_id: {"status", "error"}}, where status is "ready" (semantically searchable),
+            "queued", "running", "failed" or "none" (no embeddings and no job)
+        """
+        self._sync_with_catalog()
+        jobs = self.catalog.embedding_jobs(self.embedding_model)
+        
+        documents = self.catalog.list_documents()
+        if document_ids is not None:
+            wanted = set(document_ids)
+            documents = [doc for doc in documents if doc["id"] in wanted]
+        
+        status = {}
+        for doc in documents:
+            job = jobs.get(doc["payload"], {})
+            if doc["payload"] in self.vector_db:
+                status[doc["id"]] = {"status": "ready", "error": None}
+            elif job and job["status"] != "done":
+                status[doc["id"]] = {"status": job["status"], "error": job["error"]}
+            else:
+                status[doc["id"]] = {"status": "none", "error": None}
+        return status
+
+    @_synchronized
+    def reembed(self, model_name: str) -> bool:
+        """
+        Start re-embedding the whole corpus with another model, in the background
+        
+        Every payload gets a job for the new model. The background worker writes the
+        new vectors into the new model's own embedding set while searches keep using
+        the active one; once the last job is done, the catalog's active model is
+        switched in one transaction and every process moves to the new set. The old
+        set stays on disk, so switching back is just another reembed.
+        
+        Args:
+            model_name: Name of the sentence-transformers model to switch to
+            
+        Returns:
+            True if the re-embedding was started, False otherwise
+        """
+        if not self.enable_semantic_search:
+            logging.error("Semantic search is disabled, nothing to re-embed")
+            return False
+        if model_name == self.embedding_model:
+            logging.error(f"'{model_name}' is already the active embedding model")
+            return False
+        target = self.catalog.get_meta("reembed_target")
+        if target and target != model_name:
+            logging.error(f"A re-embedding to '{target}' is already in progress")
+            return False
+        if self.model_for(model_name) is None:
+            logging.error(f"Embedding model '{model_name}' could not be loaded")
+            return False
+        
+        with self.catalog.transaction():
+            self.catalog.set_meta("reembed_target", model_name)
+            jobs = self.catalog.embedding_jobs(model_name)
+            for payload in self.catalog.payloads():
+                # Keep vectors already made by an earlier, interrupted run
+                if jobs.get(payload, {}).get("status") != "done" or \
+                        not os.path.exists(self._embedding_path(payload, model_name)):
+                    self.catalog.enqueue_embedding_job(payload, model_name)
+        
+        logging.info(f"Re-embedding {len(self.catalog.payloads())} documents with '{model_name}'")
+        self.start_embedding_worker()
+        return True
+    
+    def wait_for_reembedding(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a re-embedding started with reembed() has switched models
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True once no re-embedding is in progress, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.catalog.get_meta("reembed_target"):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        with self._lock:
+            self._sync_with_catalog()
+        return True
+    
+    def _finish_reembedding(self, model_name: str):
+        """
+        Switch the active model once every payload has vectors from the new model
+        
+        Called by the migration worker when its queue is empty.
+        
+        Args:
+            model_name: Model the corpus was re-embedded with
+        """
+        with self._lock:
+            if self.catalog.get_meta("reembed_target") != model_name:
+                return
+            
+            # Payloads whose job failed (or that were never queued) would vanish from semantic search
+            jobs = self.catalog.embedding_jobs(model_name)
+            missing = [payload for payload in self.catalog.payloads()
+                       if jobs.get(payload, {}).get("status") != "done"
+                       or not os.path.exists(self._embedding_path(payload, model_name))]
+            if missing:
+                logging.error(f"Re-embedding with '{model_name}' is missing {len(missing)} documents; "
+                              f"keeping '{self.embedding_model}' (run reembed again to retry)")
+                self.catalog.set_meta("reembed_target", "")
+                return
+            
+            # One transaction flips every process over to the new embedding set
+            with self.catalog.transaction():
+                self.catalog.set_meta("embedding_model", model_name)
+                self.catalog.set_meta("reembed_target", "")
+                self.catalog.bump_generation()
+            self._switch_embedding_model(model_name)
+            logging.info(f"Switched embedding model to '{model_name}'")
+    
+    def _switch_embedding_model(self, model_name: str):
+        """
+        Replace the in-memory vector index with a model's embedding set
+        
+        Args:
+            model_name: Embedding model to switch to
+        """
+        self._use_embedding_model(model_name)
+        self.vector_db = {}
+        self.vector_index = ShardedVectorIndex(self.agents, ann_mode=ANN_INDEX_MODE, ann_min_rows=ANN_MIN_ROWS,
+                                               nprobe=ANN_NPROBE, storage=VECTOR_STORAGE)
+        self.vector_index.load_ann(self.ann_file)
+        self._load_embeddings(set(self._selected_payload_labels()))
+        self.result_cache.clear()
+
+    def _register_document(self, 
+                           file_path: str, 
+                           agent_name: str, 
+                           document_type: str, 
+                           title: Optional[str], 
+                           description: Optional[str], 
+                           content_hash: str, 
+                           pages: Optional[Iterable[str]] = None, 
+                           encode: bool = False) -> str:
+        """
+        Store a document's metadata and, for new content, stream in its pages
+        
+        The document only becomes visible once its text, chunks and page offsets
+        are stored, when its metadata row is committed.
+        
+        Args:
+            file_path: Path to the source PDF file
+            agent_name: Name of the agent this document belongs to
+            document_type: Type of document
+            title: Document title (if None, use filename)
+            description: Document description
+            content_hash: Content hash of the PDF, used as the payload key of new content
+            pages: Page texts of the PDF (not needed when the payload already exists)
+            encode: Whether to create embeddings while streaming the pages
+            
+        Returns:
+            Document ID
+        """
+        # Format agent name for directory
+        agent_dir = agent_name.replace(" ", "_")
+        
+        # Create document ID and target paths
+        document_id = f"{agent_dir}_{os.path.basename(file_path).replace(' ', '_')}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if self.catalog.get_document(document_id):
+            # The same file filed twice within one second (e.g. under two titles)
+            suffix = 2
+            while self.catalog.get_document(f"{document_id}_{suffix}"):
+                suffix += 1
+            document_id = f"{document_id}_{suffix}"
+        target_path = os.path.join(self.documents_dir, agent_dir, os.path.basename(file_path))
+        
+        payload = self.catalog.payload_for_content(content_hash) or content_hash
+        shared_with = self.catalog.documents_for_payload(payload)
+        if shared_with:
+            # Reuse the text and statistics of the document that already holds this content
+            source = shared_with[0]
+            text_path, num_pages, char_count = source["text_file"], source["pages"], source["char_count"]
+        else:
+            text_path = os.path.join(self.documents_dir, agent_dir, f"{document_id}.txt")
+            num_pages, char_count = self._stream_document(content_hash, pages, text_path, encode,
+                                                          [(agent_name, document_type)])
+            
+            # New content arriving during a re-embedding also needs vectors from the new model
+            target = self.catalog.get_meta("reembed_target")
+            if target:
+                self.catalog.enqueue_embedding_job(content_hash, target)
+        
+        # Create document metadata
+        doc = {
+            "id": document_id,
+            "title": title or os.path.basename(file_path),
+            "agent": agent_name,
+            "type": document_type,
+            "description": description or "",
+            "original_file": target_path,
+            "text_file": text_path,
+            "pages": num_pages,
+            "upload_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "char_count": char_count,
+            "content_hash": content_hash,
+            "payload": payload
+        }
+        
+        self.catalog.add_document(doc)
+        
+        if shared_with:
+            self._relabel_payload(payload)
+        elif encode and os.path.exists(self._embedding_path(content_hash)):
+            self._attach_embeddings(content_hash)
+        return document_id
+    
+    def _stream_document(self, 
+                         payload: str, 
+                         pages: Iterable[str], 
+                         text_path: str, 
+                         encode: bool, 
+                         labels: List[Tuple[str, str]]) -> Tuple[int, int]:
+        """
+        Write, chunk, index and optionally embed a document one page at a time
+        
+        Each page is appended to the text file and chunked as soon as it arrives;
+        only the first BOILERPLATE_SAMPLE_PAGES pages are held back until the
+        document's running headers and footers are learned from them. Chunks are
+        stored, tokenized and encoded in batches of STREAM_BATCH_CHUNKS, and their
+        embeddings are appended to a raw file that becomes the .npy matrix at the
+        end, so memory use does not grow with the document.
+        
+        Args:
+            payload: Payload key of the document
+            pages: Page texts, in page order
+            text_path: Path of the text file to write
+            encode: Whether to create embeddings for the chunks
+            labels: (agent, type) pairs the document is filed under, which pick its keyword index shards
+            
+        Returns:
+            Tuple of (number_of_pages, character_count)
+        """
+        matrix_path = self._embedding_path(payload)
+        raw_path = f"{matrix_path}.raw"
+        
+        doc_postings, lengths = {}, []
+        batch_texts, batch_metadata = [], []
+        page_offsets = []
+        num_pages = char_offset = byte_offset = chunk_count = dimension = 0
+        section = None
+        boilerplate = BoilerplateDetector()
+        duplicates = NearDuplicateFilter() if DROP_NEAR_DUPLICATE_CHUNKS else None
+        sampled = [] if STRIP_BOILERPLATE else None
+        
+        def flush(raw_file):
+            # Store, tokenize and encode the buffered chunks, then drop them
+            nonlocal chunk_count, dimension
+            if not batch_texts:
+                return
+            self.catalog.append_chunks(payload, chunk_count, batch_texts, batch_metadata)
+            self.keyword_index.tokenize_chunks(batch_texts, doc_postings, lengths)
+            if raw_file:
+                embeddings = normalize_rows(self.encoder.encode(self.model, batch_texts, self.embedding_model))
+                raw_file.write(embeddings.tobytes())
+                dimension = embeddings.shape[1]
+            chunk_count += len(batch_texts)
+            batch_texts.clear()
+            batch_metadata.clear()
+        
+        def chunk_page(raw_file, piece, content_start, page_number, offset):
+            # Chunk a page without its headers and footers and buffer the chunks that are not near-duplicates
+            nonlocal section
+            entries, section = self._chunk_segment(piece, content_start, len(piece), page_number, section, offset,
+                                                   boilerplate.spans(piece, content_start, len(piece)))
+            for entry in entries:
+                if duplicates and duplicates.is_duplicate(entry["text"]):
+                    continue
+                batch_texts.append(entry.pop("text"))
+                batch_metadata.append(entry)
+            if len(batch_texts) >= STREAM_BATCH_CHUNKS:
+                flush(raw_file)
+        
+        def release_sample(raw_file):
+            # Learn the headers and footers from the held-back pages, then chunk them
+            nonlocal sampled
+            boilerplate.learn([(piece, content_start, len(piece)) for piece, content_start, _, _ in sampled])
+            for page in sampled:
+                chunk_page(raw_file, *page)
+            sampled = None
+        
+        try:
+            self.catalog.set_chunks(payload, [], [])
+            with open(text_path, 'wb') as text_file, (open(raw_path, 'wb') if encode else nullcontext()) as raw_file:
+                for page_text in pages:
+                    num_pages += 1
+                    
+                    # Same layout as joining "--- Page N ---\n{page}\n" blocks with newlines
+                    separator = "\n" if num_pages > 1 else ""
+                    marker = f"--- Page {num_pages} ---"
+                    piece = f"{separator}{marker}\n{page_text}\n"
+                    
+                    # A page spans from its marker to the next page's marker
+                    if page_offsets:
+                        page_offsets[-1][2] = byte_offset + len(separator)
+                    page_offsets.append([num_pages, byte_offset + len(separator), None])
+                    
+                    piece_bytes = piece.encode('utf-8')
+                    text_file.write(piece_bytes)
+                    
+                    page = (piece, len(separator) + len(marker), num_pages, char_offset)
+                    if sampled is None:
+                        chunk_page(raw_file, *page)
+                    else:
+                        sampled.append(page)
+                        if len(sampled) >= BOILERPLATE_SAMPLE_PAGES:
+                            release_sample(raw_file)
+                    
+                    char_offset += len(piece)
+                    byte_offset += len(piece_bytes)
+                
+                if sampled:
+                    release_sample(raw_file)
+                flush(raw_file)
+            
+            if not num_pages:
+                raise ValueError("no pages extracted")
+            
+            page_offsets[-1][2] = byte_offset
+            self.catalog.set_pages(payload, [tuple(offsets) for offsets in page_offsets])
+            self.keyword_index.commit_document(payload, doc_postings, lengths, labels)
+            
+            if encode and chunk_count:
+                # Prefix the raw rows with an .npy header now that the row count is known
+                _write_embedding_matrix(raw_path, matrix_path, chunk_count, dimension)
+        except Exception:
+            # Leave no partial text, chunks or pages behind
+            self.catalog.set_chunks(payload, [], [])
+            self.catalog.set_pages(payload, [])
+            for path in (text_path, f"{matrix_path}.tmp"):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+        
+        self._record_ingest_savings(payload, _ingest_savings(boilerplate, duplicates, chunk_count))
+        logging.info(f"Streamed {num_pages} pages of {payload} into {chunk_count} chunks")
+        return num_pages, char_offset
+    
+    def _record_ingest_savings(self, payload: str, savings: Dict[str, int]):
+        """
+        Store what the ingest filters left out of a document (see _ingest_savings)
+        
+        Args:
+            payload: Payload key of the document
+            savings: Filter statistics of the document's current chunks
+        """
+        self.catalog.set_ingest_stats(payload, savings)
+        if savings["duplicate_chunks"] or savings["boilerplate_lines"]:
+            logging.info(f"Left {savings['boilerplate_lines']} header/footer lines ({savings['boilerplate_chars']} "
+                         f"characters) and {savings['duplicate_chunks']} near-duplicate chunks out of {payload}")
+    
+    def _attach_embeddings(self, payload: str):
+        """
+        Memory-map a payload's persisted embeddings and add them to the vector index
+        
+        Args:
+            payload: Payload key
+        """
+        embeddings = np.load(self._embedding_path(payload), mmap_mode="r")
+        if not self._check_embedding_set(self.embedding_model, embeddings.shape[1]):
+            raise ValueError(f"embeddings of {payload} do not match the '{self.embedding_model}' set")
+        if self._loads(self.catalog.payload_labels(payload)):
+            self.vector_db[payload] = {"embeddings": embeddings}
+            self._index_embeddings(payload)
+        
+        # Let other processes sharing the catalog pick up the new embeddings
+        self.catalog.bump_generation()
+    
+    def _store_embeddings(self, payload: str, embeddings: np.ndarray, model_name: Optional[str] = None):
         """
-        Extract text from a PDF file
+        Persist freshly encoded embeddings for a payload and add them to the vector index
+        
+        Embeddings from a model other than the active one (a re-embedding in progress)
+        are only persisted; they become searchable when that model is switched to.
         
         Args:
-            file_path: Path to the PDF file
-            
-        Returns:
-            Tuple of (extracted_text, number_of_pages)
+            payload: Payload key
+            embeddings: One embedding row per chunk
+            model_name: Model that produced the embeddings (defaults to the active model)
         """
-        try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                num_pages = len(reader.pages)
-                
-                text = []
-                for page_num in range(num_pages):
-                    page = reader.pages[page_num]
-                    text.append(f"--- Page {page_num + 1} ---\n{page.extract_text()}\n")
-                
-                return "\n".join(text), num_pages
-        except Exception as e:
-            logging.error(f"Error extracting text from PDF: {str(e)}")
-            return "", 0
+        model_name = model_name or self.embedding_model
+        if model_name != self.embedding_model:
+            if not self._check_embedding_set(model_name, embeddings.shape[1]):
+                raise ValueError(f"embeddings of {payload} do not match the '{model_name}' set")
+            self._save_embeddings(payload, normalize_rows(embeddings), model_name)
+            return
+        
+        # Rows are normalized once, here
+        self._save_embeddings(payload, normalize_rows(embeddings))
+        self._attach_embeddings(payload)
     
-    def _create_embeddings(self, document_id: str, text: str):
+    def _store_embedding_file(self, 
+                              payload: str, 
+                              raw_path: str, 
+                              rows: int, 
+                              dimension: int, 
+                              model_name: Optional[str] = None):
         """
-        Create embeddings for document chunks for semantic search
+        Persist normalized embedding rows streamed to a raw file and add them to the vector index
+        
+        Like _store_embeddings, for matrices built a batch at a time (see EmbeddingWorker).
         
         Args:
-            document_id: Document ID
-            text: Extracted text from the document
+            payload: Payload key
+            raw_path: File holding one normalized float32 row per chunk
+            rows: Number of rows in the raw file
+            dimension: Embedding dimension
+            model_name: Model that produced the embeddings (defaults to the active model)
         """
-        try:
-            # Split into chunks - more sophisticated than simple paragraph splitting
-            chunks = self._split_text_into_chunks(text)
+        model_name = model_name or self.embedding_model
+        if not self._check_embedding_set(model_name, dimension):
+            raise ValueError(f"embeddings of {payload} do not match the '{model_name}' set")
+        _write_embedding_matrix(raw_path, self._embedding_path(payload, model_name), rows, dimension)
+        if model_name == self.embedding_model:
+            self._attach_embeddings(payload)
+    
+    @_synchronized
+    def bulk_ingest(self, 
+                    directory: str, 
+                    agent_name: Optional[str] = None, 
+                    document_type: Optional[str] = None, 
+                    mapping: Optional[Dict[str, Dict]] = None, 
+                    recursive: bool = False, 
+                    workers: Optional[int] = None) -> Dict:
+        """
+        Ingest every PDF in a directory in one pass
+        
+        Pages are extracted across a process pool, chunks from several documents
+        are encoded together in large batches, and each document is committed to
+        the catalog as soon as it is extracted. Files that are already indexed unchanged are skipped, and
+        files whose content is already stored are registered without extraction.
+        
+        Args:
+            directory: Directory containing PDF files
+            agent_name: Default agent for files not matched by the mapping
+            document_type: Default document type for files not matched by the mapping
+            mapping: Optional {filename glob: {"agent", "type", "title", "description"}} overrides
+            recursive: Whether to include PDFs in subdirectories
+            workers: Number of extraction processes (defaults to the CPU count)
             
-            if not chunks:
-                logging.warning(f"No valid chunks found in document {document_id}")
+        Returns:
+            Report dictionary with document IDs, failures, counts and throughput
+        """
+        pattern = os.path.join(directory, "**", "*.pdf") if recursive else os.path.join(directory, "*.pdf")
+        files = sorted(glob.glob(pattern, recursive=recursive))
+        
+        # Resolve agent/type for every file before doing any work
+        jobs = {}
+        skipped = []
+        for file_path in files:
+            settings = {"agent": agent_name, "type": document_type}
+            for file_pattern, overrides in (mapping or {}).items():
+                if fnmatch.fnmatch(os.path.basename(file_path), file_pattern):
+                    settings.update(overrides)
+                    break
+            if not settings.get("agent") or not settings.get("type"):
+                logging.warning(f"No agent/type mapping for {file_path}, skipping")
+                skipped.append(file_path)
+                continue
+            jobs[file_path] = settings
+        
+        report = {
+            "documents": [],
+            "unchanged": [],
+            "failed": [],
+            "skipped": skipped,
+            "pages": 0,
+            "chunks": 0,
+            "embed_seconds": 0.0
+        }
+        pending_ids, pending_texts = [], []
+        
+        def flush():
+            # Encode buffered chunks from several documents at once, then split them back per document
+            if not pending_ids:
                 return
+            started = time.time()
+            embeddings = self.encoder.encode(self.model, pending_texts, self.embedding_model)
+            offset = 0
+            for payload, count in pending_ids:
+                self._store_embeddings(payload, embeddings[offset:offset + count])
+                offset += count
+            report["embed_seconds"] += time.time() - started
+            pending_ids.clear()
+            pending_texts.clear()
+        
+        def register(file_path: str, content_hash: str, pages: Optional[List[str]] = None):
+            settings = jobs[file_path]
+            title = settings.get("title") or os.path.basename(file_path)
+            existing_id = self.catalog.find_duplicate(content_hash, settings["agent"], settings["type"], title)
+            if existing_id:
+                report["unchanged"].append(existing_id)
+                return
+            document_id = self._register_document(file_path, settings["agent"], settings["type"], title,
+                                                  settings.get("description"), content_hash, pages)
+            report["documents"].append(document_id)
+        
+        started = time.time()
+        
+        # Group files by content so each distinct PDF is extracted at most once
+        by_hash = {}
+        for file_path in jobs:
+            by_hash.setdefault(_hash_file(file_path), []).append(file_path)
+        
+        to_extract = {}
+        for content_hash, paths in by_hash.items():
+            if self.catalog.payload_for_content(content_hash):
+                for file_path in paths:
+                    register(file_path, content_hash)
+            else:
+                to_extract[paths[0]] = content_hash
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_extract_pdf_pages, file_path): file_path for file_path in to_extract}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                content_hash = to_extract[file_path]
+                try:
+                    pages = future.result()
+                    for duplicate_path in by_hash[content_hash]:
+                        register(duplicate_path, content_hash, pages)
+                except Exception as e:
+                    logging.error(f"Failed to ingest {file_path}: {str(e)}")
+                    report["failed"].append(file_path)
+                    continue
+                
+                report["pages"] += len(pages)
+                chunks = self.catalog.get_chunks(content_hash)[0]
+                report["chunks"] += len(chunks)
+                
+                if self.model and chunks:
+                    pending_ids.append((content_hash, len(chunks)))
+                    pending_texts.extend(chunks)
+                    if len(pending_texts) >= BULK_EMBED_FLUSH_CHUNKS:
+                        flush()
             
-            logging.info(f"Splitting document {document_id} into {len(chunks)} semantic chunks")
-            
-            # Generate embeddings with batching for efficiency
-            embeddings = self.model.encode(chunks, batch_size=8, show_progress_bar=True)
-            
-            # Store in vector database with page information
-            self.vector_db[document_id] = {
-                "chunks": chunks,
-                "embeddings": embeddings,
-                "chunk_metadata": self._extract_chunk_metadata(chunks, text)
-            }
-            
-            logging.info(f"Created embeddings for {len(chunks)} chunks in document {document_id}")
-        except Exception as e:
-            logging.error(f"Error creating embeddings: {str(e)}")
+            if self.model:
+                flush()
+        
+        # Update the approximate search structures once for the whole batch
+        if self.model:
+            self._update_ann_index()
+        
+        elapsed = time.time() - started
+        report["total_seconds"] = elapsed
+        report["pages_per_second"] = report["pages"] / elapsed if elapsed else 0.0
+        report["chunks_per_second"] = report["chunks"] / elapsed if elapsed else 0.0
+        
+        logging.info(f"Bulk ingested {len(report['documents'])} documents ({report['pages']} pages, "
+                     f"{report['chunks']} chunks) in {elapsed:.1f}s")
+        return report
     
-    def _split_text_into_chunks(self, text: str) -> List[str]:
+    def _split_text_into_chunks(self, text: str) -> Tuple[List[Dict], Dict[str, int]]:
         """
         Split text into semantic chunks for better embeddings
         
+        Makes a single pass over the text: pages are delimited by their markers
+        and each page is chunked by _chunk_segment. Each chunk carries its
+        character offsets, page number and the nearest preceding section header.
+        Running headers and footers are left out and near-duplicate chunks are
+        dropped, exactly as when the document is streamed in. Nothing is recorded;
+        callers that ingest the chunks record the returned filter statistics.
+        
         Args:
             text: Document text
-        
+            
         Returns:
-            List of text chunks
+            Tuple of (chunk dictionaries with "text", "start", "end", "page" and "section" keys,
+            filter statistics from _ingest_savings)
         """
-        # First split by pages
-        pages = re.split(r'--- Page \d+ ---', text)
+        # Page segments: text before the first marker has no page number
+        segments = []
+        segment_start, page = 0, None
+        for marker in PAGE_MARKER_PATTERN.finditer(text):
+            segments.append((segment_start, marker.start(), page))
+            segment_start, page = marker.end(), int(marker.group(1))
+        segments.append((segment_start, len(text), page))
+        
+        boilerplate = BoilerplateDetector()
+        if STRIP_BOILERPLATE:
+            boilerplate.learn([(text, seg_start, seg_end) for seg_start, seg_end, page in segments
+                               if page is not None][:BOILERPLATE_SAMPLE_PAGES])
+        duplicates = NearDuplicateFilter() if DROP_NEAR_DUPLICATE_CHUNKS else None
         
         chunks = []
-        for page in pages:
-            if not page.strip():
-                continue
-            
-            # Get page number if available
-            page_num = None
-            page_match = re.search(r'--- Page (\d+) ---', page)
-            if page_match:
-                page_num = page_match.group(1)
-            
-            # Split page into paragraphs
-            paragraphs = [p for p in re.split(r'\n\s*\n', page) if p.strip()]
-            
-            # Process each paragraph
-            for para in paragraphs:
-                # If paragraph is short, add it as is
-                if len(para) <= SEMANTIC_CHUNK_SIZE:
-                    chunks.append(para.strip())
-                else:
-                    # Split large paragraphs into sentences
-                    sentences = re.split(r'(?<=[.!?])\s+', para)
-                    current_chunk = ""
-                    
-                    for sentence in sentences:
-                        if len(current_chunk) + len(sentence) <= SEMANTIC_CHUNK_SIZE:
-                            current_chunk += " " + sentence if current_chunk else sentence
-                        else:
-                            if current_chunk:
-                                chunks.append(current_chunk.strip())
-                            current_chunk = sentence
-                    
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
+        section = None
+        for seg_start, seg_end, page in segments:
+            skip = boilerplate.spans(text, seg_start, seg_end) if page is not None else None
+            segment_chunks, section = self._chunk_segment(text, seg_start, seg_end, page, section, skip=skip)
+            chunks.extend(chunk for chunk in segment_chunks
+                          if not (duplicates and duplicates.is_duplicate(chunk["text"])))
         
-        # Remove any empty chunks or chunks that are too short
-        return [chunk for chunk in chunks if len(chunk) > 20]
+        return chunks, _ingest_savings(boilerplate, duplicates, len(chunks))
     
-    def _extract_chunk_metadata(self, chunks: List[str], full_text: str) -> List[Dict]:
+    def _chunk_segment(self, 
+                       text: str, 
+                       seg_start: int, 
+                       seg_end: int, 
+                       page: Optional[int], 
+                       section: Optional[str], 
+                       base_offset: int = 0,
+                       skip: Optional[List[Tuple[int, int]]] = None) -> Tuple[List[Dict], Optional[str]]:
         """
-        Extract metadata for each chunk (page numbers, section info)
+        Chunk one page of text
         
-        Args:
-            chunks: List of text chunks
-            full_text: Full document text
+        Paragraphs are delimited by blank lines, and long paragraphs are packed
+        sentence by sentence up to SEMANTIC_CHUNK_SIZE characters. Skipped spans
+        (header and footer lines) act as paragraph breaks, so no chunk contains them.
         
+        Args:
+            text: Text containing the page
+            seg_start: Offset in text where the page's content starts
+            seg_end: Offset in text where the page's content ends
+            page: Page number (None for text before the first page marker)
+            section: Section header in effect at the start of the page
+            base_offset: Offset of text within the whole document, added to chunk offsets
+            skip: Optional (start, end) spans of text to leave out of every chunk
+            
         Returns:
-            List of metadata dictionaries for each chunk
+            Tuple of (chunk dictionaries, section header in effect at the end of the page)
         """
-        metadata = []
+        # Section headers are located once; a cursor then walks them alongside the chunks
+        headers = [(m.start(), m.group(0).strip()) for m in SECTION_HEADER_PATTERN.finditer(text, seg_start, seg_end)
+                   if not skip or not any(start <= m.start() < end for start, end in skip)]
+        header_cursor = 0
+        current_section = section
+        
+        chunks = []
         
-        for chunk in chunks:
-            # Initialize metadata for this chunk
-            chunk_meta = {"page": None, "section": None}
+        def emit(start: int, end: int):
+            nonlocal header_cursor, current_section
+            
+            # Trim surrounding whitespace while keeping the offsets exact
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if end - start <= MIN_CHUNK_LENGTH:
+                return
+            
+            while header_cursor < len(headers) and headers[header_cursor][0] < start:
+                current_section = headers[header_cursor][1]
+                header_cursor += 1
             
-            # Find the chunk in the original text to get context
-            chunk_pos = full_text.find(chunk)
-            if chunk_pos >= 0:
-                # Look for page number before this chunk
-                text_before = full_text[:chunk_pos]
-                page_matches = list(re.finditer(r'--- Page (\d+) ---', text_before))
-                if page_matches:
-                    chunk_meta["page"] = page_matches[-1].group(1)
+            chunks.append({
+                "text": text[start:end],
+                "start": base_offset + start,
+                "end": base_offset + end,
+                "page": page,
+                "section": current_section
+            })
+        
+        # Split page into paragraphs
+        para_start = seg_start
+        breaks = [(m.start(), m.end()) for m in PARAGRAPH_BREAK_PATTERN.finditer(text, seg_start, seg_end)]
+        if skip:
+            merged = []
+            for start, end in sorted(breaks + skip):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            breaks = merged
+        for para_end, next_start in breaks + [(seg_end, seg_end)]:
+            if para_end - para_start <= SEMANTIC_CHUNK_SIZE:
+                emit(para_start, para_end)
+            else:
+                # Pack sentences of a large paragraph into chunks
+                chunk_start = chunk_end = None
+                sentence_start = para_start
+                sentence_breaks = [m.start() for m in SENTENCE_BREAK_PATTERN.finditer(text, para_start, para_end)]
+                for sentence_end in sentence_breaks + [para_end]:
+                    if chunk_start is None:
+                        chunk_start = sentence_start
+                    elif sentence_end - chunk_start > SEMANTIC_CHUNK_SIZE:
+                        emit(chunk_start, chunk_end)
+                        chunk_start = sentence_start
+                    chunk_end = sentence_end
+                    sentence_start = sentence_end
                 
-                # Look for potential section headers
-                section_context = full_text[max(0, chunk_pos - 200):chunk_pos]
-                section_match = re.search(r'([A-Z][A-Z\s]+:)|(\bI{1,3}\.|\bIV\.|\bV\.|\bVI\.|\bVII\.|\bVIII\.|\bIX\.|\bX\.)', section_context)
-                if section_match:
-                    chunk_meta["section"] = section_match.group(0).strip()
+                if chunk_start is not None:
+                    emit(chunk_start, chunk_end)
             
-            metadata.append(chunk_meta)
+            para_start = next_start
         
-        return metadata
+        # Headers after the last chunk still apply to the next page
+        if header_cursor < len(headers):
+            current_section = headers[-1][1]
+        
+        return chunks, current_section
     
-    def get_document_list(self, agent_name: Optional[str] = None) -> List[Dict]:
+    def get_document_list(self, agent_name: Optional[str] = None, document_type: Optional[str] = None) -> List[Dict]:
         """
-        Get list of documents, optionally filtered by agent
+        Get list of documents, optionally filtered by agent and type
         
         Args:
             agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
             
         Returns:
             List of document metadata dictionaries
         """
-        if agent_name:
-            return [doc for doc in self.document_data.values() 
-                   if doc["agent"].lower() == agent_name.lower()]
-        return list(self.document_data.values())
+        return self.catalog.list_documents(agent_name, document_type)
     
     def get_document_text(self, document_id: str) -> str:
         """
@@ -325,11 +1808,12 @@ class DocumentStore:
         Returns:
             Full document text
         """
-        if document_id not in self.document_data:
+        doc = self.catalog.get_document(document_id)
+        if not doc:
             logging.error(f"Document not found: {document_id}")
             return ""
         
-        text_path = self.document_data[document_id]["text_file"]
+        text_path = self._resolve_text_path(doc)
         try:
             with open(text_path, 'r', encoding='utf-8') as f:
                 return f.read()
@@ -337,11 +1821,50 @@ class DocumentStore:
             logging.error(f"Error reading document text: {str(e)}")
             return ""
     
+    def get_page_range(self, document_id: str, start_page: int, end_page: Optional[int] = None) -> str:
+        """
+        Get the text of a range of pages without reading the rest of the document
+        
+        Uses the page offset table to seek straight to the pages' bytes.
+        
+        Args:
+            document_id: Document ID
+            start_page: First page (1-based)
+            end_page: Last page, inclusive (defaults to start_page)
+            
+        Returns:
+            Text of the pages including their page markers, or empty string if not found
+        """
+        doc = self.catalog.get_document(document_id)
+        if not doc:
+            logging.error(f"Document not found: {document_id}")
+            return ""
+        
+        end_page = end_page or start_page
+        text_path = self._resolve_text_path(doc)
+        try:
+            span = self.catalog.page_span(doc["payload"], start_page, end_page)
+            if span is None and not self.catalog.get_pages(doc["payload"]):
+                # Documents indexed before page offsets were recorded get them on first access
+                self.catalog.set_pages(doc["payload"], page_offsets_from_file(text_path))
+                span = self.catalog.page_span(doc["payload"], start_page, end_page)
+            if span is None:
+                return ""
+            
+            with open(text_path, 'rb') as f:
+                f.seek(span[0])
+                return f.read(span[1] - span[0]).decode('utf-8').replace("\r\n", "\n")
+        except Exception as e:
+            logging.error(f"Error reading pages of {document_id}: {str(e)}")
+            return ""
+    
+    @_synchronized
     def search_documents(self, 
                         query: str, 
                         agent_name: Optional[str] = None,
                         document_type: Optional[str] = None,
-                        max_results: int = 10) -> List[Dict]:
+                        max_results: int = 10,
+                        search_mode: Optional[str] = None) -> List[Dict]:
         """
         Search for documents by keyword or semantic similarity
         
@@ -350,184 +1873,537 @@ class DocumentStore:
             agent_name: Optional filter by agent name
             document_type: Optional filter by document type
             max_results: Maximum number of results to return
+            search_mode: "hybrid", "semantic" or "keyword" (defaults to SEARCH_MODE)
             
         Returns:
-            List of search results with document snippets
+            List of search results with document snippets, plus the page, section, chunk index and score of each snippet
         """
-        results = []
+        results = self.search_many([query], [agent_name], document_type, max_results, search_mode)
+        return results[0] if results else []
+    
+    @_synchronized
+    def search_many(self, 
+                    queries: List[str], 
+                    agent_names: Optional[List[Optional[str]]] = None,
+                    document_type: Optional[str] = None,
+                    max_results: int = 10,
+                    search_mode: Optional[str] = None) -> List[List[Dict]]:
+        """
+        Run several searches in one pass
+        
+        All queries that miss the result cache are embedded in one batch and scored
+        against the corpus with a single matrix-matrix product, which is much cheaper
+        than searching them one by one (e.g. one query per debate delegation).
+        
+        Args:
+            queries: Search queries
+            agent_names: Optional agent filter per query (same length as queries; None entries mean all agents)
+            document_type: Optional filter by document type, applied to every query
+            max_results: Maximum number of results to return per query
+            search_mode: "hybrid", "semantic" or "keyword" (defaults to SEARCH_MODE)
+            
+        Returns:
+            One list of search results per query, in the order of the queries
+        """
+        search_mode = search_mode or SEARCH_MODE
+        if search_mode not in ("hybrid", "semantic", "keyword"):
+            logging.error(f"Unknown search mode: {search_mode}")
+            return []
+        if agent_names is None:
+            agent_names = [None] * len(queries)
+        if len(agent_names) != len(queries):
+            logging.error(f"Got {len(agent_names)} agent names for {len(queries)} queries")
+            return []
+        
+        # A store opened for some agents loads the shards of any other agent searched for
+        if self.agents is not None and not {shard_key(agent) for agent in agent_names if agent} <= self.agents:
+            self.load_agents([agent for agent in agent_names if agent])
         
-        # Filter documents by agent and type
-        filtered_docs = list(self.document_data.values())
-        if agent_name:
-            filtered_docs = [doc for doc in filtered_docs 
-                           if doc["agent"].lower() == agent_name.lower()]
-        if document_type:
-            filtered_docs = [doc for doc in filtered_docs 
-                           if doc["type"].lower() == document_type.lower()]
-        
-        # Try semantic search first if available
-        if self.model and query and self.enable_semantic_search:
-            semantic_results = self._semantic_search(query, filtered_docs, max_results)
-            if semantic_results:
+        # Documents still waiting for embeddings when the store opened get them now
+        if self.resume_embedding and search_mode != "keyword":
+            self.resume_embedding = False
+            if BACKGROUND_EMBEDDING:
+                self.start_embedding_worker()
+            else:
+                EmbeddingWorker(self, self.embedding_model).drain()
+        
+        self._sync_with_catalog()
+        
+        # Identical searches against an unchanged corpus are served from the result cache.
+        # The catalog generation moves on every upload, delete or new embedding (in any
+        # process), so a cached entry is never stale.
+        results = [None] * len(queries)
+        keys = []
+        pending = []
+        for i, (query, agent_name) in enumerate(zip(queries, agent_names)):
+            key = (self.catalog_generation, " ".join(query.split()) if query else query,
+                   agent_name.lower() if agent_name else None, document_type.lower() if document_type else None,
+                   max_results, self.vector_index.nprobe, search_mode)
+            keys.append(key)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self.result_cache.move_to_end(key)
+                self.result_cache_hits += 1
+                results[i] = copy.deepcopy(cached)
+            else:
+                self.result_cache_misses += 1
+                pending.append(i)
+        
+        if pending:
+            fresh = self._search_many([queries[i] for i in pending], [agent_names[i] for i in pending],
+                                      document_type, max_results, search_mode)
+            for i, result in zip(pending, fresh):
+                results[i] = result
+                self.result_cache[keys[i]] = copy.deepcopy(result)
+                if len(self.result_cache) > RESULT_CACHE_SIZE:
+                    self.result_cache.popitem(last=False)
+        
+        return results
+    
+    def _search_many(self, 
+                     queries: List[str], 
+                     agent_names: List[Optional[str]], 
+                     document_type: Optional[str], 
+                     max_results: int,
+                     search_mode: str) -> List[List[Dict]]:
+        """
+        Run searches: hybrid or semantic first (batched), keyword as the per-query fallback
+        
+        Args:
+            queries: Search queries
+            agent_names: Agent filter per query
+            document_type: Optional filter by document type
+            max_results: Maximum number of results to return per query
+            search_mode: "hybrid", "semantic" or "keyword"
+            
+        Returns:
+            One list of search results per query
+        """
+        results = [[] for _ in queries]
+        
+        # Try semantic search first if available (the model is only loaded once there are embeddings to search)
+        semantic = [i for i, query in enumerate(queries) if query]
+        use_embeddings = bool(semantic and search_mode != "keyword" and self.enable_semantic_search
+                              and self.vector_db and self.model)
+        if use_embeddings and search_mode == "hybrid":
+            hybrid_results = self._hybrid_search_many([queries[i] for i in semantic],
+                                                      [agent_names[i] for i in semantic],
+                                                      document_type, max_results)
+            for i, query_results in zip(semantic, hybrid_results):
+                results[i] = query_results
+        elif use_embeddings:
+            semantic_results = self._semantic_search_many([queries[i] for i in semantic],
+                                                          [agent_names[i] for i in semantic],
+                                                          document_type, max_results)
+            for i, query_results in zip(semantic, semantic_results):
                 # Add a marker that these are semantic search results
-                for result in semantic_results:
+                for result in query_results:
                     result["search_method"] = "semantic"
-                return semantic_results
-        
-        # Fall back to keyword search
-        logging.info(f"Falling back to keyword search for: '{query}'")
-        for doc in filtered_docs:
-            doc_id = doc["id"]
-            doc_text = self.get_document_text(doc_id)
-            
-            # Simple keyword search
-            if query.lower() in doc_text.lower():
-                # Find relevant snippets
-                snippets = self._find_snippets(doc_text, query)
+                results[i] = query_results
+        
+        # Fall back to keyword search for every query the embeddings found nothing for
+        for i, (query, agent_name) in enumerate(zip(queries, agent_names)):
+            if results[i]:
+                continue
+        
+            logging.info(f"Falling back to keyword search for: '{query}'")
+            payloads = None
+            if document_type:
+                # The agent filter picks the index shard; the type filter is an indexed catalog query
+                payloads = self.catalog.payloads(None, document_type)
+            
+            for result in self._keyword_search(query, agent_name, document_type, payloads, max_results):
+                result["search_method"] = "keyword"
+                results[i].append(result)
+        
+        return results
+    
+    def _keyword_search(self, 
+                        query: str, 
+                        agent_name: Optional[str], 
+                        document_type: Optional[str], 
+                        payloads: Optional[set], 
+                        max_results: int) -> List[Dict]:
+        """
+        Perform BM25 keyword search over the inverted index
+        
+        Args:
+            query: Search query
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+            payloads: Optional set of payload keys to restrict the search to
+            max_results: Maximum number of results
+            
+        Returns:
+            List of search results with document snippets
+        """
+        try:
+            hits = self.keyword_index.search(query, max_results * 10, agent_name, payloads)
+            
+            # Group the ranked chunks by document, keeping the best 3 chunks of each
+            grouped = {}
+            for payload, chunk_idx, score, offsets in hits:
+                doc_hits = grouped.setdefault(payload, [])
+                if len(doc_hits) < 3:
+                    doc_hits.append((chunk_idx, score, offsets))
+            
+            results = []
+            for payload, doc_hits in grouped.items():
+                doc = self._document_for_payload(payload, agent_name, document_type)
+                if not doc:
+                    continue
+                
+                entries = self.catalog.get_chunk_entries(payload, [chunk_idx for chunk_idx, _, _ in doc_hits])
+                snippets = [
+                    self._format_snippet(entries[chunk_idx], self._snippet_around(entries[chunk_idx]["text"], offsets))
+                    for chunk_idx, _, offsets in doc_hits
+                ]
                 
                 results.append({
-                    "document_id": doc_id,
+                    "document_id": doc["id"],
                     "title": doc["title"],
                     "agent": doc["agent"],
                     "type": doc["type"],
-                    "snippets": snippets[:3],  # Top 3 snippets
-                    "score": len(snippets),  # Score by number of matches
-                    "search_method": "keyword"
+                    "snippets": snippets,
+                    "pages": [entries[chunk_idx]["page"] for chunk_idx, _, _ in doc_hits],
+                    "sections": [entries[chunk_idx]["section"] for chunk_idx, _, _ in doc_hits],
+                    "chunks": [chunk_idx for chunk_idx, _, _ in doc_hits],
+                    "snippet_scores": [float(score) for _, score, _ in doc_hits],
+                    "score": float(doc_hits[0][1])
                 })
+                
+                if len(results) >= max_results:
+                    break
+            
+            return results
+        except Exception as e:
+            logging.error(f"Error in keyword search: {str(e)}")
+            return []
+    
+    def _document_for_payload(self, 
+                              payload: str, 
+                              agent_name: Optional[str], 
+                              document_type: Optional[str]) -> Optional[Dict]:
+        """
+        Pick the document a search hit on a payload is reported as
         
-        # Sort by score and limit results
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:max_results]
+        Args:
+            payload: Payload key that matched
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+            
+        Returns:
+            Metadata of the first document sharing the payload that passes the filters, or None
+        """
+        for doc in self.catalog.documents_for_payload(payload):
+            if agent_name and doc["agent"].lower() != agent_name.lower():
+                continue
+            if document_type and doc["type"].lower() != document_type.lower():
+                continue
+            return doc
+        return None
     
-    def _semantic_search(self, query: str, documents: List[Dict], max_results: int) -> List[Dict]:
+    def _format_snippet(self, meta: Dict, text: str) -> str:
         """
-        Perform semantic search using embeddings
+        Prefix a snippet with the page and section of the chunk it came from
         
         Args:
-            query: Search query
-            documents: List of document metadata
-            max_results: Maximum number of results
+            meta: Catalog entry of the chunk (with "page" and "section" keys)
+            text: Snippet text
             
         Returns:
-            List of search results with document snippets
+            Snippet with a context marker when page or section info is available
         """
-        try:
-            if not self.enable_semantic_search or not self.model:
-                return []
+        page_info = f" (Page {meta.get('page')})" if meta.get('page') else ""
+        section_info = f" - {meta.get('section')}" if meta.get('section') else ""
+        
+        if page_info or section_info:
+            return f"{page_info}{section_info}: {text}"
+        return text
+    
+    def _hybrid_search_many(self, 
+                            queries: List[str], 
+                            agent_names: List[Optional[str]], 
+                            document_type: Optional[str], 
+                            max_results: int) -> List[List[Dict]]:
+        """
+        Rank chunks by keyword and semantic similarity and fuse the two rankings
+        
+        Both methods rank the same chunks, keyed as (document slot << 32 | chunk index),
+        so the rankings are fused with reciprocal-rank fusion in one vectorized step.
+        The semantic rankings of all queries come from one batched search, in which
+        each agent's index shard scores only the queries for that agent.
+        
+        Args:
+            queries: Search queries
+            agent_names: Agent filter per query
+            document_type: Optional filter by document type
+            max_results: Maximum number of results per query
             
-            logging.info(f"Performing semantic search for: '{query}'")
+        Returns:
+            One list of search results per query, each with its fused score and the
+            semantic and keyword scores of its best chunk (None where a method missed it)
+        """
+        try:
+            logging.info(f"Performing hybrid search for {len(queries)} queries")
             
-            # Encode the query
-            query_embedding = self.model.encode(query)
-            results = []
+            depth = max_results * 10
+            query_embeddings = self._encode_queries(queries)
+            semantic_hits = self.vector_index.search_batch(query_embeddings, depth, agent_names, document_type)
             
-            for doc in documents:
-                doc_id = doc["id"]
+            all_results = []
+            for query, agent_name, (keys, scores) in zip(queries, agent_names, semantic_hits):
+                hits = scores > SIMILARITY_THRESHOLD
+                semantic_keys, scores = keys[hits], scores[hits]
                 
-                # Skip if document doesn't have embeddings
-                if doc_id not in self.vector_db:
-                    continue
+                payloads = self.catalog.payloads(None, document_type) if document_type else None
+                keyword_hits = self.keyword_index.search(query, depth, agent_name, payloads)
                 
-                chunks = self.vector_db[doc_id]["chunks"]
-                embeddings = self.vector_db[doc_id]["embeddings"]
-                chunk_metadata = self.vector_db[doc_id].get("chunk_metadata", [{}] * len(chunks))
+                # Payloads without embeddings get slots past the last one the vector index handed out
+                slots = dict(self.vector_index.doc_slots)
+                payload_of_slot = dict(self.vector_index.doc_ids)
+                next_slot = self.vector_index.next_slot
+                for payload, _, _, _ in keyword_hits:
+                    if payload not in slots:
+                        slots[payload] = next_slot
+                        payload_of_slot[next_slot] = payload
+                        next_slot += 1
+                keyword_keys = np.array([(slots[payload] << 32) | chunk_idx for payload, chunk_idx, _, _ in keyword_hits],
+                                        dtype=np.int64)
+                keyword_scores = np.array([score for _, _, score, _ in keyword_hits], dtype=np.float64)
+                offsets = {(payload, chunk_idx): chunk_offsets for payload, chunk_idx, _, chunk_offsets in keyword_hits}
                 
-                if len(chunks) == 0:
-                    continue
-                    
-                # Calculate cosine similarity
-                similarities = np.dot(embeddings, query_embedding) / (
-                    np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-                )
+                keys, fused, method_scores = _reciprocal_rank_fusion([(semantic_keys, scores),
+                                                                      (keyword_keys, keyword_scores)])
                 
-                # Get top chunks
-                top_indices = np.argsort(similarities)[-5:][::-1]  # Get 5 instead of 3 for more context
-                top_scores = similarities[top_indices]
+                # Group the fused chunks by document, keeping the best 3 chunks of each
+                grouped = {}
+                for key, fused_score, semantic_score, keyword_score in zip(keys.tolist(), fused.tolist(),
+                                                                          method_scores[0].tolist(),
+                                                                          method_scores[1].tolist()):
+                    payload = payload_of_slot[key >> 32]
+                    doc_hits = grouped.setdefault(payload, [])
+                    if len(doc_hits) < 3:
+                        doc_hits.append((key & 0xFFFFFFFF, fused_score, semantic_score, keyword_score))
                 
-                # Only include if there's a reasonable match
-                if len(top_indices) > 0 and top_scores[0] > SIMILARITY_THRESHOLD:
-                    # Get the top chunks and their metadata
-                    top_chunks = [chunks[i] for i in top_indices if similarities[i] > SIMILARITY_THRESHOLD]
-                    top_metadata = [chunk_metadata[i] if i < len(chunk_metadata) else {} for i in top_indices if similarities[i] > SIMILARITY_THRESHOLD]
+                results = []
+                for payload, doc_hits in grouped.items():
+                    doc = self._document_for_payload(payload, agent_name, document_type)
+                    if not doc:
+                        continue
                     
-                    # Format snippets with page and section info when available
+                    # Keyword matches are cut around the matched terms, semantic-only matches keep the whole chunk
+                    entries = self.catalog.get_chunk_entries(payload, [chunk_idx for chunk_idx, _, _, _ in doc_hits])
                     snippets = []
-                    for i, chunk in enumerate(top_chunks):
-                        if i >= 3:  # Limit to 3 snippets
-                            break
-                            
-                        meta = top_metadata[i] if i < len(top_metadata) else {}
-                        page_info = f" (Page {meta.get('page')})" if meta.get('page') else ""
-                        section_info = f" - {meta.get('section')}" if meta.get('section') else ""
-                        
-                        # Add context marker
-                        if page_info or section_info:
-                            snippet = f"{page_info}{section_info}: {chunk}"
-                        else:
-                            snippet = chunk
-                            
-                        snippets.append(snippet)
+                    for chunk_idx, _, _, _ in doc_hits:
+                        text = entries[chunk_idx]["text"]
+                        if (payload, chunk_idx) in offsets:
+                            text = self._snippet_around(text, offsets[(payload, chunk_idx)])
+                        snippets.append(self._format_snippet(entries[chunk_idx], text))
                     
-                    # Create result entry
+                    _, fused_score, semantic_score, keyword_score = doc_hits[0]
                     results.append({
-                        "document_id": doc_id,
+                        "document_id": doc["id"],
                         "title": doc["title"],
                         "agent": doc["agent"],
                         "type": doc["type"],
                         "snippets": snippets,
-                        "score": float(top_scores[0])  # Convert to float for JSON serialization
+                        "pages": [entries[chunk_idx]["page"] for chunk_idx, _, _, _ in doc_hits],
+                        "sections": [entries[chunk_idx]["section"] for chunk_idx, _, _, _ in doc_hits],
+                        "chunks": [chunk_idx for chunk_idx, _, _, _ in doc_hits],
+                        "snippet_scores": [score for _, score, _, _ in doc_hits],
+                        "score": fused_score,
+                        "semantic_score": None if np.isnan(semantic_score) else semantic_score,
+                        "keyword_score": None if np.isnan(keyword_score) else keyword_score,
+                        "search_method": "hybrid"
                     })
+                    
+                    if len(results) >= max_results:
+                        break
+                
+                logging.info(f"Hybrid search found {len(results)} results for '{query}'")
+                all_results.append(results)
+            return all_results
+        
+        except Exception as e:
+            logging.error(f"Error in hybrid search: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _semantic_search_many(self, 
+                              queries: List[str], 
+                              agent_names: List[Optional[str]], 
+                              document_type: Optional[str], 
+                              max_results: int) -> List[List[Dict]]:
+        """
+        Perform semantic search for several queries using the per-agent embedding matrices
+        
+        Args:
+            queries: Search queries
+            agent_names: Agent filter per query
+            document_type: Optional filter by document type
+            max_results: Maximum number of results per query
+            
+        Returns:
+            One list of search results with document snippets per query
+        """
+        try:
+            if not self.enable_semantic_search or not self.model:
+                return [[] for _ in queries]
             
-            # Sort by score and limit results
-            results.sort(key=lambda x: x["score"], reverse=True)
+            logging.info(f"Performing semantic search for {len(queries)} queries")
             
-            logging.info(f"Semantic search found {len(results)} results for '{query}'")
-            return results[:max_results]
+            # Encode the queries in one batch (reusing cached embeddings) and score them together
+            query_embeddings = self._encode_queries(queries)
             
+            # Widen the candidate pool of each query until enough documents clear the threshold
+            ranked = [None] * len(queries)
+            active = list(range(len(queries)))
+            k = max_results * 5
+            while active:
+                hits_per_query = self.vector_index.search_batch(query_embeddings[active], k,
+                                                                [agent_names[i] for i in active], document_type)
+                widen = []
+                for i, (keys, scores) in zip(active, hits_per_query):
+                    hits = scores > SIMILARITY_THRESHOLD
+                    ranked[i] = (keys[hits], scores[hits])
+                    
+                    exhausted = len(hits) < k or not hits.all()
+                    doc_count = len(set((keys[hits] >> 32).tolist()))
+                    if not exhausted and doc_count < max_results:
+                        widen.append(i)
+                active = widen
+                k *= 4
+            
+            all_results = []
+            for query, agent_name, (keys, scores) in zip(queries, agent_names, ranked):
+                results = self._group_semantic_hits(keys, scores, agent_name, document_type, max_results)
+                logging.info(f"Semantic search found {len(results)} results for '{query}'")
+                all_results.append(results)
+            return all_results
+        
         except Exception as e:
             logging.error(f"Error in semantic search: {str(e)}")
-            return []
+            return [[] for _ in queries]
     
-    def _find_snippets(self, text: str, query: str, context_size: int = 150) -> List[str]:
+    def _group_semantic_hits(self, 
+                             keys: np.ndarray, 
+                             scores: np.ndarray, 
+                             agent_name: Optional[str], 
+                             document_type: Optional[str], 
+                             max_results: int) -> List[Dict]:
         """
-        Find relevant text snippets containing the query
+        Turn ranked chunk keys into per-document search results
         
         Args:
-            text: Document text
-            query: Search query
-            context_size: Number of characters to include before and after the match
+            keys: Matching chunks as (document slot << 32 | chunk index), best first
+            scores: Cosine score of each chunk
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+            max_results: Maximum number of results
             
         Returns:
-            List of relevant snippets
+            List of search results with document snippets
         """
-        snippets = []
-        query_lower = query.lower()
-        text_lower = text.lower()
-        
-        start = 0
-        while start < len(text_lower):
-            pos = text_lower.find(query_lower, start)
-            if pos == -1:
-                break
+        # Group the ranked chunks by document, keeping the best 3 chunks of each
+        grouped = {}
+        for key, score in zip(keys.tolist(), scores.tolist()):
+            payload, chunk_idx = self.vector_index.doc_ids[key >> 32], key & 0xFFFFFFFF
+            hits_for_doc = grouped.setdefault(payload, [])
+            if len(hits_for_doc) < 3:
+                hits_for_doc.append((chunk_idx, score))
+            
+        results = []
+        for payload, doc_hits in grouped.items():
+            doc = self._document_for_payload(payload, agent_name, document_type)
+            if not doc:
+                continue
+            
+            # Format snippets with page and section info when available
+            entries = self.catalog.get_chunk_entries(payload, [chunk_idx for chunk_idx, _ in doc_hits])
+            snippets = [self._format_snippet(entries[chunk_idx], entries[chunk_idx]["text"])
+                        for chunk_idx, _ in doc_hits]
+            
+            results.append({
+                "document_id": doc["id"],
+                "title": doc["title"],
+                "agent": doc["agent"],
+                "type": doc["type"],
+                "snippets": snippets,
+                "pages": [entries[chunk_idx]["page"] for chunk_idx, _ in doc_hits],
+                "sections": [entries[chunk_idx]["section"] for chunk_idx, _ in doc_hits],
+                "chunks": [chunk_idx for chunk_idx, _ in doc_hits],
+                "snippet_scores": [float(score) for _, score in doc_hits],
+                "score": float(doc_hits[0][1])  # Convert to float for JSON serialization
+            })
                 
-            # Get context around the match
-            snippet_start = max(0, pos - context_size)
-            snippet_end = min(len(text), pos + len(query) + context_size)
-            
-            # Extract the snippet
-            snippet = text[snippet_start:snippet_end]
-            
-            # Add ellipsis if clipped
-            if snippet_start > 0:
-                snippet = "..." + snippet
-            if snippet_end < len(text):
-                snippet = snippet + "..."
+            if len(results) >= max_results:
+                break
+            
+        return results
+            
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed search queries, reusing the embeddings of identical earlier queries
                 
-            snippets.append(snippet)
-            start = pos + len(query)
+        Queries are normalized by collapsing whitespace, and all queries missing from
+        the cache are encoded in a single model call. The least recently used entry is
+        evicted once QUERY_CACHE_SIZE embeddings are cached.
+        
+        Args:
+            queries: Search queries
+            
+        Returns:
+            2D array with one query embedding per row
+        """
+        keys = [(self.embedding_model, " ".join(query.split())) for query in queries]
+        embeddings = {}
+        for key in keys:
+            embedding = self.query_cache.get(key)
+            if embedding is not None:
+                self.query_cache.move_to_end(key)
+                self.query_cache_hits += 1
+                embeddings[key] = embedding
+        
+        missing = list(dict.fromkeys(key for key in keys if key not in embeddings))
+        if missing:
+            self.query_cache_misses += len(missing)
+            encoded = np.asarray(self.model.encode([key[1] for key in missing]), dtype=np.float32)
+            for key, embedding in zip(missing, encoded):
+                embedding.setflags(write=False)
+                embeddings[key] = embedding
+                self.query_cache[key] = embedding
+                if len(self.query_cache) > QUERY_CACHE_SIZE:
+                    self.query_cache.popitem(last=False)
+        
+        return np.stack([embeddings[key] for key in keys])
+    
+    def _snippet_around(self, text: str, offsets: List[int], context_size: int = 150) -> str:
+        """
+        Cut a snippet out of a chunk around the first keyword match
+        
+        Args:
+            text: Chunk text
+            offsets: Character offsets of the matched terms in the chunk
+            context_size: Number of characters to include before and after the match
+            
+        Returns:
+            Snippet text, with ellipses where it was clipped
+        """
+        pos = offsets[0] if offsets else 0
+        snippet_start = max(0, pos - context_size)
+        snippet_end = min(len(text), pos + context_size)
+        
+        snippet = text[snippet_start:snippet_end]
+        
+        # Add ellipsis if clipped
+        if snippet_start > 0:
+            snippet = "..." + snippet
+        if snippet_end < len(text):
+            snippet = snippet + "..."
             
-        return snippets
+        return snippet
     
+    @_synchronized
     def delete_document(self, document_id: str) -> bool:
         """
         Delete a document from the store
@@ -538,28 +2414,21 @@ class DocumentStore:
         Returns:
             True if successful, False otherwise
         """
-        if document_id not in self.document_data:
+        doc = self.catalog.get_document(document_id)
+        if not doc:
             logging.error(f"Document not found: {document_id}")
             return False
             
         try:
-            # Get file paths
-            doc = self.document_data[document_id]
-            text_path = doc["text_file"]
-            
-            # Delete files
-            if os.path.exists(text_path):
-                os.remove(text_path)
-                
-            # Remove from vector DB if it exists
-            if document_id in self.vector_db:
-                del self.vector_db[document_id]
-                
-            # Remove from index
-            del self.document_data[document_id]
+            payload = doc["payload"]
             
-            # Save index
-            self._save_index()
+            # Remove from the catalog; chunk and page rows go with the last reference
+            if self.catalog.delete_document(document_id):
+                # Last reference: drop the text, postings and embeddings
+                self._delete_payload(payload, self._resolve_text_path(doc))
+            else:
+                # Other documents still use this content; only their search labels (and shards) change
+                self._relabel_payload(payload)
             
             logging.info(f"Successfully deleted document: {document_id}")
             return True
@@ -567,34 +2436,70 @@ class DocumentStore:
             logging.error(f"Error deleting document: {str(e)}")
             return False
     
+    @_synchronized
     def get_embedding_stats(self) -> Dict:
         """
         Get statistics about the vector database
-        
+            
         Returns:
             Dictionary with statistics
         """
+        result_cache = {
+            "size": len(self.result_cache),
+            "capacity": RESULT_CACHE_SIZE,
+            "hits": self.result_cache_hits,
+            "misses": self.result_cache_misses
+        }
+        
+        # What the header/footer and near-duplicate filters left out of the stored documents
+        ingest_filters = self.catalog.ingest_totals()
+        
         if not self.enable_semantic_search:
-            return {"enabled": False}
+            return {"enabled": False, "result_cache": result_cache, "ingest_filters": ingest_filters}
         
         stats = {
             "enabled": True,
-            "model": EMBEDDING_MODEL,
+            "result_cache": result_cache,
+            "ingest_filters": ingest_filters,
+            "model": self.embedding_model,
+            "reembed_target": self.catalog.get_meta("reembed_target") or None,
+            "model_loaded": self._model is not None,
             "documents_with_embeddings": len(self.vector_db),
-            "total_chunks": sum(len(data["chunks"]) for data in self.vector_db.values()) if self.vector_db else 0,
+            "total_chunks": sum(len(data["embeddings"]) for data in self.vector_db.values()) if self.vector_db else 0,
+            "query_cache": {
+                "size": len(self.query_cache),
+                "capacity": QUERY_CACHE_SIZE,
+                "hits": self.query_cache_hits,
+                "misses": self.query_cache_misses
+            },
+            "index_mode": (f"ivf ({self.vector_index.ann_lists()} lists, nprobe={self.vector_index.nprobe})"
+                           if self.vector_index.uses_ann() else "exact"),
+            "shards": self.vector_index.shard_sizes(),
+            "vector_memory": self.vector_index.memory_stats(),
+            "recall_at_10": self.vector_index.measure_recall(10),
+            "embedding_jobs": self._embedding_job_counts(),
+            "encoding": self.encoder.stats(),
+            "embedding_cache": self.encoder.cache.stats() if self.encoder.cache else None,
             "documents": {}
         }
         
-        # Get per-document stats
-        for doc_id, data in self.vector_db.items():
-            if doc_id in self.document_data:
-                doc_title = self.document_data[doc_id]["title"]
-                stats["documents"][doc_title] = {
-                    "chunks": len(data["chunks"]),
+        # Get per-document stats (documents sharing content are listed under the first title)
+        for payload, data in self.vector_db.items():
+            sharing = self.catalog.documents_for_payload(payload)
+            if sharing:
+                stats["documents"][sharing[0]["title"]] = {
+                    "chunks": len(data["embeddings"]),
                     "embedding_size": data["embeddings"].shape[1] if len(data["embeddings"]) > 0 else 0
                 }
         
         return stats
+    
+    def _embedding_job_counts(self) -> Dict[str, int]:
+        """Number of embedding jobs in each state"""
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self.catalog.embedding_jobs(self.embedding_model).values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
 
 def get_document_context_for_agent(document_store: DocumentStore, agent_name: str, topic: str) -> str:
     """
@@ -634,7 +2539,8 @@ def get_document_context_for_agent(document_store: DocumentStore, agent_name: st
 def get_document_context_for_prompt(document_store: DocumentStore, 
                                   agent_name: str, 
                                   last_message: str,
-                                  topic: str) -> str:
+                                  topic: str,
+                                  token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
     """
     Generate a context string for an agent's prompt based on relevant documents
     
@@ -643,6 +2549,7 @@ def get_document_context_for_prompt(document_store: DocumentStore,
         agent_name: Agent name to filter documents
         last_message: Last message from another agent to provide context
         topic: Debate topic
+        token_budget: Maximum estimated tokens of the context
         
     Returns:
         Formatted context string with relevant document snippets
@@ -654,27 +2561,19 @@ def get_document_context_for_prompt(document_store: DocumentStore,
     search_results = document_store.search_documents(
         query=search_query,
         agent_name=agent_name,
-        max_results=3
+        max_results=5
     )
     
     if not search_results:
         return ""
     
-    # Format the context string
-    context_parts = [
-        "Based on your policy documents, consider these relevant points when formulating your response:"
-    ]
-    
-    for result in search_results:
-        for snippet in result['snippets'][:2]:  # Limit to 2 snippets per document
-            # Clean and format the snippet
-            clean_snippet = re.sub(r'\s+', ' ', snippet).strip()
-            if len(clean_snippet) > 300:
-                clean_snippet = clean_snippet[:300] + "..."
-            
-            context_parts.append(f"• {clean_snippet} (Source: {result['title']})")
-    
-    return "\n".join(context_parts)
+    # Keep the most useful, non-redundant snippets that fit the budget
+    packed = pack_context(
+        search_results,
+        token_budget,
+        header="Based on your policy documents, consider these relevant points when formulating your response:"
+    )
+    return packed["text"]
 
 
 # Example usage in a standalone script
@@ -685,9 +2584,6 @@ if __name__ == "__main__":
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    # Test the document store
-    store = DocumentStore()
-    
     # Command-line interface for testing
     import argparse
     
@@ -704,6 +2600,18 @@ if __name__ == "__main__":
     upload_parser.add_argument('--title', help='Document title')
     upload_parser.add_argument('--desc', help='Document description')
     
+    # Bulk ingest command
+    ingest_parser = subparsers.add_parser('ingest-dir', help='Ingest every PDF in a directory')
+    ingest_parser.add_argument('--dir', required=True, help='Directory containing PDF files')
+    ingest_parser.add_argument('--agent', 
+                             choices=['United_States', 'European_Union', 'Peoples_Republic_of_China'],
+                             help='Default agent for files not covered by --mapping')
+    ingest_parser.add_argument('--type', help='Default document type for files not covered by --mapping')
+    ingest_parser.add_argument('--mapping', 
+                             help='JSON file mapping filename globs to {"agent", "type", "title", "description"}')
+    ingest_parser.add_argument('--recursive', action='store_true', help='Include PDFs in subdirectories')
+    ingest_parser.add_argument('--workers', type=int, help='Number of extraction processes')
+    
     # List command
     list_parser = subparsers.add_parser('list', help='List documents')
     list_parser.add_argument('--agent', help='Filter by agent')
@@ -714,6 +2622,14 @@ if __name__ == "__main__":
     search_parser.add_argument('--agent', help='Filter by agent')
     search_parser.add_argument('--type', help='Filter by document type')
     search_parser.add_argument('--max', type=int, default=5, help='Maximum results')
+    search_parser.add_argument('--nprobe', type=int, help='IVF lists to probe (recall/latency trade-off)')
+    search_parser.add_argument('--mode', choices=['hybrid', 'semantic', 'keyword'],
+                             help=f'Retrieval mode (default: {SEARCH_MODE})')
+    
+    # Update command
+    update_parser = subparsers.add_parser('update', help='Update a document, re-encoding only changed chunks')
+    update_parser.add_argument('--id', required=True, help='Document ID')
+    update_parser.add_argument('--file', help='Revised PDF (omit to re-chunk the stored text)')
     
     # Delete command
     delete_parser = subparsers.add_parser('delete', help='Delete a document')
@@ -722,6 +2638,16 @@ if __name__ == "__main__":
     # Get command
     get_parser = subparsers.add_parser('get', help='Get document text')
     get_parser.add_argument('--id', required=True, help='Document ID')
+    get_parser.add_argument('--pages', help='Page or page range to print (e.g. 3 or 3-5)')
+    
+    # Re-embed command: move the corpus to another embedding model without downtime
+    reembed_parser = subparsers.add_parser('reembed', help='Re-embed all documents with another model, then switch')
+    reembed_parser.add_argument('--model', required=True, help='sentence-transformers model name')
+    reembed_parser.add_argument('--no-wait', action='store_true',
+                                help='Only queue the work; a running uploader or embed-pending finishes it')
+    
+    # Embed-pending command: run the background worker until the queue is empty
+    subparsers.add_parser('embed-pending', help='Create queued embeddings (e.g. left by an interrupted upload)')
     
     # Add status command to show semantic search info
     status_parser = subparsers.add_parser('status', help='Show semantic search status')
@@ -729,6 +2655,9 @@ if __name__ == "__main__":
     # Parse arguments
     args = parser.parse_args()
     
+    # A search for one agent only loads that agent's index shards
+    store = DocumentStore(agents=[args.agent] if args.command == 'search' and args.agent else None)
+    
     if args.command == 'upload':
         doc_id = store.upload_document(
             file_path=args.file,
@@ -739,9 +2668,53 @@ if __name__ == "__main__":
         )
         if doc_id:
             print(f"Document uploaded successfully. ID: {doc_id}")
+            if store.embedding_worker:
+                # The worker thread dies with this process, so finish the embeddings before exiting
+                print("Creating embeddings in the background...")
+                store.wait_for_embeddings()
+                print(f"Embeddings: {store.get_embedding_status([doc_id])[doc_id]['status']}")
         else:
             print("Failed to upload document")
     
+    elif args.command == 'reembed':
+        if not store.reembed(args.model):
+            print(f"Failed to start re-embedding with {args.model}")
+        elif args.no_wait:
+            print(f"Re-embedding with {args.model} queued; searches keep using {store.embedding_model} until it finishes")
+        else:
+            print(f"Re-embedding with {args.model}; searches keep using {store.embedding_model} until it finishes...")
+            store.wait_for_reembedding()
+            print(f"Active embedding model: {store.embedding_model}")
+    
+    elif args.command == 'embed-pending':
+        if store.enable_semantic_search:
+            store.wait_for_embeddings()
+            if store.catalog.get_meta("reembed_target"):
+                store.wait_for_reembedding()
+        # Only the job counts are needed; the full stats would re-measure recall on the changed index
+        jobs = store._embedding_job_counts()
+        print(f"Embedding queue drained: {jobs['done']} done, {jobs['failed']} failed")
+    
+    elif args.command == 'ingest-dir':
+        mapping = None
+        if args.mapping:
+            with open(args.mapping, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+        
+        report = store.bulk_ingest(
+            directory=args.dir,
+            agent_name=args.agent,
+            document_type=args.type,
+            mapping=mapping,
+            recursive=args.recursive,
+            workers=args.workers
+        )
+        print(f"Ingested {len(report['documents'])} documents "
+              f"({len(report['failed'])} failed, {len(report['skipped'])} skipped without a mapping)")
+        print(f"{report['pages']} pages, {report['chunks']} chunks in {report['total_seconds']:.1f}s "
+              f"(embedding: {report['embed_seconds']:.1f}s)")
+        print(f"Throughput: {report['pages_per_second']:.1f} pages/s, {report['chunks_per_second']:.1f} chunks/s")
+    
     elif args.command == 'list':
         docs = store.get_document_list(args.agent)
         print(f"Found {len(docs)} documents:")
@@ -749,25 +2722,56 @@ if __name__ == "__main__":
             print(f"{doc['id']} - {doc['title']} ({doc['agent']}, {doc['type']})")
     
     elif args.command == 'search':
+        if args.nprobe:
+            store.vector_index.nprobe = args.nprobe
+        pending = store.catalog.pending_embedding_jobs(store.embedding_model) if store.resume_embedding else 0
+        if pending and (args.mode or SEARCH_MODE) != 'keyword':
+            # The worker thread dies with this process, so create the embeddings before searching
+            print(f"Creating embeddings for {pending} documents first...")
+            store.wait_for_embeddings()
         results = store.search_documents(
             query=args.query,
             agent_name=args.agent,
             document_type=args.type,
-            max_results=args.max
+            max_results=args.max,
+            search_mode=args.mode
         )
         print(f"Found {len(results)} results:")
         for i, result in enumerate(results):
             print(f"{i+1}. {result['title']} ({result['agent']}, {result['type']}, score: {result['score']:.2f})")
+            if result.get('search_method') == 'hybrid':
+                semantic_score, keyword_score = result['semantic_score'], result['keyword_score']
+                print(f"   semantic: {'-' if semantic_score is None else f'{semantic_score:.2f}'}, "
+                      f"keyword: {'-' if keyword_score is None else f'{keyword_score:.2f}'}")
             for j, snippet in enumerate(result['snippets']):
                 print(f"   Snippet {j+1}: {snippet[:100]}...")
             print()
     
+    elif args.command == 'update':
+        report = store.update_document(args.id, args.file)
+        if report:
+            print(f"Document {args.id} updated: {report['chunks']} chunks, {report['reused']} embeddings reused, "
+                  f"{report['encoded']} chunks encoded in {report['seconds']:.1f}s")
+            if report["queued"]:
+                print("Creating embeddings in the background...")
+                store.wait_for_embeddings()
+        else:
+            print(f"Failed to update document {args.id}")
+    
     elif args.command == 'delete':
         if store.delete_document(args.id):
             print(f"Document {args.id} deleted successfully")
         else:
             print(f"Failed to delete document {args.id}")
     
+    elif args.command == 'get' and args.pages:
+        start_page, _, end_page = args.pages.partition('-')
+        text = store.get_page_range(args.id, int(start_page), int(end_page) if end_page else None)
+        if text:
+            print(text)
+        else:
+            print(f"Failed to get pages {args.pages} of document {args.id}")
+    
     elif args.command == 'get':
         text = store.get_document_text(args.id)
         if text:
@@ -778,11 +2782,41 @@ if __name__ == "__main__":
     
     elif args.command == 'status':
         stats = store.get_embedding_stats()
+        ingest = stats["ingest_filters"]
+        total = ingest["chunks"] + ingest["duplicate_chunks"]
+        print(f"Ingest filters: {ingest['boilerplate_lines']} header/footer lines "
+              f"({ingest['boilerplate_chars']} characters) stripped, {ingest['duplicate_chunks']} near-duplicate "
+              f"chunks dropped ({ingest['duplicate_chunks'] / total if total else 0:.1%} of chunks)")
         if stats["enabled"]:
             print(f"Semantic search is ENABLED")
             print(f"Using model: {stats['model']}")
+            if stats["reembed_target"]:
+                print(f"Re-embedding in progress: {stats['reembed_target']}")
             print(f"Documents with embeddings: {stats['documents_with_embeddings']}")
             print(f"Total text chunks indexed: {stats['total_chunks']}")
+            print(f"Search index: {stats['index_mode']}")
+            if stats["shards"]:
+                print("Index shards: " + ", ".join(f"{agent} ({rows} chunks)" for agent, rows in stats["shards"].items()))
+            memory = stats["vector_memory"]
+            print(f"Vector storage: {memory['storage']}, {memory['bytes'] / 2**20:.1f} MiB "
+                  f"({memory['ratio']:.0%} of float32)")
+            if stats["recall_at_10"] is not None:
+                print(f"Recall@10 against exact float32 search: {stats['recall_at_10']:.3f}")
+            encoding = stats["encoding"]
+            if encoding["chunks"]:
+                print(f"Chunk encoding: {encoding['chunks']} chunks ({encoding['cached']} from cache) "
+                      f"in {encoding['batches']} batches, {encoding['chunks_per_second']:.1f} chunks/s")
+            if stats["embedding_cache"] is not None:
+                print(f"Chunk embedding cache: {stats['embedding_cache'].get(stats['model'], 0)} entries for this model")
+            jobs = stats["embedding_jobs"]
+            print(f"Embedding jobs: {jobs['queued']} queued, {jobs['running']} running, "
+                  f"{jobs['done']} done, {jobs['failed']} failed")
+            cache = stats["query_cache"]
+            print(f"Query embedding cache: {cache['size']}/{cache['capacity']} entries, "
+                  f"{cache['hits']} hits, {cache['misses']} misses")
+            cache = stats["result_cache"]
+            print(f"Search result cache: {cache['size']}/{cache['capacity']} entries, "
+                  f"{cache['hits']} hits, {cache['misses']} misses")
             
             if stats["documents"]:
                 print("\nDocument details:")
@@ -1,7 +1,7 @@
 import streamlit as st
 import os
 import pandas as pd
-from document_retrieval import DocumentStore
+from document_retrieval import get_document_store
 import tempfile
 import logging
 
@@ -11,9 +11,6 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Initialize document store
-document_store = DocumentStore()
-
 # Set page title and icon
 st.set_page_config(
     page_title="AI Debate Document Manager",
@@ -21,6 +18,18 @@ st.set_page_config(
     layout="wide"
 )
 
+# Streamlit re-runs this script on every interaction; the cached resource keeps one
+# store (and its embedding model and indexes) alive across reruns and sessions
+@st.cache_resource(show_spinner=False)
+def load_document_store():
+    store = get_document_store()
+    # Embeddings are created by a background worker; it also resumes jobs queued by earlier sessions
+    if store.enable_semantic_search:
+        store.start_embedding_worker()
+    return store
+
+document_store = load_document_store()
+
 # CSS for better styling
 st.markdown("""
 <style>
@@ -148,6 +157,7 @@ if action == "Upload Documents":
                     
                     if doc_id:
                         status_text.success(f"✅ Successfully uploaded: {file_data['title']}")
+                        st.session_state.setdefault("recent_uploads", []).append(doc_id)
                     else:
                         status_text.error(f"❌ Failed to upload: {file_data['title']}")
                         
@@ -161,6 +171,24 @@ if action == "Upload Documents":
             status_text.text("All documents processed!")
             st.success(f"Successfully uploaded {len(file_info)} documents for {agent_name.replace('_', ' ')}")
             st.balloons()
+    
+    # Uploads return before their embeddings exist; show how far the background worker got
+    recent_uploads = st.session_state.get("recent_uploads", [])
+    if recent_uploads:
+        st.subheader("Embedding Status")
+        st.caption("Documents are searchable by keyword right away and semantically once their embeddings are ready.")
+        embedding_status = document_store.get_embedding_status(recent_uploads)
+        titles = {doc.get("id", ""): doc.get("title", "") for doc in document_store.get_document_list()}
+        for doc_id in recent_uploads:
+            if doc_id not in embedding_status:
+                continue
+            status = embedding_status[doc_id]
+            label = {"ready": "✅ ready", "queued": "⏳ queued", "running": "⚙️ embedding",
+                     "failed": "❌ failed", "none": "— none"}.get(status["status"], status["status"])
+            st.markdown(f"**{titles.get(doc_id, doc_id)}**: {label}")
+            if status["error"]:
+                st.caption(status["error"])
+        st.button("Refresh status")
 
 # View Documents Interface
 elif action == "View Documents":
@@ -178,18 +206,16 @@ elif action == "View Documents":
          "legislation", "report", "standards", "guidance", "research"]
     )
     
-    if agent_filter == "All":
-        documents = document_store.get_document_list()
-    else:
-        documents = document_store.get_document_list(agent_filter)
-    
-    # Apply type filter
-    if type_filter != "All":
-        documents = [doc for doc in documents if doc.get('type', '').lower() == type_filter.lower()]
+    documents = document_store.get_document_list(
+        None if agent_filter == "All" else agent_filter,
+        None if type_filter == "All" else type_filter
+    )
     
     if not documents:
         st.info("No documents found with the selected filters.")
     else:
+        embedding_status = document_store.get_embedding_status([doc.get("id", "") for doc in documents])
+        
         # Convert to DataFrame for better display
         df = pd.DataFrame([
             {
@@ -199,7 +225,8 @@ elif action == "View Documents":
                 "Type": doc.get("type", ""),
                 "Pages": doc.get("pages", 0),
                 "Upload Date": doc.get("upload_date", ""),
-                "Size (chars)": doc.get("char_count", 0)
+                "Size (chars)": doc.get("char_count", 0),
+                "Embeddings": embedding_status.get(doc.get("id", ""), {}).get("status", "none")
             }
             for doc in documents
         ])
@@ -233,11 +260,16 @@ elif action == "View Documents":
             if selected_doc:
                 st.subheader(f"Preview: {selected_doc.get('title', '')}")
                 
-                doc_text = document_store.get_document_text(selected_doc_id)
+                # Only the requested pages are read from disk
+                num_pages = max(selected_doc.get("pages", 0), 1)
+                start_page = st.number_input("Start page", min_value=1, max_value=num_pages, value=1)
+                end_page = min(start_page + 2, num_pages)
+
+                doc_text = document_store.get_page_range(selected_doc_id, start_page, end_page)
                 if doc_text:
                     with st.expander("Document Content", expanded=True):
-                        st.text_area("Document text (first 5000 characters):", 
-                                    value=doc_text[:5000] + ("..." if len(doc_text) > 5000 else ""),
+                        st.text_area(f"Document text (pages {start_page}-{end_page} of {num_pages}):",
+                                    value=doc_text,
                                     height=400)
                 else:
                     st.error("Failed to load document text.")
@@ -276,7 +308,11 @@ elif action == "Search Documents":
             for i, result in enumerate(results):
                 with st.container():
                     st.markdown(f"### {i+1}. {result['title']} ({result['agent'].replace('_', ' ')})")
-                    st.markdown(f"**Document type:** {result['type']} | **Relevance score:** {result['score']:.2f}")
+                    st.markdown(f"**Document type:** {result['type']} | **Relevance score:** {result['score']:.3f}")
+                    if result.get('search_method') == 'hybrid':
+                        semantic_score, keyword_score = result['semantic_score'], result['keyword_score']
+                        st.caption(f"Semantic: {'-' if semantic_score is None else f'{semantic_score:.2f}'} | "
+                                   f"Keyword: {'-' if keyword_score is None else f'{keyword_score:.2f}'}")
                     
                     for j, snippet in enumerate(result['snippets']):
                         st.markdown(f"**Snippet {j+1}:**")
@@ -0,0 +1,110 @@
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, List
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+"""
+LOOKUP_BATCH_SIZE = 500  # Hashes per SELECT (SQLite limits the number of bound parameters)
+
+
+def text_key(text: str) -> str:
+    """
+    Hash a chunk's text for the cache, ignoring whitespace differences
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Hex SHA-256 digest of the whitespace-normalized text
+    """
+    return hashlib.sha256(" ".join(text.split()).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk cache of chunk embeddings keyed by (model, hash of normalized chunk text)"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and if needed create) the cache
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+    def get_many(self, model_name: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings
+
+        Args:
+            model_name: Model that produced the embeddings
+            keys: Text hashes (see text_key)
+
+        Returns:
+            Dictionary mapping each cached hash to its float32 embedding
+        """
+        found = {}
+        try:
+            with self._lock:
+                for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                    batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                    rows = self.conn.execute(
+                        f"SELECT text_hash, vector FROM chunk_embeddings WHERE model = ? "
+                        f"AND text_hash IN ({', '.join('?' for _ in batch)})",
+                        [model_name] + batch
+                    ).fetchall()
+                    for key, vector in rows:
+                        found[key] = np.frombuffer(vector, dtype=np.float32)
+        except sqlite3.Error as e:
+            logging.error(f"Error reading embedding cache: {str(e)}")
+        return found
+
+    def put_many(self, model_name: str, keys: List[str], embeddings: np.ndarray):
+        """
+        Store embeddings in the cache
+
+        Args:
+            model_name: Model that produced the embeddings
+            keys: Text hash of each row
+            embeddings: float32 array with one embedding per key
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        try:
+            with self._lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    [(model_name, key, row.tobytes()) for key, row in zip(keys, embeddings)]
+                )
+                self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logging.error(f"Error writing embedding cache: {str(e)}")
+            with self._lock:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number of cached embeddings per model
+
+        Returns:
+            Dictionary mapping model names to entry counts
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT model, COUNT(*) FROM chunk_embeddings GROUP BY model").fetchall()
+        return {model: count for model, count in rows}
@@ -0,0 +1,151 @@
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from embedding_cache import EmbeddingCache, text_key
+
+# Defaults for length-bucketed chunk encoding
+EMBED_TOKEN_BUDGET = 8192  # Padded tokens per encoder batch (batch size x longest member)
+EMBED_MAX_BATCH_SIZE = 256  # Upper bound on a batch of very short chunks
+TOKEN_ESTIMATE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the encoder token count of a text without running the tokenizer
+
+    Words and punctuation marks are counted, plus the two special tokens every
+    sequence gets; subword splitting only makes the real count a little higher,
+    which is fine for ordering and budgeting batches.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return len(TOKEN_ESTIMATE_PATTERN.findall(text)) + 2
+
+
+def plan_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[np.ndarray]:
+    """
+    Group texts of similar length into batches that fit a padded-token budget
+
+    Args:
+        lengths: Token length of each text
+        token_budget: Maximum batch size x longest member per batch
+        max_batch_size: Maximum texts per batch
+
+    Returns:
+        List of index arrays into the original texts, shortest texts first
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        end = start + 1
+        # Texts are sorted, so the newest member is always the longest one in the batch
+        while (end < len(order) and end - start < max_batch_size
+               and (end - start + 1) * lengths[order[end]] <= token_budget):
+            end += 1
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+class EncodingScheduler:
+    """Encodes chunks in length-bucketed, token-budgeted batches and tracks throughput"""
+
+    def __init__(self,
+                 token_budget: int = EMBED_TOKEN_BUDGET,
+                 max_batch_size: int = EMBED_MAX_BATCH_SIZE,
+                 cache: Optional[EmbeddingCache] = None):
+        """
+        Create a scheduler
+
+        Args:
+            token_budget: Padded tokens per encoder batch
+            max_batch_size: Maximum chunks per encoder batch
+            cache: Optional chunk embedding cache consulted before encoding
+        """
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.chunks = 0
+        self.cached = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def encode(self, model, texts: List[str], model_name: Optional[str] = None) -> np.ndarray:
+        """
+        Embed texts, batching similar lengths together so little padding is encoded
+
+        Short chunks go into large batches and long chunks into small ones, so every
+        batch costs about the same; the rows are returned in the original order.
+        When the scheduler has a cache and the model name is given, chunks whose text
+        was embedded before (by any document) are read from the cache, and repeated
+        texts are encoded only once.
+
+        Args:
+            model: Sentence embedding model (anything with encode(texts, batch_size=...))
+            texts: Texts to embed
+            model_name: Name of the model, used as part of the cache key
+
+        Returns:
+            float32 array with one embedding row per text
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        started = time.perf_counter()
+        keys = [text_key(text) for text in texts]
+        use_cache = self.cache is not None and model_name is not None
+        vectors = self.cache.get_many(model_name, list(set(keys))) if use_cache else {}
+
+        # Encode each distinct uncached text once
+        first_of = {}
+        for i, key in enumerate(keys):
+            if key not in vectors:
+                first_of.setdefault(key, i)
+        todo = list(first_of.values())
+
+        lengths = [estimate_tokens(texts[i]) for i in todo]
+        batches = plan_batches(lengths, self.token_budget, self.max_batch_size)
+        for batch in batches:
+            batch_texts = [texts[todo[j]] for j in batch]
+            batch_embeddings = np.asarray(model.encode(batch_texts, batch_size=len(batch)), dtype=np.float32)
+            for j, row in zip(batch, batch_embeddings):
+                vectors[keys[todo[j]]] = row
+        if use_cache and todo:
+            self.cache.put_many(model_name, [keys[i] for i in todo], np.array([vectors[keys[i]] for i in todo]))
+
+        embeddings = np.array([vectors[key] for key in keys], dtype=np.float32)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.chunks += len(texts)
+            self.cached += len(texts) - len(todo)
+            self.batches += len(batches)
+            self.seconds += elapsed
+        logging.info(f"Encoded {len(todo)} of {len(texts)} chunks in {len(batches)} batches "
+                     f"({len(texts) / elapsed if elapsed else 0:.1f} chunks/s)")
+        return embeddings
+
+    def stats(self) -> Dict:
+        """
+        Get cumulative encoding throughput
+
+        Returns:
+            Dictionary with chunks, cached (chunks not re-encoded), batches, seconds and chunks_per_second
+        """
+        with self._lock:
+            return {
+                "chunks": self.chunks,
+                "cached": self.cached,
+                "batches": self.batches,
+                "seconds": self.seconds,
+                "chunks_per_second": self.chunks / self.seconds if self.seconds else 0.0
+            }
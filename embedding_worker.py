@@ -0,0 +1,203 @@
+import os
+import socket
+import logging
+import threading
+import time
+from typing import Callable, Optional
+from vector_index import normalize_rows
+
+# Defaults for the background embedding worker
+WORKER_POLL_SECONDS = 2.0  # How often an idle worker checks the queue for jobs queued by other processes
+WORKER_BATCH_CHUNKS = 256  # Chunks read and encoded at once, so memory use does not grow with the document
+
+
+def worker_is_alive(worker: Optional[str]) -> bool:
+    """
+    Check whether the worker that claimed a job is still running
+
+    Workers are identified as "host:pid"; a worker on another host is assumed alive.
+
+    Args:
+        worker: Worker identifier recorded on the job
+
+    Returns:
+        True unless the worker is known to be gone
+    """
+    if not worker:
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class EmbeddingWorker:
+    """Background thread that embeds documents queued in the catalog's embedding_jobs table"""
+
+    def __init__(self,
+                 store,
+                 model_name: str,
+                 poll_interval: float = WORKER_POLL_SECONDS,
+                 on_drained: Optional[Callable[[str], None]] = None):
+        """
+        Create a worker for a document store (call start() to run it)
+
+        Args:
+            store: DocumentStore whose catalog holds the queue and whose indexes receive the embeddings
+            model_name: Embedding model the jobs are queued for
+            poll_interval: Seconds between queue checks while idle
+            on_drained: Optional callback, given the model name, run once the queue is empty;
+                the worker then exits (used by re-embedding runs)
+        """
+        self.store = store
+        self.model_name = model_name
+        self.poll_interval = poll_interval
+        self.on_drained = on_drained
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.completed = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread, first re-queuing jobs left running by workers that died"""
+        if self.is_running():
+            return
+        requeued = self.store.catalog.requeue_embedding_jobs(self.model_name, worker_is_alive)
+        if requeued:
+            logging.info(f"Re-queued {requeued} interrupted embedding jobs")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Ask the worker to stop after its current job
+
+        Args:
+            timeout: Seconds to wait for the thread to exit
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        """Whether the worker thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def notify(self):
+        """Wake the worker up because a job was just queued"""
+        self._wake.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no job for the model is queued or running
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.store.catalog.pending_embedding_jobs(self.model_name):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def drain(self):
+        """Process queued jobs in the calling thread until the queue is empty (used without background embedding)"""
+        self.store.catalog.requeue_embedding_jobs(self.model_name, worker_is_alive)
+        while True:
+            payload = self.store.catalog.claim_embedding_job(self.model_name, self.worker_id)
+            if payload is None:
+                return
+            self._process(payload)
+
+    def _run(self):
+        """Claim and process jobs until stopped"""
+        while not self._stop.is_set():
+            try:
+                payload = self.store.catalog.claim_embedding_job(self.model_name, self.worker_id)
+            except Exception as e:
+                logging.error(f"Error claiming embedding job: {str(e)}")
+                payload = None
+
+            if payload is None:
+                if self.on_drained and not self.store.catalog.pending_embedding_jobs(self.model_name):
+                    try:
+                        self.on_drained(self.model_name)
+                    except Exception as e:
+                        logging.error(f"Error finishing embedding run for {self.model_name}: {str(e)}")
+                    return
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            self._process(payload)
+
+    def _process(self, payload: str):
+        """
+        Encode one payload's chunks and hand the embeddings to the store
+
+        Chunks are read and encoded WORKER_BATCH_CHUNKS at a time and their rows
+        appended to a raw file, so memory use does not grow with the document. The
+        encoding runs without the store lock, so searches and uploads carry on
+        meanwhile; only attaching the finished matrix takes the lock. If the chunks
+        changed in the meantime (e.g. the document was re-chunked by an update), the
+        matrix is thrown away and the job queued again.
+
+        Args:
+            payload: Payload key of the claimed job
+        """
+        raw_path = f"{self.store._embedding_path(payload, self.model_name)}.{os.getpid()}.raw"
+        try:
+            model = self.store.model_for(self.model_name)
+            if model is None:
+                raise RuntimeError("embedding model unavailable")
+
+            started = time.perf_counter()
+            hashes = []
+            dimension = 0
+            os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+            with open(raw_path, 'wb') as raw_file:
+                for texts, text_hashes in self.store.catalog.iter_chunk_batches(payload, WORKER_BATCH_CHUNKS):
+                    embeddings = normalize_rows(self.store.encoder.encode(model, texts, self.model_name))
+                    raw_file.write(embeddings.tobytes())
+                    dimension = embeddings.shape[1]
+                    hashes.extend(text_hashes)
+
+            with self.store._lock:
+                # The document may have been deleted or re-chunked while it was being encoded
+                if hashes and self.store.catalog.chunk_hashes(payload) != hashes:
+                    if self.store.catalog.documents_for_payload(payload):
+                        logging.info(f"Chunks of {payload} changed while they were encoded, re-queuing")
+                        self.store.catalog.enqueue_embedding_job(payload, self.model_name)
+                        return
+                elif hashes and self.store.catalog.documents_for_payload(payload):
+                    self.store._store_embedding_file(payload, raw_path, len(hashes), dimension, self.model_name)
+                    if self.model_name == self.store.embedding_model:
+                        self.store._update_ann_index()
+
+            self.store.catalog.finish_embedding_job(payload, self.model_name)
+            self.completed += 1
+            logging.info(f"Embedded {len(hashes)} chunks of {payload} in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logging.error(f"Error embedding {payload}: {str(e)}")
+            self.failed += 1
+            try:
+                self.store.catalog.finish_embedding_job(payload, self.model_name, str(e))
+            except Exception as finish_error:
+                logging.error(f"Error recording failed embedding job: {str(finish_error)}")
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
@@ -0,0 +1,487 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from keyword_index import KeywordIndex, postings_path, read_postings, save_postings
+from vector_index import VectorIndex, IVF_NPROBE
+
+
+def shard_key(agent_name: str) -> str:
+    """Shard an agent's documents are indexed in (agent names compare case-insensitively)"""
+    return agent_name.lower()
+
+
+class AgentShards:
+    """Selection of the agents whose shards an index loads"""
+
+    def __init__(self, agents: Optional[Iterable[str]] = None):
+        """
+        Args:
+            agents: Agents to load shards for (None loads every agent)
+        """
+        self.agents: Optional[Set[str]] = {shard_key(agent) for agent in agents} if agents is not None else None
+
+    def loads(self, agent_name: str) -> bool:
+        """Whether the shard of an agent is loaded"""
+        return self.agents is None or shard_key(agent_name) in self.agents
+
+    def targets(self, labels: List[Tuple[str, str]]) -> Set[str]:
+        """
+        Get the loaded shards a document belongs in
+
+        Args:
+            labels: (agent, type) pairs the document is filed under
+
+        Returns:
+            Shard keys of the document's agents that are loaded
+        """
+        return {shard_key(agent) for agent, _ in labels if self.loads(agent)}
+
+
+class ShardedKeywordIndex(AgentShards):
+    """
+    BM25 keyword index split into one KeywordIndex per agent
+
+    A search for one agent only walks the postings of that agent's shard. The
+    BM25 statistics (chunk and token counts, term frequencies) are kept for all
+    loaded shards together, so a chunk scores the same whichever shards are
+    searched. A document filed under several agents is indexed in each of their
+    shards, from one postings file.
+    """
+
+    tokenize_chunks = staticmethod(KeywordIndex.tokenize_chunks)
+
+    def __init__(self, index_dir: str, agents: Optional[Iterable[str]] = None):
+        """
+        Initialize the sharded index
+
+        Args:
+            index_dir: Directory holding one postings file per document (shared by all shards)
+            agents: Agents to load shards for (None loads every agent)
+        """
+        super().__init__(agents)
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.shards: Dict[str, KeywordIndex] = {}
+        # document_id -> keys of the shards holding it
+        self.doc_shards: Dict[str, Set[str]] = {}
+
+        # BM25 statistics over the loaded documents, each counted once however many shards hold it
+        self.total_chunks = 0
+        self.total_length = 0
+        self.chunk_frequency: Dict[str, int] = {}
+        # document_id -> (chunk count, token count, {term: chunks containing it})
+        self.doc_statistics: Dict[str, Tuple[int, int, Dict[str, int]]] = {}
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.doc_shards
+
+    def _shard(self, key: str) -> KeywordIndex:
+        if key not in self.shards:
+            self.shards[key] = KeywordIndex(self.index_dir)
+        return self.shards[key]
+
+    def _place(self,
+               document_id: str,
+               doc_postings: Dict[str, Dict[str, List[int]]],
+               lengths: List[int],
+               labels: List[Tuple[str, str]]):
+        """Put a document's postings into the loaded shards of its agents"""
+        self.remove_document(document_id, delete_file=False)
+        targets = self.targets(labels)
+        for key in targets:
+            self._shard(key).commit_document(document_id, doc_postings, lengths, persist=False)
+        if targets:
+            self.doc_shards[document_id] = targets
+            self._count(document_id, (len(lengths), sum(lengths),
+                                      {term: len(chunks) for term, chunks in doc_postings.items()}))
+
+    def _count(self, document_id: str, statistics: Tuple[int, int, Dict[str, int]], sign: int = 1):
+        """Add a document to (or with sign=-1, take it out of) the corpus statistics"""
+        chunks, length, frequencies = statistics
+        self.total_chunks += sign * chunks
+        self.total_length += sign * length
+        for term, count in frequencies.items():
+            self.chunk_frequency[term] = self.chunk_frequency.get(term, 0) + sign * count
+            if not self.chunk_frequency[term]:
+                del self.chunk_frequency[term]
+        if sign > 0:
+            self.doc_statistics[document_id] = statistics
+
+    def add_document(self, document_id: str, chunks: List[str], labels: List[Tuple[str, str]], persist: bool = True):
+        """
+        Tokenize a document's chunks and add them to the shards of its agents
+
+        Args:
+            document_id: Document ID
+            chunks: Chunk texts, in chunk order
+            labels: (agent, type) pairs the document is filed under
+            persist: Whether to write the document's postings to disk
+        """
+        doc_postings: Dict[str, Dict[str, List[int]]] = {}
+        lengths: List[int] = []
+        self.tokenize_chunks(chunks, doc_postings, lengths)
+        self.commit_document(document_id, doc_postings, lengths, labels, persist)
+
+    def commit_document(self,
+                        document_id: str,
+                        doc_postings: Dict[str, Dict[str, List[int]]],
+                        lengths: List[int],
+                        labels: List[Tuple[str, str]],
+                        persist: bool = True):
+        """
+        Add a document's accumulated postings to the shards of its agents
+
+        The postings are persisted even when none of the document's agents is
+        loaded, so stores that load those agents find them.
+
+        Args:
+            document_id: Document ID
+            doc_postings: term -> {chunk_index: [offsets]} built by tokenize_chunks
+            lengths: Token count of each chunk
+            labels: (agent, type) pairs the document is filed under
+            persist: Whether to write the document's postings to disk
+        """
+        if persist:
+            save_postings(self.index_dir, document_id, doc_postings, lengths)
+        self._place(document_id, doc_postings, lengths, labels)
+
+    def load_document(self, document_id: str, labels: List[Tuple[str, str]]) -> bool:
+        """
+        Load a document's persisted postings into the shards of its agents
+
+        Args:
+            document_id: Document ID
+            labels: (agent, type) pairs the document is filed under
+
+        Returns:
+            True if postings were found and loaded
+        """
+        postings = read_postings(self.index_dir, document_id)
+        if postings is None:
+            return False
+        self._place(document_id, *postings, labels)
+        return True
+
+    def set_labels(self, document_id: str, labels: List[Tuple[str, str]]):
+        """
+        Move a document to the shards of the agents it is now filed under
+
+        Args:
+            document_id: Document ID
+            labels: (agent, type) pairs the document is filed under
+        """
+        current = self.doc_shards.get(document_id, set())
+        targets = self.targets(labels)
+        if targets == current:
+            return
+        if not current or not targets:
+            # The document enters or leaves the loaded corpus
+            if targets:
+                self.load_document(document_id, labels)
+            else:
+                self.remove_document(document_id, delete_file=False)
+            return
+
+        for key in current - targets:
+            self.shards[key].remove_document(document_id, delete_file=False)
+        if targets - current:
+            postings = read_postings(self.index_dir, document_id)
+            if postings is None:
+                targets &= current
+            else:
+                for key in targets - current:
+                    self._shard(key).commit_document(document_id, *postings, persist=False)
+        self.doc_shards[document_id] = targets
+
+    def remove_document(self, document_id: str, delete_file: bool = True):
+        """
+        Remove a document from every shard
+
+        Args:
+            document_id: Document ID
+            delete_file: Whether to also delete the persisted postings
+        """
+        for key in self.doc_shards.pop(document_id, ()):
+            self.shards[key].remove_document(document_id, delete_file=False)
+        if document_id in self.doc_statistics:
+            self._count(document_id, self.doc_statistics.pop(document_id), -1)
+
+        if delete_file:
+            path = postings_path(self.index_dir, document_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def search(self,
+               query: str,
+               max_chunks: int,
+               agent_name: Optional[str] = None,
+               document_ids: Optional[Set[str]] = None) -> List[Tuple[str, int, float, List[int]]]:
+        """
+        Rank chunks against a query with BM25
+
+        Args:
+            query: Search query
+            max_chunks: Maximum number of chunks to return
+            agent_name: Optional agent whose shard is searched (None searches every loaded shard)
+            document_ids: Optional set of document IDs to restrict the search to
+
+        Returns:
+            List of (document_id, chunk_index, score, match_offsets) sorted by descending score
+        """
+        statistics = (self.total_chunks, self.total_length, self.chunk_frequency)
+        if agent_name:
+            shard = self.shards.get(shard_key(agent_name))
+            return shard.search(query, max_chunks, document_ids, statistics) if shard else []
+
+        # A document filed under several agents is found by each of their shards with the same score
+        merged = {}
+        for shard in self.shards.values():
+            for hit in shard.search(query, max_chunks, document_ids, statistics):
+                merged.setdefault((hit[0], hit[1]), hit)
+        return sorted(merged.values(), key=lambda hit: hit[2], reverse=True)[:max_chunks]
+
+    def document_ids(self) -> Iterable[str]:
+        """IDs of all indexed documents"""
+        return self.doc_shards.keys()
+
+
+class ShardedVectorIndex(AgentShards):
+    """
+    Corpus embedding matrix split into one VectorIndex per agent
+
+    A search for one agent only scores the rows of that agent's shard, and each
+    shard trains its own IVF lists. Search hits are reported as chunk keys,
+    (document slot << 32) | chunk index, with document slots that are unique
+    across shards. A document filed under several agents is indexed in each of
+    their shards.
+    """
+
+    def __init__(self, agents: Optional[Iterable[str]] = None, **index_options):
+        """
+        Initialize an empty sharded index
+
+        Args:
+            agents: Agents to load shards for (None loads every agent)
+            **index_options: VectorIndex arguments used for every shard
+        """
+        super().__init__(agents)
+        self.index_options = index_options
+        self.shards: Dict[str, VectorIndex] = {}
+        self.doc_slots: Dict[str, int] = {}
+        self.doc_ids: Dict[int, str] = {}
+        self.next_slot = 0
+        self.ann_path: Optional[str] = None
+
+    @property
+    def nprobe(self) -> int:
+        """IVF lists probed per query in every shard"""
+        return self.index_options.get("nprobe", IVF_NPROBE)
+
+    @nprobe.setter
+    def nprobe(self, nprobe: int):
+        self.index_options["nprobe"] = nprobe
+        for shard in self.shards.values():
+            shard.nprobe = nprobe
+
+    @property
+    def size(self) -> int:
+        """Rows held by all shards"""
+        return sum(shard.size for shard in self.shards.values())
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.doc_slots
+
+    def _shard(self, key: str) -> VectorIndex:
+        if key not in self.shards:
+            self.shards[key] = VectorIndex(**self.index_options)
+            if self.ann_path:
+                self.shards[key].load_ann(self._shard_ann_path(key))
+        return self.shards[key]
+
+    def _shard_ann_path(self, key: str) -> str:
+        root, ext = os.path.splitext(self.ann_path)
+        return f"{root}.{re.sub(r'[^a-z0-9]+', '_', key)}{ext}"
+
+    def _update_slot(self, document_id: str):
+        """Give a document a slot while any shard holds it, and free the slot once none does"""
+        held = any(document_id in shard for shard in self.shards.values())
+        if held and document_id not in self.doc_slots:
+            self.doc_slots[document_id] = self.next_slot
+            self.doc_ids[self.next_slot] = document_id
+            self.next_slot += 1
+        elif not held and document_id in self.doc_slots:
+            del self.doc_ids[self.doc_slots.pop(document_id)]
+
+    def add(self, document_id: str, embeddings: np.ndarray, labels: List[Tuple[str, str]]):
+        """
+        Add a document's chunk embeddings to the shards of its agents
+
+        Args:
+            document_id: Document ID
+            embeddings: 2D array with one row per chunk (memory-mapped, see VectorIndex.add)
+            labels: (agent, type) pairs the document is filed under
+        """
+        self.remove(document_id)
+        for key in self.targets(labels):
+            self._shard(key).add(document_id, embeddings, [label for label in labels if shard_key(label[0]) == key])
+        self._update_slot(document_id)
+
+    def remove(self, document_id: str):
+        """
+        Drop a document's rows from every shard
+
+        Args:
+            document_id: Document ID
+        """
+        for shard in self.shards.values():
+            shard.remove(document_id)
+        self._update_slot(document_id)
+
+    def set_labels(self, document_id: str, labels: List[Tuple[str, str]], embeddings: np.ndarray):
+        """
+        Move a document to the shards of the agents it is now filed under
+
+        Args:
+            document_id: Document ID
+            labels: (agent, type) pairs the document is filed under
+            embeddings: The document's embeddings, added to shards it was not in yet
+        """
+        targets = self.targets(labels)
+        for key, shard in self.shards.items():
+            if document_id in shard and key not in targets:
+                shard.remove(document_id)
+        for key in targets:
+            shard_labels = [label for label in labels if shard_key(label[0]) == key]
+            shard = self._shard(key)
+            if document_id in shard:
+                shard.set_labels(document_id, shard_labels)
+            else:
+                shard.add(document_id, embeddings, shard_labels)
+        self._update_slot(document_id)
+
+    def uses_ann(self) -> bool:
+        """Whether any shard searches through its approximate index"""
+        return any(shard.uses_ann() for shard in self.shards.values())
+
+    def ann_lists(self) -> int:
+        """Number of inverted lists of the shards searched approximately"""
+        return sum(len(shard.centroids) for shard in self.shards.values() if shard.uses_ann())
+
+    def maybe_train(self) -> bool:
+        """
+        Train or retrain the IVF centroids of every shard that has outgrown them
+
+        Returns:
+            True if any shard's centroids changed
+        """
+        return any([shard.maybe_train() for shard in self.shards.values()])
+
+    def save_ann(self, path: str):
+        """
+        Persist the IVF state of every shard
+
+        Args:
+            path: Base .npz path; each shard is saved next to it with its agent in the name
+        """
+        self.ann_path = path
+        for key, shard in self.shards.items():
+            shard.save_ann(self._shard_ann_path(key))
+
+    def load_ann(self, path: str):
+        """
+        Load persisted IVF state; shards created later load theirs when they are created
+
+        Args:
+            path: Base .npz path given to save_ann
+        """
+        self.ann_path = path
+        for key, shard in self.shards.items():
+            shard.load_ann(self._shard_ann_path(key))
+
+    def search_batch(self,
+                     query_embeddings: np.ndarray,
+                     k: int,
+                     agent_names: Optional[List[Optional[str]]] = None,
+                     document_type: Optional[str] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the k chunks most similar to each of several queries
+
+        Each shard scores all the queries that concern it in one batched search, so
+        a query for one agent never touches the rows of another agent; a query
+        without an agent is answered by every loaded shard and the hits are merged.
+
+        Args:
+            query_embeddings: 2D array with one query embedding per row (need not be normalized)
+            k: Number of chunks to return per query
+            agent_names: Optional agent filter per query (None entries search every loaded shard)
+            document_type: Optional filter by document type, applied to every query
+
+        Returns:
+            One (chunk_keys, cosine_scores) tuple per query, sorted by descending score
+        """
+        queries = np.asarray(query_embeddings).reshape(len(query_embeddings), -1)
+        agent_names = agent_names if agent_names is not None else [None] * len(queries)
+        parts = [[] for _ in range(len(queries))]
+        for key, shard in self.shards.items():
+            wanted = [i for i, agent_name in enumerate(agent_names) if not agent_name or shard_key(agent_name) == key]
+            if not wanted or shard.size == 0:
+                continue
+            mask = shard.row_mask(None, document_type)
+            slots = np.array([self.doc_slots[document_id] for document_id in shard.doc_ids], dtype=np.int64)
+            for i, (rows, scores) in zip(wanted, shard.search_batch(queries[wanted], k, [mask] * len(wanted))):
+                parts[i].append(((slots[shard.row_docs[rows]] << 32) | shard.row_chunks[rows].astype(np.int64), scores))
+
+        results = []
+        for query_parts in parts:
+            if len(query_parts) == 1:
+                results.append(query_parts[0])
+                continue
+            if not query_parts:
+                results.append((np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)))
+                continue
+
+            # Merge the shards' hits, counting a chunk found by several shards once
+            keys = np.concatenate([part_keys for part_keys, _ in query_parts])
+            scores = np.concatenate([part_scores for _, part_scores in query_parts])
+            order = np.argsort(-scores, kind="stable")
+            keys, scores = keys[order], scores[order]
+            first = np.sort(np.unique(keys, return_index=True)[1])[:k]
+            results.append((keys[first], scores[first]))
+        return results
+
+    def shard_sizes(self) -> Dict[str, int]:
+        """Rows held by each shard"""
+        return {key: shard.size for key, shard in self.shards.items()}
+
+    def memory_stats(self) -> Dict:
+        """
+        Get the memory held by the rows of all shards
+
+        Returns:
+            Dictionary with the storage mode, the bytes held, the bytes the same rows take
+            as float32 and the ratio between the two
+        """
+        stored = sum(shard.memory_stats()["bytes"] for shard in self.shards.values())
+        full = sum(shard.memory_stats()["float32_bytes"] for shard in self.shards.values())
+        return {
+            "storage": self.index_options.get("storage", "float32"),
+            "bytes": stored,
+            "float32_bytes": full,
+            "ratio": stored / full if full else 1.0
+        }
+
+    def measure_recall(self, k: int = 10) -> Optional[float]:
+        """
+        Measure recall@k against exact float32 search, averaged over the shards by size
+
+        Args:
+            k: Number of neighbours compared per query
+
+        Returns:
+            Mean recall, or None for an empty index
+        """
+        measured = [(shard.measure_recall(k), shard.size) for shard in self.shards.values() if shard.size]
+        if not measured:
+            return None
+        return sum(recall * size for recall, size in measured) / sum(size for _, size in measured)
@@ -0,0 +1,259 @@
+import re
+import math
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from keyword_index import STOPWORDS
+
+# Defaults for header/footer detection
+BOILERPLATE_SAMPLE_PAGES = 12  # Pages of a document sampled to learn its running headers and footers
+BOILERPLATE_EDGE_LINES = 3  # Lines at the top and at the bottom of a page that may hold a header or footer
+BOILERPLATE_MIN_PAGES = 3  # Text must repeat on at least this many sampled pages...
+BOILERPLATE_MIN_FRACTION = 0.3  # ...and on at least this fraction of them to be stripped
+BOILERPLATE_MAX_CHARS = 160  # Longest header or footer considered, in characters
+BOILERPLATE_MIN_WORDS = 3  # Non-stopword words of 3+ letters needed to strip repeated text that is not a page number
+PAGE_NUMBER_MAX_NUMBERS = 2  # Numbers a page-number line may hold ("L 168/12", "Page 3 of 40")
+PAGE_NUMBER_WORDS = frozenset({"page", "pages"})  # Words allowed in a page-number line besides 1-2 letter prefixes
+
+# Defaults for near-duplicate chunk detection
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity of word shingles above which a chunk is dropped
+MINHASH_PERMUTATIONS = 64  # MinHash signature length
+LSH_BANDS = 16  # Signature bands; chunks sharing any band are compared
+SHINGLE_WORDS = 3  # Words per shingle
+MERSENNE_PRIME = (1 << 31) - 1
+
+LINE_PATTERN = re.compile(r'[^\n]*\S[^\n]*')
+WORD_START_PATTERN = re.compile(r'\b\w')
+WORD_END_PATTERN = re.compile(r'\w\b')
+DIGITS_PATTERN = re.compile(r'\d+')
+WORD_PATTERN = re.compile(r'\w+')
+LETTER_WORD_PATTERN = re.compile(r'[^\W\d_]{3,}')
+LETTERS_PATTERN = re.compile(r'[^\W\d_]+')
+
+
+def normalize_line(line: str) -> str:
+    """
+    Normalize a line for comparison across pages
+
+    Numbers are masked so running page numbers and dates ("L 168/12", "Page 3 of 40")
+    compare equal on every page.
+
+    Args:
+        line: Line of page text
+
+    Returns:
+        Lowercased line with collapsed whitespace and digits replaced by "#"
+    """
+    return DIGITS_PATTERN.sub("#", " ".join(line.split())).lower()
+
+
+def edge_lines(text: str, start: int, end: int, count: int = BOILERPLATE_EDGE_LINES) -> List[Tuple[int, int]]:
+    """
+    Locate the first and last non-blank lines of a page
+
+    Args:
+        text: Text containing the page
+        start: Offset where the page's content starts
+        end: Offset where the page's content ends
+        count: Lines taken from each edge
+
+    Returns:
+        (start, end) offsets of the edge lines, in page order
+    """
+    lines = [(m.start(), m.end()) for m in LINE_PATTERN.finditer(text, start, end)]
+    if len(lines) <= 2 * count:
+        return lines
+    return lines[:count] + lines[-count:]
+
+
+def edge_fragments(text: str, start: int, end: int) -> List[Tuple[str, int, int, bool]]:
+    """
+    List the header and footer candidates of a page
+
+    PDF extraction often glues a running header or footer onto a line of body
+    text, so the candidates are the beginnings and endings of each edge line,
+    cut at word boundaries, rather than whole lines only.
+
+    Args:
+        text: Text containing the page
+        start: Offset where the page's content starts
+        end: Offset where the page's content ends
+
+    Returns:
+        (kind, start, end, whole_line) tuples; kind is "head" for the beginning of a line
+        and "tail" for its ending, and whole_line tells whether nothing else is on the line
+    """
+    fragments = []
+    for line_start, line_end in edge_lines(text, start, end):
+        for m in WORD_END_PATTERN.finditer(text, line_start, min(line_end, line_start + BOILERPLATE_MAX_CHARS)):
+            fragments.append(("head", line_start, m.end(), not any(c.isalnum() for c in text[m.end():line_end])))
+        for m in WORD_START_PATTERN.finditer(text, max(line_start, line_end - BOILERPLATE_MAX_CHARS), line_end):
+            fragments.append(("tail", m.start(), line_end, not any(c.isalnum() for c in text[line_start:m.start()])))
+    return fragments
+
+
+def is_page_number(fragment: str) -> bool:
+    """
+    Check whether a line is a running page number, such as "L 168/12", "- 5 -" or "Page 3 of 40"
+
+    Args:
+        fragment: Line text
+
+    Returns:
+        True if the line holds one or two numbers and, besides them, only punctuation,
+        "page" and words of one or two letters
+    """
+    return (1 <= len(DIGITS_PATTERN.findall(fragment)) <= PAGE_NUMBER_MAX_NUMBERS
+            and all(len(word) <= 2 or word.lower() in PAGE_NUMBER_WORDS for word in LETTERS_PATTERN.findall(fragment)))
+
+
+def content_words(fragment: str) -> int:
+    """
+    Count the words of 3+ letters in a fragment that are not stopwords
+
+    Args:
+        fragment: Text to count in
+
+    Returns:
+        Number of content words
+    """
+    return sum(1 for word in LETTER_WORD_PATTERN.findall(fragment) if word.lower() not in STOPWORDS)
+
+
+class BoilerplateDetector:
+    """Finds header and footer text that repeats across the pages of one document"""
+
+    def __init__(self):
+        self.fragments: Dict[Tuple[str, str], int] = {}
+        self.stripped_lines = 0
+        self.stripped_chars = 0
+
+    def learn(self, pages: List[Tuple[str, int, int]]):
+        """
+        Learn the repeated line beginnings and endings at the edges of a sample of pages
+
+        Args:
+            pages: (text, content_start, content_end) of each sampled page
+        """
+        counts = Counter()
+        for text, start, end in pages:
+            counts.update({(kind, normalize_line(text[fragment_start:fragment_end]))
+                           for kind, fragment_start, fragment_end, _ in edge_fragments(text, start, end)})
+        min_pages = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_MIN_FRACTION * len(pages)))
+        self.fragments = {fragment: pages_seen for fragment, pages_seen in counts.items() if pages_seen >= min_pages}
+
+    def spans(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Locate the header and footer text of a page
+
+        Of the learned fragments found at the beginning (or end) of a line, the one seen
+        on the most sampled pages wins, the longest breaking ties, so a header glued to
+        the body text is cut where the repeated text starts rather than a few words into
+        the neighbouring sentence.
+
+        Args:
+            text: Text containing the page
+            start: Offset where the page's content starts
+            end: Offset where the page's content ends
+
+        Returns:
+            Sorted, non-overlapping (start, end) offsets of the text to leave out of chunks
+        """
+        if not self.fragments:
+            return []
+
+        best = {}
+        for kind, fragment_start, fragment_end, whole_line in edge_fragments(text, start, end):
+            fragment = text[fragment_start:fragment_end]
+            pages_seen = self.fragments.get((kind, normalize_line(fragment)))
+            # Short repeated lines ("the", "solutions", a footnote citation) are body text unless
+            # they are page numbers
+            if not pages_seen or not (
+                    (whole_line and is_page_number(fragment))
+                    or content_words(fragment) >= BOILERPLATE_MIN_WORDS):
+                continue
+            line = (kind, fragment_start if kind == "head" else fragment_end)
+            rank = (pages_seen, fragment_end - fragment_start)
+            if line not in best or rank > best[line][0]:
+                best[line] = (rank, (fragment_start, fragment_end))
+
+        spans = []
+        for fragment_start, fragment_end in sorted(span for _, span in best.values()):
+            if spans and fragment_start <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], fragment_end))
+            else:
+                spans.append((fragment_start, fragment_end))
+
+        self.stripped_lines += len(spans)
+        self.stripped_chars += sum(span_end - span_start for span_start, span_end in spans)
+        return spans
+
+
+class NearDuplicateFilter:
+    """Drops chunks whose word shingles nearly repeat an earlier chunk, using MinHash signatures and LSH"""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, permutations: int = MINHASH_PERMUTATIONS,
+                 bands: int = LSH_BANDS):
+        """
+        Create an empty filter
+
+        Args:
+            threshold: Estimated Jaccard similarity above which a chunk counts as a duplicate
+            permutations: MinHash signature length (must be a multiple of bands)
+            bands: Number of LSH bands
+        """
+        rng = np.random.default_rng(0)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = permutations // bands
+        self._a = rng.integers(1, MERSENNE_PRIME, permutations, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, permutations, dtype=np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self.dropped = 0
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text's word shingles
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            Signature array, or None for a text without words
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            return None
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+        hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles], dtype=np.uint64)
+        hashes %= MERSENNE_PRIME
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def is_duplicate(self, text: str) -> bool:
+        """
+        Check a chunk against the chunks seen so far, remembering it if it is new
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            True if the chunk nearly repeats an earlier one
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return False
+
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = {index for key in keys for index in self._buckets.get(key, ())}
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                self.dropped += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(index)
+        return False
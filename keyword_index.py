@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import math
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common English words carry no ranking signal and would make postings lists huge
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from had has have how i if in into is it its
+may might more most must no not of on or our over shall should so such than that the their them then
+there these they this those to under up was we were what when where which while who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    Split text into lowercase word tokens with their character offsets
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of (token, character_offset) tuples, stopwords removed
+    """
+    return [(m.group(0), m.start()) for m in TOKEN_PATTERN.finditer(text.lower())
+            if m.group(0) not in STOPWORDS]
+
+
+def postings_path(index_dir: str, document_id: str) -> str:
+    """Path of a document's persisted postings"""
+    return os.path.join(index_dir, f"{document_id}.json")
+
+
+def save_postings(index_dir: str, document_id: str, doc_postings: Dict[str, Dict[str, List[int]]], lengths: List[int]):
+    """
+    Persist a document's postings
+
+    Args:
+        index_dir: Directory holding one postings file per document
+        document_id: Document ID
+        doc_postings: term -> {chunk_index: [offsets]} built by KeywordIndex.tokenize_chunks
+        lengths: Token count of each chunk
+    """
+    path = postings_path(index_dir, document_id)
+    try:
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"lengths": lengths, "postings": doc_postings}, f)
+        os.replace(f"{path}.tmp", path)
+    except Exception as e:
+        logging.error(f"Failed to persist keyword postings for {document_id}: {str(e)}")
+
+
+def read_postings(index_dir: str, document_id: str) -> Optional[Tuple[Dict[str, Dict[str, List[int]]], List[int]]]:
+    """
+    Read a document's persisted postings
+
+    Args:
+        index_dir: Directory holding one postings file per document
+        document_id: Document ID
+
+    Returns:
+        Tuple of (postings, chunk lengths), or None if none are persisted or they can't be read
+    """
+    path = postings_path(index_dir, document_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data["postings"], data["lengths"]
+    except Exception as e:
+        logging.error(f"Failed to load keyword postings for {document_id}: {str(e)}")
+        return None
+
+
+class KeywordIndex:
+    """BM25 inverted index over document chunks with positional postings"""
+
+    def __init__(self, index_dir: str):
+        """
+        Initialize the keyword index
+
+        Args:
+            index_dir: Directory holding one postings file per document
+        """
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+
+        # term -> {(document_id, chunk_index): [character offsets of the term in the chunk]}
+        self.postings: Dict[str, Dict[Tuple[str, int], List[int]]] = {}
+        # document_id -> [token count of each chunk]
+        self.chunk_lengths: Dict[str, List[int]] = {}
+        # document_id -> term -> indices of the chunks holding it, i.e. the document's postings keys
+        # (keeps removal O(document) rather than O(postings of its terms))
+        self.doc_terms: Dict[str, Dict[str, List[int]]] = {}
+        self.total_chunks = 0
+        self.total_length = 0
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.chunk_lengths
+
+    def add_document(self, document_id: str, chunks: List[str], persist: bool = True):
+        """
+        Tokenize a document's chunks and add them to the index
+
+        Args:
+            document_id: Document ID
+            chunks: Chunk texts, in chunk order
+            persist: Whether to write the document's postings to disk
+        """
+        doc_postings: Dict[str, Dict[str, List[int]]] = {}
+        lengths: List[int] = []
+        self.tokenize_chunks(chunks, doc_postings, lengths)
+        self.commit_document(document_id, doc_postings, lengths, persist)
+
+    @staticmethod
+    def tokenize_chunks(chunks: List[str], doc_postings: Dict[str, Dict[str, List[int]]], lengths: List[int]):
+        """
+        Accumulate the postings of a batch of chunks
+
+        Chunks are numbered after those already in lengths, so a document can be
+        tokenized batch by batch while it is streamed in.
+
+        Args:
+            chunks: Chunk texts, continuing the document's chunk order
+            doc_postings: term -> {chunk_index: [offsets]} being built for the document
+            lengths: Token counts of the chunks tokenized so far (extended in place)
+        """
+        for chunk_idx, chunk in enumerate(chunks, start=len(lengths)):
+            tokens = tokenize(chunk)
+            lengths.append(len(tokens))
+            for term, offset in tokens:
+                doc_postings.setdefault(term, {}).setdefault(str(chunk_idx), []).append(offset)
+
+    def commit_document(self,
+                        document_id: str,
+                        doc_postings: Dict[str, Dict[str, List[int]]],
+                        lengths: List[int],
+                        persist: bool = True):
+        """
+        Add a document's accumulated postings to the index
+
+        Args:
+            document_id: Document ID
+            doc_postings: term -> {chunk_index: [offsets]} built by tokenize_chunks
+            lengths: Token count of each chunk
+            persist: Whether to write the document's postings to disk
+        """
+        self._merge(document_id, doc_postings, lengths)
+
+        if persist:
+            save_postings(self.index_dir, document_id, doc_postings, lengths)
+
+    def load_document(self, document_id: str) -> bool:
+        """
+        Load a document's persisted postings into the index
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            True if postings were found and loaded
+        """
+        postings = read_postings(self.index_dir, document_id)
+        if postings is None:
+            return False
+        self._merge(document_id, *postings)
+        return True
+
+    def _merge(self, document_id: str, doc_postings: Dict[str, Dict[str, List[int]]], lengths: List[int]):
+        """Merge one document's postings into the in-memory index"""
+        self.remove_document(document_id, delete_file=False)
+
+        doc_terms = {}
+        for term, chunk_positions in doc_postings.items():
+            term_postings = self.postings.setdefault(term, {})
+            chunk_indices = doc_terms[term] = [int(chunk_idx) for chunk_idx in chunk_positions]
+            for chunk_idx, positions in zip(chunk_indices, chunk_positions.values()):
+                term_postings[(document_id, chunk_idx)] = positions
+
+        self.chunk_lengths[document_id] = lengths
+        self.doc_terms[document_id] = doc_terms
+        self.total_chunks += len(lengths)
+        self.total_length += sum(lengths)
+
+    def remove_document(self, document_id: str, delete_file: bool = True):
+        """
+        Remove a document from the index
+
+        Args:
+            document_id: Document ID
+            delete_file: Whether to also delete the persisted postings
+        """
+        lengths = self.chunk_lengths.pop(document_id, None)
+        if lengths is not None:
+            self.total_chunks -= len(lengths)
+            self.total_length -= sum(lengths)
+            for term, chunk_indices in self.doc_terms.pop(document_id, {}).items():
+                term_postings = self.postings[term]
+                for chunk_idx in chunk_indices:
+                    del term_postings[(document_id, chunk_idx)]
+                if not term_postings:
+                    del self.postings[term]
+
+        if delete_file:
+            path = postings_path(self.index_dir, document_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def search(self,
+               query: str,
+               max_chunks: int,
+               document_ids: Optional[Set[str]] = None,
+               statistics: Optional[Tuple[int, int, Dict[str, int]]] = None) -> List[Tuple[str, int, float, List[int]]]:
+        """
+        Rank chunks against a query with BM25
+
+        Args:
+            query: Search query
+            max_chunks: Maximum number of chunks to return
+            document_ids: Optional set of document IDs to restrict the search to
+            statistics: Optional (chunk count, token count, term -> chunk frequency) of a larger
+                corpus this index is one shard of, so its scores match those of the whole corpus
+
+        Returns:
+            List of (document_id, chunk_index, score, match_offsets) sorted by descending score
+        """
+        if not self.total_chunks:
+            return []
+
+        total_chunks, total_length = statistics[:2] if statistics else (self.total_chunks, self.total_length)
+        avg_length = total_length / total_chunks or 1.0
+        scores: Dict[Tuple[str, int], float] = {}
+        matches: Dict[Tuple[str, int], List[int]] = {}
+
+        for term in set(term for term, _ in tokenize(query)):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+
+            df = statistics[2].get(term, len(term_postings)) if statistics else len(term_postings)
+            idf = math.log(1 + (total_chunks - df + 0.5) / (df + 0.5))
+            for key, positions in term_postings.items():
+                if document_ids is not None and key[0] not in document_ids:
+                    continue
+                tf = len(positions)
+                length = self.chunk_lengths[key[0]][key[1]]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                matches.setdefault(key, []).extend(positions)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:max_chunks]
+        return [(doc_id, chunk_idx, score, sorted(matches[(doc_id, chunk_idx)]))
+                for (doc_id, chunk_idx), score in ranked]
+
+    def document_ids(self) -> Iterable[str]:
+        """IDs of all indexed documents"""
+        return self.chunk_lengths.keys()
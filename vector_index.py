@@ -0,0 +1,635 @@
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Defaults for the approximate (IVF) search mode
+IVF_MIN_ROWS = 20000  # Below this many rows, exact brute-force search is used
+IVF_NPROBE = 8  # Number of inverted lists probed per query (higher = better recall, slower)
+IVF_TRAIN_SAMPLE = 50000  # Maximum rows used to train the coarse centroids
+IVF_KMEANS_ITERATIONS = 10
+SEARCH_BLOCK_SCORES = 1 << 24  # Most query-row scores held in memory at once by a batched search
+
+# Defaults for compressed storage of the corpus matrix
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+RESCORE_FACTOR = 4  # Candidates per requested row rescored in float32 when the matrix is compressed
+DECODE_BLOCK_ROWS = 65536  # Compressed rows decoded to float32 at once while scoring
+RECALL_SAMPLE_QUERIES = 32  # Corpus rows used as queries when measuring recall@k
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a matrix
+
+    Args:
+        matrix: 2D array of embeddings
+
+    Returns:
+        New float32 array whose rows have unit length (zero rows are left as zeros)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_rows(matrix: np.ndarray, storage: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Compress normalized embeddings for storage
+
+    int8 rows are scaled so their largest component maps to 127; the per-row
+    scale is kept so scores can be converted back to cosine similarities.
+
+    Args:
+        matrix: 2D float32 array of normalized embeddings
+        storage: "float32", "float16" or "int8"
+
+    Returns:
+        Tuple of (stored_rows, row_scales); row_scales is None unless storage is "int8"
+    """
+    if storage == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return matrix.astype(STORAGE_DTYPES[storage]), None
+
+
+def spherical_kmeans(matrix: np.ndarray, n_clusters: int, iterations: int = IVF_KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Cluster unit-length rows with k-means on cosine similarity
+
+    Args:
+        matrix: 2D array of normalized embeddings
+        n_clusters: Number of centroids to produce
+        iterations: Number of Lloyd iterations
+        seed: Random seed for the initial centroid choice
+
+    Returns:
+        Array of normalized centroids with shape (n_clusters, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, matrix.shape[0])
+    centroids = matrix[rng.choice(matrix.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, matrix)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Re-seed empty clusters from random rows so every list stays useful
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = matrix[rng.choice(matrix.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class VectorIndex:
+    """Corpus-wide embedding matrix with a row -> (document, chunk) offset table"""
+
+    def __init__(self,
+                 ann_mode: str = "exact",
+                 ann_min_rows: int = IVF_MIN_ROWS,
+                 nprobe: int = IVF_NPROBE,
+                 storage: str = "float32",
+                 rescore_factor: int = RESCORE_FACTOR):
+        """
+        Initialize an empty index; the embedding dimension is taken from the first document added
+
+        Args:
+            ann_mode: "exact" for brute-force search or "ivf" for the approximate inverted-file index
+            ann_min_rows: Corpus size below which searches stay exact even in "ivf" mode
+            nprobe: Default number of inverted lists probed per approximate query
+            storage: "float32", or "float16" / "int8" to keep the matrix compressed in memory
+                (candidates are then rescored with the float32 embeddings each document was added with)
+            rescore_factor: Candidates per requested row rescored when the matrix is compressed
+        """
+        if storage not in STORAGE_DTYPES:
+            logging.error(f"Unknown vector storage '{storage}', using float32")
+            storage = "float32"
+        self.ann_mode = ann_mode
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self.storage = storage
+        self.rescore_factor = rescore_factor
+        self.dimension = 0
+        self.size = 0
+        self._matrix = np.zeros((0, 0), dtype=STORAGE_DTYPES[storage])
+        self._scales = np.zeros(0, dtype=np.float32) if storage == "int8" else None
+        self._row_docs = np.zeros(0, dtype=np.int32)
+        self._row_chunks = np.zeros(0, dtype=np.int32)
+
+        # Per-document bookkeeping, indexed by the document's slot number. A stored
+        # document can be shared by several catalogue entries, so it keeps every
+        # (agent, type) label it is filed under.
+        self.doc_ids: List[str] = []
+        self.doc_labels: List[List[Tuple[str, str]]] = []
+        self.doc_slots: Dict[str, int] = {}
+
+        # The float32 embeddings each document was added with (memory-mapped by the store),
+        # used to rescore candidates found on the compressed matrix
+        self.doc_sources: List[np.ndarray] = []
+        self._recall: Dict[int, float] = {}
+
+        # Cache of boolean row masks keyed by (agent, type) filters
+        self._masks: Dict[Tuple[Optional[str], Optional[str]], np.ndarray] = {}
+
+        # IVF state: coarse centroids, the list each row belongs to and rows grouped by list
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        self._row_lists = np.zeros(0, dtype=np.int32)
+        self._list_order: Optional[np.ndarray] = None
+        self._list_bounds: Optional[np.ndarray] = None
+        self._stored_assignments: Dict[str, np.ndarray] = {}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The live rows of the corpus matrix, in the storage dtype"""
+        return self._matrix[:self.size]
+
+    def decode(self, rows) -> np.ndarray:
+        """
+        Decompress rows of the corpus matrix
+
+        Args:
+            rows: Row indices or a slice of live rows
+
+        Returns:
+            float32 array of the (approximately) normalized embeddings
+        """
+        decoded = self.matrix[rows].astype(np.float32)
+        if self._scales is not None:
+            decoded *= self._scales[:self.size][rows][:, None]
+        return decoded
+
+    @property
+    def row_docs(self) -> np.ndarray:
+        """Document slot of each row"""
+        return self._row_docs[:self.size]
+
+    @property
+    def row_chunks(self) -> np.ndarray:
+        """Chunk index (within its document) of each row"""
+        return self._row_chunks[:self.size]
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.doc_slots
+
+    def _reserve(self, extra_rows: int):
+        """Grow the row buffers geometrically so repeated uploads stay amortized O(1) per row"""
+        needed = self.size + extra_rows
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2, 256)
+        matrix = np.zeros((new_capacity, self.dimension), dtype=STORAGE_DTYPES[self.storage])
+        matrix[:self.size] = self.matrix
+        if self._scales is not None:
+            scales = np.ones(new_capacity, dtype=np.float32)
+            scales[:self.size] = self._scales[:self.size]
+            self._scales = scales
+        row_docs = np.zeros(new_capacity, dtype=np.int32)
+        row_docs[:self.size] = self.row_docs
+        row_chunks = np.zeros(new_capacity, dtype=np.int32)
+        row_chunks[:self.size] = self.row_chunks
+        row_lists = np.zeros(new_capacity, dtype=np.int32)
+        row_lists[:self.size] = self._row_lists[:self.size]
+
+        self._matrix, self._row_docs, self._row_chunks = matrix, row_docs, row_chunks
+        self._row_lists = row_lists
+
+    def add(self, document_id: str, embeddings: np.ndarray, labels: List[Tuple[str, str]]):
+        """
+        Append a document's chunk embeddings to the corpus matrix
+
+        Args:
+            document_id: Document ID
+            embeddings: 2D array with one row per chunk; with compressed storage it is
+                kept for rescoring, so it should be memory-mapped
+            labels: (agent, type) pairs the document is filed under (used for row masks)
+        """
+        if document_id in self.doc_slots:
+            self.remove(document_id)
+
+        source = embeddings
+        embeddings = normalize_rows(embeddings)
+        if embeddings.ndim != 2 or embeddings.shape[0] == 0:
+            return
+
+        if self.dimension == 0:
+            self.dimension = embeddings.shape[1]
+            self._matrix = np.zeros((0, self.dimension), dtype=STORAGE_DTYPES[self.storage])
+        elif embeddings.shape[1] != self.dimension:
+            logging.error(f"Embedding dimension mismatch for {document_id}: "
+                          f"{embeddings.shape[1]} != {self.dimension}")
+            return
+
+        count = embeddings.shape[0]
+        self._reserve(count)
+
+        slot = len(self.doc_ids)
+        self.doc_ids.append(document_id)
+        self.doc_labels.append([(agent.lower(), doc_type.lower()) for agent, doc_type in labels])
+        self.doc_slots[document_id] = slot
+        self.doc_sources.append(source)
+
+        start, end = self.size, self.size + count
+        stored, scales = quantize_rows(embeddings, self.storage)
+        self._matrix[start:end] = stored
+        if scales is not None:
+            self._scales[start:end] = scales
+        self._row_docs[start:end] = slot
+        self._row_chunks[start:end] = np.arange(count, dtype=np.int32)
+
+        # Keep the inverted lists current: reuse persisted assignments or route to the nearest centroid
+        if self.centroids is not None:
+            stored = self._stored_assignments.pop(document_id, None)
+            if stored is not None and len(stored) == count and stored.max(initial=0) < len(self.centroids):
+                self._row_lists[start:end] = stored
+            else:
+                self._row_lists[start:end] = np.argmax(embeddings @ self.centroids.T, axis=1)
+
+        self.size = end
+        self._masks.clear()
+        self._list_order = None
+        self._recall = {}
+
+    def remove(self, document_id: str):
+        """
+        Drop a document's rows from the corpus matrix
+
+        Args:
+            document_id: Document ID
+        """
+        slot = self.doc_slots.pop(document_id, None)
+        if slot is None:
+            return
+
+        keep = self.row_docs != slot
+        kept = int(keep.sum())
+        self._matrix[:kept] = self.matrix[keep]
+        if self._scales is not None:
+            self._scales[:kept] = self._scales[:self.size][keep]
+        self._row_chunks[:kept] = self.row_chunks[keep]
+        self._row_lists[:kept] = self._row_lists[:self.size][keep]
+        row_docs = self.row_docs[keep]
+
+        # Re-number the remaining document slots so they stay dense
+        del self.doc_ids[slot]
+        del self.doc_labels[slot]
+        del self.doc_sources[slot]
+        row_docs[row_docs > slot] -= 1
+        self._row_docs[:kept] = row_docs
+        self.doc_slots = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+        self.size = kept
+        self._masks.clear()
+        self._list_order = None
+        self._recall = {}
+
+    def set_labels(self, document_id: str, labels: List[Tuple[str, str]]):
+        """
+        Replace the (agent, type) labels of a document already in the index
+
+        Args:
+            document_id: Document ID
+            labels: (agent, type) pairs the document is filed under
+        """
+        slot = self.doc_slots.get(document_id)
+        if slot is not None:
+            self.doc_labels[slot] = [(agent.lower(), doc_type.lower()) for agent, doc_type in labels]
+            self._masks.clear()
+
+    def uses_ann(self) -> bool:
+        """Whether searches currently go through the approximate index"""
+        return self.ann_mode == "ivf" and self.centroids is not None and self.size >= self.ann_min_rows
+
+    def maybe_train(self) -> bool:
+        """
+        Train or retrain the IVF centroids when the corpus has outgrown them
+
+        Centroids are trained once the corpus reaches ann_min_rows and retrained
+        whenever it doubles, so list sizes stay balanced as documents are added.
+
+        Returns:
+            True if the centroids changed
+        """
+        if self.ann_mode != "ivf" or self.size < self.ann_min_rows:
+            return False
+        if self.centroids is not None and self.size <= 2 * self.trained_rows:
+            return False
+
+        n_lists = int(np.clip(np.sqrt(self.size), 16, 4096))
+        rng = np.random.default_rng(0)
+        sample_size = min(self.size, IVF_TRAIN_SAMPLE)
+        sample = normalize_rows(self.decode(rng.choice(self.size, sample_size, replace=False)))
+
+        self.centroids = spherical_kmeans(sample, n_lists)
+        for start in range(0, self.size, DECODE_BLOCK_ROWS):
+            end = min(start + DECODE_BLOCK_ROWS, self.size)
+            self._row_lists[start:end] = np.argmax(self.decode(slice(start, end)) @ self.centroids.T, axis=1)
+        self.trained_rows = self.size
+        self._list_order = None
+        self._stored_assignments = {}
+        logging.info(f"Trained IVF index with {len(self.centroids)} lists on {sample_size} rows")
+        return True
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows sorted by inverted list, plus the start offset of each list"""
+        if self._list_order is None:
+            row_lists = self._row_lists[:self.size]
+            self._list_order = np.argsort(row_lists, kind="stable")
+            counts = np.bincount(row_lists, minlength=len(self.centroids))
+            self._list_bounds = np.concatenate(([0], np.cumsum(counts)))
+        return self._list_order, self._list_bounds
+
+    def save_ann(self, path: str):
+        """
+        Persist the IVF centroids and per-document list assignments
+
+        Args:
+            path: Target .npz file
+        """
+        if self.centroids is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        # Rows are always stored grouped by document in slot order, so offsets fall out of a search
+        offsets = np.searchsorted(self.row_docs, np.arange(len(self.doc_ids) + 1))
+
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez(f, centroids=self.centroids, trained_rows=self.trained_rows,
+                     doc_ids=np.array(self.doc_ids), offsets=offsets,
+                     assignments=self._row_lists[:self.size])
+        os.replace(f"{path}.tmp", path)
+
+    def load_ann(self, path: str):
+        """
+        Load persisted IVF state; must be called before documents are added
+
+        Args:
+            path: .npz file written by save_ann
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with np.load(path) as data:
+                self.centroids = data["centroids"]
+                self.trained_rows = int(data["trained_rows"])
+                offsets, assignments = data["offsets"], data["assignments"]
+                self._stored_assignments = {
+                    str(doc_id): assignments[offsets[i]:offsets[i + 1]]
+                    for i, doc_id in enumerate(data["doc_ids"])
+                }
+        except Exception as e:
+            logging.error(f"Failed to load IVF index: {str(e)}")
+            self.centroids = None
+
+    def row_mask(self, agent_name: Optional[str] = None, document_type: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Get the precomputed boolean row mask for an agent/type filter
+
+        Args:
+            agent_name: Optional filter by agent name
+            document_type: Optional filter by document type
+
+        Returns:
+            Boolean array over rows, or None when no filter applies
+        """
+        if not agent_name and not document_type:
+            return None
+
+        key = (agent_name.lower() if agent_name else None,
+               document_type.lower() if document_type else None)
+        if key not in self._masks:
+            doc_ok = np.array([
+                any((key[0] is None or agent == key[0]) and (key[1] is None or doc_type == key[1])
+                    for agent, doc_type in labels)
+                for labels in self.doc_labels
+            ], dtype=bool)
+            self._masks[key] = doc_ok[self.row_docs] if self.size else np.zeros(0, dtype=bool)
+        return self._masks[key]
+
+    def search(self,
+               query_embedding: np.ndarray,
+               k: int,
+               mask: Optional[np.ndarray] = None,
+               nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k rows most similar to a query
+
+        Small corpora (or ann_mode="exact") are scanned with one matrix-vector
+        product; otherwise only the rows in the nprobe closest IVF lists are scored.
+        With compressed storage the best candidates are rescored in float32.
+
+        Args:
+            query_embedding: Query embedding (need not be normalized)
+            k: Number of rows to return
+            mask: Optional boolean row mask restricting the candidates
+            nprobe: Lists to probe in IVF mode (defaults to self.nprobe)
+
+        Returns:
+            Tuple of (row_indices, cosine_scores) sorted by descending score
+        """
+        return self.search_batch(np.asarray(query_embedding).reshape(1, -1), k, [mask], nprobe)[0]
+
+    def search_batch(self,
+                     query_embeddings: np.ndarray,
+                     k: int,
+                     masks: Optional[List[Optional[np.ndarray]]] = None,
+                     nprobe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the k rows most similar to each of several queries
+
+        In exact mode all queries are scored with a single matrix-matrix product
+        (split into blocks of at most SEARCH_BLOCK_SCORES scores to bound memory).
+        In IVF mode the probe lists of all queries come from one product with the
+        centroids, then each query scores only its own candidate rows. With
+        compressed storage the matrix is decoded block by block, and the top
+        k x rescore_factor candidates of each query are rescored in float32.
+
+        Args:
+            query_embeddings: 2D array with one query embedding per row (need not be normalized)
+            k: Number of rows to return per query
+            masks: Optional boolean row mask per query (None entries mean no filter)
+            nprobe: Lists to probe in IVF mode (defaults to self.nprobe)
+
+        Returns:
+            One (row_indices, cosine_scores) tuple per query, sorted by descending score
+        """
+        queries = normalize_rows(np.asarray(query_embeddings).reshape(len(query_embeddings), -1))
+        masks = masks if masks is not None else [None] * len(queries)
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        if self.size == 0 or k <= 0:
+            return [empty] * len(queries)
+
+        if self.uses_ann():
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            order, bounds = self._inverted_lists()
+            results = []
+            for query, mask, query_probes in zip(queries, masks, probes):
+                rows = np.concatenate([order[bounds[l]:bounds[l + 1]] for l in query_probes])
+                if mask is not None:
+                    rows = rows[mask[rows]]
+                if len(rows) == 0:
+                    results.append(empty)
+                    continue
+                scores = self.decode(rows) @ query
+                results.append(self._select(scores, len(rows), k, query, rows))
+            return results
+
+        results = []
+        block = max(1, SEARCH_BLOCK_SCORES // self.size)
+        for first in range(0, len(queries), block):
+            block_queries = queries[first:first + block]
+            block_scores = self._score(block_queries)
+            for query, scores, mask in zip(block_queries, block_scores, masks[first:first + block]):
+                if mask is not None:
+                    candidates = int(mask.sum())
+                    if candidates == 0:
+                        results.append(empty)
+                        continue
+                    scores = np.where(mask, scores, -np.inf)
+                else:
+                    candidates = self.size
+                results.append(self._select(scores, candidates, k, query))
+        return results
+
+    def _score(self, queries: np.ndarray) -> np.ndarray:
+        """Scores of normalized queries against every row, decoding compressed rows block by block"""
+        if self.storage == "float32":
+            return queries @ self.matrix.T
+        scores = np.empty((len(queries), self.size), dtype=np.float32)
+        for start in range(0, self.size, DECODE_BLOCK_ROWS):
+            end = min(start + DECODE_BLOCK_ROWS, self.size)
+            scores[:, start:end] = queries @ self.matrix[start:end].astype(np.float32).T
+        if self._scales is not None:
+            scores *= self._scales[:self.size]
+        return scores
+
+    def _select(self,
+                scores: np.ndarray,
+                candidates: int,
+                k: int,
+                query: np.ndarray,
+                rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pick a query's k best rows, rescoring compressed candidates in float32
+
+        Args:
+            scores: Scores of the candidate rows (-inf for rows filtered out)
+            candidates: Number of scores that are real candidates
+            k: Number of rows to return
+            query: Normalized query embedding
+            rows: Row index of each score (defaults to the score position)
+
+        Returns:
+            Tuple of (row_indices, cosine_scores) sorted by descending score
+        """
+        depth = k if self.storage == "float32" else k * self.rescore_factor
+        top = self._top_k(scores, min(depth, candidates))
+        top_rows = top if rows is None else rows[top]
+        if self.storage == "float32":
+            return top_rows, scores[top]
+
+        exact = self.source_rows(top_rows) @ query
+        best = self._top_k(exact, min(k, len(top_rows)))
+        return top_rows[best], exact[best]
+
+    def source_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get the normalized float32 embeddings of some rows from the document sources
+
+        Args:
+            rows: Row indices
+
+        Returns:
+            float32 array with one normalized embedding per row
+        """
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        slots = self._row_docs[rows]
+        for slot in np.unique(slots):
+            selected = slots == slot
+            vectors[selected] = self.doc_sources[slot][self._row_chunks[rows[selected]]]
+        return normalize_rows(vectors)
+
+    def memory_stats(self) -> Dict:
+        """
+        Get the memory held by the live rows of the corpus matrix
+
+        Returns:
+            Dictionary with the storage mode, the bytes held, the bytes the same rows take
+            as float32 and the ratio between the two
+        """
+        stored = self.matrix.nbytes + (self.size * 4 if self._scales is not None else 0)
+        full = self.size * self.dimension * 4
+        return {
+            "storage": self.storage,
+            "bytes": stored,
+            "float32_bytes": full,
+            "ratio": stored / full if full else 1.0
+        }
+
+    def measure_recall(self, k: int = 10, sample: int = RECALL_SAMPLE_QUERIES) -> Optional[float]:
+        """
+        Measure recall@k of the index against exact float32 search
+
+        Sampled corpus rows are used as queries; their exact neighbours are computed
+        from the document sources one document at a time. The result is cached until
+        the index changes.
+
+        Args:
+            k: Number of neighbours compared per query
+            sample: Number of query rows
+
+        Returns:
+            Mean fraction of the exact top k returned by search_batch, or None for an empty index
+        """
+        if self.size == 0:
+            return None
+        if k in self._recall:
+            return self._recall[k]
+
+        k = min(k, self.size)
+        rng = np.random.default_rng(0)
+        queries = self.source_rows(rng.choice(self.size, min(sample, self.size), replace=False))
+
+        # Running exact top k, merged document by document (rows are grouped by slot)
+        offsets = np.searchsorted(self.row_docs, np.arange(len(self.doc_ids) + 1))
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        for slot, source in enumerate(self.doc_sources):
+            rows = np.arange(offsets[slot], offsets[slot + 1])
+            all_rows = np.concatenate([best_rows, np.broadcast_to(rows, (len(queries), len(rows)))], axis=1)
+            all_scores = np.concatenate([best_scores, queries @ normalize_rows(source).T], axis=1)
+            keep = np.argpartition(-all_scores, min(k, all_scores.shape[1]) - 1, axis=1)[:, :k]
+            best_rows = np.take_along_axis(all_rows, keep, axis=1)
+            best_scores = np.take_along_axis(all_scores, keep, axis=1)
+
+        found = self.search_batch(queries, k)
+        recall = float(np.mean([len(np.intersect1d(rows, exact)) / k for (rows, _), exact in zip(found, best_rows)]))
+        self._recall[k] = recall
+        return recall
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k highest scores, sorted by descending score"""
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def locate(self, row: int) -> Tuple[str, int]:
+        """
+        Map a row back to its document and chunk
+
+        Args:
+            row: Row index in the corpus matrix
+
+        Returns:
+            Tuple of (document_id, chunk_index)
+        """
+        return self.doc_ids[self._row_docs[row]], int(self._row_chunks[row])